@@ -0,0 +1,5 @@
+"""
+Benchmarks of the hot paths of W.A.S.T.E., on synthetic rosters and without a display.
+
+Run ``python -m benchmarks --help`` from the root of the repository.
+"""
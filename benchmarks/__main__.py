@@ -0,0 +1,148 @@
+"""Run the benchmarks on a synthetic roster and write the results as JSON."""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import gtk
+
+# The stand-ins have to replace GTK before anything imports waste.ui
+gtk.install()
+
+# pylint: disable=wrong-import-position
+from benchmarks.roster import generate_roster
+from benchmarks.suite import BENCHMARKS, Context
+from waste.player import PLAYERS_DIR
+
+
+def parse_args(args=None):
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmarks of the hot paths of W.A.S.T.E."
+    )
+    parser.add_argument(
+        "-n", "--players", type=int, default=1000, help="size of the roster (default: 1000)"
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=200,
+        help="number of players of the benchmarks on single players (default: 200)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs of each benchmark, the best is kept"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic roster")
+    parser.add_argument(
+        "--workdir",
+        default=None,
+        help="directory of the roster, kept and reused between runs (default: a temporary one)",
+    )
+    parser.add_argument(
+        "-k", "--only", action="append", default=None, help="only run the named benchmarks"
+    )
+    parser.add_argument(
+        "-o", "--output", default=None, help="where to write the JSON (default: standard output)"
+    )
+    parser.add_argument(
+        "--baseline", default=None, help="results of a previous run, to print the changes"
+    )
+    return parser.parse_args(args)
+
+
+def git_commit():
+    """Return the commit of the repository, None if it is unknown."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, workdir: str):
+    """Generate the roster in the working directory if needed, and run the benchmarks."""
+    os.chdir(workdir)
+    filenames = [
+        os.path.join(PLAYERS_DIR, f"player_{player_id}.json")
+        for player_id in range(1, args.players + 1)
+    ]
+
+    start = time.perf_counter()
+    if not all(map(os.path.exists, filenames)):
+        print(f"Generating {args.players} players...", file=sys.stderr)
+        generate_roster(PLAYERS_DIR, args.players, args.seed)
+    generation = time.perf_counter() - start
+
+    context = Context(filenames, min(args.sample, args.players), args.repeat)
+    results = {}
+    for name, function in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = function(context)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "players": args.players,
+        "sample": len(context.players),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "generation_seconds": generation,
+        "benchmarks": results,
+    }
+
+
+def compare(results: dict, baseline: dict, file=None):
+    """Print the change of duration of each benchmark against a previous run."""
+    file = file or sys.stderr
+    print(f"  {'benchmark':<25} {'baseline':>10} {'now':>10} {'change':>8}", file=file)
+    for name, result in results["benchmarks"].items():
+        if (previous := baseline.get("benchmarks", {}).get(name)) is None:
+            continue
+        change = result["seconds"] / previous["seconds"] - 1 if previous["seconds"] else 0
+        print(
+            f"  {name:<25} {previous['seconds'] * 1000:>8.1f}ms {result['seconds'] * 1000:>8.1f}ms"
+            f" {change:>+8.1%}",
+            file=file,
+        )
+
+
+def main():
+    args = parse_args()
+    # The paths given on the command line are relative to where the benchmarks are started
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    if args.workdir is not None:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = run(args, os.path.abspath(args.workdir))
+    else:
+        with tempfile.TemporaryDirectory(prefix="waste-bench-") as workdir:
+            results = run(args, workdir)
+
+    text = json.dumps(results, indent=4)
+    if output is None:
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+
+    if baseline is not None:
+        with open(baseline, "r", encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
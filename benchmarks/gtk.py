@@ -0,0 +1,348 @@
+"""
+Headless stand-ins for the parts of GTK and GLib used by ``waste.ui``, so the handlers can be
+benchmarked without a display. The widgets keep their state and emit the signals the handlers
+rely on, but draw nothing: the measures are the cost of the Python side only.
+
+``install`` has to be called before ``waste.ui`` is imported.
+"""
+
+import contextlib
+import queue
+import sys
+import types
+import xml.etree.ElementTree as ElementTree
+
+# Callbacks waiting for the main loop: (function, args)
+_PENDING = queue.Queue()
+
+
+class Widget:
+    """Any widget: the state the handlers read back, and the signals connected to it."""
+
+    def __init__(self, *_, **kwargs):
+        """Constructor method, the keyword arguments are ignored like most properties."""
+        self.value = 0
+        self.text = ""
+        self.active = kwargs.get("active", False)
+        self.handlers = []  # [(signal, function, data), ...], the id of a handler is its index + 1
+        self.blocked = []  # The ids of the blocked handlers
+
+    def __getattr__(self, name: str):
+        """The methods without effect on the state, such as ``show`` or ``set_line_wrap``."""
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *_, **__: None
+
+    def connect(self, signal: str, function, *data):
+        """Connect a handler to a signal, returns its id."""
+        self.handlers.append((signal, function, data))
+        return len(self.handlers)
+
+    connect_after = connect
+
+    @contextlib.contextmanager
+    def handler_block(self, handler_id: int):
+        """Block a handler in the enclosed block, as PyGObject's context manager does."""
+        self.blocked.append(handler_id)
+        try:
+            yield
+        finally:
+            self.blocked.remove(handler_id)
+
+    def handler_block_by_func(self, function):
+        """Block the handlers of a function, returns their number as PyGObject does."""
+        handler_ids = [
+            handler_id
+            for handler_id, (_, handler_function, _) in enumerate(self.handlers, 1)
+            if handler_function == function
+        ]
+        self.blocked.extend(handler_ids)
+        return len(handler_ids)
+
+    def handler_unblock_by_func(self, function):
+        """Unblock the handlers of a function, returns their number."""
+        handler_ids = [
+            handler_id
+            for handler_id, (_, handler_function, _) in enumerate(self.handlers, 1)
+            if handler_function == function and handler_id in self.blocked
+        ]
+        for handler_id in handler_ids:
+            self.blocked.remove(handler_id)
+        return len(handler_ids)
+
+    def emit(self, signal: str):
+        """Call the handlers of a signal which are not blocked."""
+        for handler_id, (handler_signal, function, data) in enumerate(self.handlers, 1):
+            if handler_signal == signal and handler_id not in self.blocked:
+                function(self, *data)
+
+    def set_value(self, value):
+        """Set the value of a spin button."""
+        if value != self.value:
+            self.value = value
+            self.emit("value-changed")
+
+    def get_value(self):
+        """Return the value of a spin button."""
+        return self.value
+
+    def get_value_as_int(self):
+        """Return the value of a spin button as an int."""
+        return int(self.value)
+
+    def set_text(self, text: str):
+        """Set the text of an entry."""
+        if text != self.text:
+            self.text = text
+            self.emit("changed")
+
+    def get_text(self):
+        """Return the text of an entry."""
+        return self.text
+
+    def set_markup(self, markup: str):
+        """Set the text of a label."""
+        self.text = markup
+
+    def get_label(self):
+        """Return the text of a label."""
+        return self.text
+
+    def set_active(self, active):
+        """Set the state of a check button, or the active row of a combo list."""
+        if active != self.active:
+            self.active = active
+            self.emit("toggled")
+            self.emit("changed")
+
+    def get_active(self):
+        """Return the state of a check button, or the active row of a combo list."""
+        return self.active
+
+
+class ComboBoxText(Widget):
+    """A combo list of (id, text) rows."""
+
+    def __init__(self, *args, **kwargs):
+        """Constructor method."""
+        super().__init__(*args, **kwargs)
+        self.rows = []
+        self.active = -1
+
+    def remove_all(self):
+        """Remove every row."""
+        self.rows.clear()
+        self.active = -1
+
+    def append(self, row_id: str, text: str):
+        """Add a row at the end."""
+        self.rows.append((row_id, text))
+
+    def insert(self, position: int, row_id: str, text: str):
+        """Add a row at a position."""
+        self.rows.insert(position, (row_id, text))
+
+    def remove(self, position: int):
+        """Remove the row at a position."""
+        del self.rows[position]
+
+    def get_active_id(self):
+        """Return the id of the active row, None if there is none."""
+        if 0 <= self.active < len(self.rows):
+            return self.rows[self.active][0]
+        return None
+
+
+class Grid(Widget):
+    """A grid of widgets, by rows."""
+
+    def __init__(self, *args, **kwargs):
+        """Constructor method."""
+        super().__init__(*args, **kwargs)
+        self.rows = []
+
+    def attach(self, child, left: int, top: int, *_):
+        """Put a widget at a cell."""
+        while len(self.rows) <= top:
+            self.rows.append({})
+        self.rows[top][left] = child
+
+    def remove_row(self, position: int):
+        """Remove a row, the following ones move up."""
+        del self.rows[position]
+
+
+class _Row:
+    """A row of a ListStore, which is its own iter and path."""
+
+    __slots__ = ("values", "removed")
+
+    def __init__(self, values: list):
+        """Constructor method."""
+        self.values = list(values)
+        self.removed = False
+
+
+class ListStore(Widget):
+    """The model of a tree view: a list of rows."""
+
+    def __init__(self, *args, **kwargs):
+        """Constructor method."""
+        super().__init__(*args, **kwargs)
+        self.rows = {}
+
+    def append(self, values: list):
+        """Add a row at the end, returns its iter."""
+        row = _Row(values)
+        self.rows[id(row)] = row
+        return row
+
+    @staticmethod
+    def get_path(tree_iter):
+        """Return the path of a row."""
+        return tree_iter
+
+    @staticmethod
+    def get_iter(path):
+        """Return the iter of a path."""
+        return path
+
+    @staticmethod
+    def set_row(tree_iter, values: list):
+        """Replace the values of a row."""
+        tree_iter.values = list(values)
+
+    def remove(self, tree_iter):
+        """Remove a row."""
+        tree_iter.removed = True
+        del self.rows[id(tree_iter)]
+
+    def __len__(self):
+        """Return the number of rows."""
+        return len(self.rows)
+
+
+class TreeRowReference:
+    """A reference to a row of a ListStore, which stays valid until the row is removed."""
+
+    def __init__(self, path):
+        """Constructor method."""
+        self.path = path
+
+    @classmethod
+    def new(cls, _, path):
+        """Return a reference to the row of a path."""
+        return cls(path)
+
+    def valid(self):
+        """Return True while the row exists."""
+        return not self.path.removed
+
+    def get_path(self):
+        """Return the path of the row."""
+        return self.path
+
+
+class Dialog(Widget):
+    """A dialog, which is always cancelled."""
+
+    @staticmethod
+    def get_content_area():
+        """Return the box of the dialog's content."""
+        return Widget()
+
+    def run(self):
+        """Return the response of the user."""
+        return ResponseType.CANCEL
+
+
+class ResponseType:
+    """The responses of a dialog."""
+
+    OK = -5
+    CANCEL = -6
+
+
+# The classes of the glade files with a state, the others are plain widgets
+_CLASSES = {"GtkComboBoxText": ComboBoxText, "GtkGrid": Grid, "GtkListStore": ListStore}
+
+
+class Builder:
+    """Build the objects of a glade file from their class."""
+
+    def __init__(self):
+        """Constructor method."""
+        self.objects = {}
+
+    def add_from_string(self, source: str):
+        """Create the objects declared in a glade file."""
+        for element in ElementTree.fromstring(source).iter("object"):
+            if (object_id := element.get("id")) is not None:
+                self.objects[object_id] = _CLASSES.get(element.get("class"), Widget)()
+
+    def get_object(self, object_id: str):
+        """Return an object by id, created as a plain widget if it was not declared."""
+        if object_id not in self.objects:
+            self.objects[object_id] = Widget()
+        return self.objects[object_id]
+
+    def connect_signals(self, _):
+        """The benchmarks call the handlers themselves."""
+
+
+def idle_add(function, *args):
+    """Call a function on the main loop, see ``run_pending``."""
+    _PENDING.put((function, args))
+    return 0
+
+
+def timeout_add(*_):
+    """The timeouts never expire, the benchmarks never wait on them."""
+    return 0
+
+
+def run_pending(until=None, timeout: float = 60.0):
+    """
+    Run the callbacks added by ``idle_add``, as the main loop would.
+
+    Parameters
+    ----------
+    until : function
+        Keep waiting for callbacks, added by other threads, until this returns True. By default
+        only the callbacks already added are run.
+    timeout : float
+        Seconds to wait for a callback before giving up.
+    """
+    while (until is not None and not until()) or not _PENDING.empty():
+        function, args = _PENDING.get(timeout=timeout)
+        if function(*args):
+            _PENDING.put((function, args))
+
+
+def install():
+    """Make ``gi.repository.Gtk`` and ``gi.repository.GLib`` these stand-ins."""
+    gtk = types.ModuleType("gi.repository.Gtk")
+    for widget_class in ("Adjustment", "Button", "CheckButton", "Image", "Label", "SpinButton"):
+        setattr(gtk, widget_class, Widget)
+    gtk.ComboBoxText = ComboBoxText
+    gtk.Grid = Grid
+    gtk.ListStore = ListStore
+    gtk.TreeRowReference = TreeRowReference
+    gtk.Dialog = Dialog
+    gtk.ResponseType = ResponseType
+    gtk.Builder = Builder
+    gtk.STOCK_OK, gtk.STOCK_CANCEL, gtk.STOCK_REMOVE = "gtk-ok", "gtk-cancel", "gtk-remove"
+    gtk.main = gtk.main_quit = lambda *_: None
+
+    glib = types.ModuleType("gi.repository.GLib")
+    glib.idle_add = idle_add
+    glib.timeout_add = glib.timeout_add_seconds = timeout_add
+    glib.source_remove = lambda *_: True
+
+    repository = types.ModuleType("gi.repository")
+    repository.Gtk, repository.GLib = gtk, glib
+    gi = types.ModuleType("gi")
+    gi.require_version = lambda *_: None
+    gi.repository = repository
+    sys.modules.update({"gi": gi, "gi.repository": repository})
+    sys.modules.update({"gi.repository.Gtk": gtk, "gi.repository.GLib": glib})
@@ -0,0 +1,69 @@
+"""Synthetic rosters: random players whose perks meet the requirements of the game."""
+
+import os
+import random
+
+from waste import gamedata
+from waste.batch import MAX_SKILL_RANK
+from waste.perks import PerkEligibility
+from waste.player import encode_player_data, new_player
+
+MAX_LEVEL = 20
+SPECIAL_RANGE = (4, 10)
+
+
+def generate_player(rng: random.Random, name: str):
+    """
+    Return a random Player: random S.P.E.C.I.A.L., skills and origin, and one perk per level
+    picked among the perks available at that time.
+    """
+    player = new_player()
+    player.name = name
+    player.data["LVL"] = rng.randint(1, MAX_LEVEL)
+    player.data["ORIGIN"] = rng.randint(-1, len(gamedata.origins()) - 1)
+    for stat in gamedata.special():
+        player.data["SPECIAL"][stat] = rng.randint(*SPECIAL_RANGE)
+    player.data["LUCKY_POINT"] = rng.randint(0, player.data["SPECIAL"]["LCK"])
+    player.data["HEALTH_POINT"] = player.data["SPECIAL"]["END"] + player.data["LVL"]
+
+    for skill_id in rng.sample(range(len(gamedata.skills())), rng.randint(0, 8)):
+        player.skills[str(skill_id)] = [rng.randint(1, MAX_SKILL_RANK), rng.randint(0, 1)]
+
+    eligibility = PerkEligibility(player)
+    for _ in range(player.data["LVL"]):
+        if not (available := eligibility.sync()):
+            break
+        perk_id = str(rng.choice(available))
+        player.perks[perk_id] = player.perks.get(perk_id, 0) + 1
+    return player
+
+
+def generate_roster(directory: str, count: int, seed: int = 0):
+    """
+    Write a synthetic roster of players' files in a directory.
+
+    Parameters
+    ----------
+    directory : str
+        The players' directory, created if needed.
+    count : int
+        The number of players.
+    seed : int
+        The seed of the random generator, the same seed gives the same roster.
+
+    Returns
+    -------
+    list
+        The names of the files written.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    filenames = []
+    for player_id in range(1, count + 1):
+        player = generate_player(rng, f"Joueur {player_id}")
+        filename = os.path.join(directory, f"player_{player_id}.json")
+        # A throwaway roster does not need the durability of the saves
+        with open(filename, "wb") as file:
+            file.write(encode_player_data(player.to_dict()))
+        filenames.append(filename)
+    return filenames
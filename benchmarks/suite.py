@@ -0,0 +1,229 @@
+"""
+The benchmarks of the hot paths, run in a working directory holding a synthetic roster.
+
+Each benchmark returns its measures as {"seconds": ..., "count": ..., "per_second": ...}, the
+seconds being the best of several runs.
+"""
+
+import gc
+import os
+import time
+
+from benchmarks import gtk
+from waste import gamedata
+from waste.perks import PerkEligibility, get_index
+from waste.player import PLAYERS_DIR, load_player
+from waste.roster import manifest_log_path, manifest_path
+
+# The benchmarks, in the order they are run: (name, function)
+BENCHMARKS = []
+
+
+def benchmark(function):
+    """Register a benchmark, named after its function."""
+    BENCHMARKS.append((function.__name__.replace("bench_", "", 1), function))
+    return function
+
+
+def measure(function, count: int, repeat: int, setup=None):
+    """
+    Time a function.
+
+    Parameters
+    ----------
+    function : function
+        The code to time.
+    count : int
+        The number of operations done by each call of the function.
+    repeat : int
+        The number of runs, the fastest one is kept.
+    setup : function
+        Called before each run, out of the timing.
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    seconds = min(durations)
+    return {"seconds": seconds, "count": count, "per_second": count / seconds if seconds else None}
+
+
+class Context:
+    """The roster the benchmarks work on."""
+
+    def __init__(self, filenames: list, sample: int, repeat: int):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        filenames : list
+            The players' files of the roster, relative to the working directory.
+        sample : int
+            The number of players used by the benchmarks on single players.
+        repeat : int
+            The number of runs of each benchmark.
+        """
+        self.filenames = filenames
+        self.repeat = repeat
+        step = max(1, len(filenames) // sample)
+        self.players = [load_player(filename) for filename in filenames[::step][:sample]]
+
+
+def _load_roster():
+    """Load the roster in a new main window, as the refresh button does."""
+    # Imported here, the GTK stand-ins have to be installed first
+    from waste import roster, ui  # pylint: disable=import-outside-toplevel
+
+    roster._MANIFESTS.clear()  # pylint: disable=protected-access
+    handler = ui.MainHandler(ui.new_builder("waste.glade"))
+    handler.on_update_player_clicked()
+    gtk.run_pending(until=lambda: handler.loader is None)
+    return handler
+
+
+def _remove_manifest():
+    """Remove the manifest and its log, so every file has to be read again."""
+    for path in (manifest_path(PLAYERS_DIR), manifest_log_path(PLAYERS_DIR)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@benchmark
+def bench_roster_load_cold(context: Context):
+    """Load the roster without manifest: every player's file is parsed."""
+    return measure(_load_roster, len(context.filenames), context.repeat, setup=_remove_manifest)
+
+
+@benchmark
+def bench_roster_load_warm(context: Context):
+    """Load the roster from an up to date manifest."""
+    _load_roster()
+    return measure(_load_roster, len(context.filenames), context.repeat)
+
+
+@benchmark
+def bench_save_in_file(context: Context):
+    """Save players changed by one field."""
+
+    def save():
+        for player in context.players:
+            player.data["DEFENSE"] += 1
+            player.save_in_file()
+
+    return measure(save, len(context.players), context.repeat)
+
+
+@benchmark
+def bench_restore_from_file(context: Context):
+    """Read players back from their files."""
+
+    def restore():
+        for player in context.players:
+            player.restore_from_file()
+
+    return measure(restore, len(context.players), context.repeat)
+
+
+@benchmark
+def bench_check_requirements(context: Context):
+    """Check the requirements of every rank of every perk."""
+    requirements = [ranks for perk in gamedata.perks() for ranks in perk["requirements"]]
+
+    def check():
+        for player in context.players:
+            for rank_requirements in requirements:
+                player.check_requirements(rank_requirements)
+
+    return measure(check, len(context.players) * len(requirements), context.repeat)
+
+
+@benchmark
+def bench_perk_eligibility(context: Context):
+    """Compute the perks available to players from scratch."""
+    index = get_index()
+
+    def compute():
+        for player in context.players:
+            PerkEligibility(player, index)
+
+    return measure(compute, len(context.players), context.repeat)
+
+
+@benchmark
+def bench_perk_eligibility_sync(context: Context):
+    """Update the perks available to players after a change of S.P.E.C.I.A.L."""
+    index = get_index()
+    caches = [PerkEligibility(player, index) for player in context.players]
+
+    def sync():
+        for cache in caches:
+            special = cache.player.data["SPECIAL"]
+            special["STR"] = 14 - special["STR"]
+            cache.sync()
+
+    return measure(sync, len(caches), context.repeat)
+
+
+@benchmark
+def bench_perk_list_filter(context: Context):
+    """Filter the perks' combo list of the editor from one player to the next one."""
+    from waste import ui  # pylint: disable=import-outside-toplevel
+
+    index = get_index()
+    available = [PerkEligibility(player, index).sync() for player in context.players]
+    perks = gamedata.perks()
+
+    def update():
+        combo, shown = gtk.ComboBoxText(), []
+        for perk_ids in available:
+            ui._sync_combo(  # pylint: disable=protected-access
+                combo, shown, perk_ids, lambda perk_id: perks[perk_id]["name"]
+            )
+
+    return measure(update, len(available), context.repeat)
+
+
+def _new_editor():
+    """Return the handler of a new editor window."""
+    from waste import ui  # pylint: disable=import-outside-toplevel
+
+    return ui.EditHandler(ui.new_builder("edit_player.glade"))
+
+
+@benchmark
+def bench_editor_load(context: Context):
+    """Display players in the editor, the grids are updated from one player to the next one."""
+    handler = _new_editor()
+
+    def load():
+        for player in context.players:
+            handler.load(player)
+
+    return measure(load, len(context.players), context.repeat)
+
+
+@benchmark
+def bench_editor_perk_edit(context: Context):
+    """Add a rank of an available perk then remove it, the perks' grid is updated each time."""
+    handler = _new_editor()
+    perks_list = handler.builder.get_object("perks_list")
+
+    def edit():
+        for player in context.players:
+            handler.load(player)
+            if (perk_id := perks_list.rows[0][0] if perks_list.rows else None) is None:
+                continue
+            perks_list.set_active(0)
+            handler.on_add_perk_clicked()
+            handler.on_suppr_perk_clicked(None, perk_id)
+            gtk.run_pending()
+            handler.on_discard_clicked()
+
+    return measure(edit, len(context.players), context.repeat)
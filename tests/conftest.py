@@ -0,0 +1,29 @@
+"""Shared fixtures: random players saved in a temporary players' directory."""
+
+import random
+
+import pytest
+
+from benchmarks.roster import generate_player
+
+
+@pytest.fixture
+def players_dir(tmp_path):
+    """An empty players' directory."""
+    directory = tmp_path / "players"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture
+def make_player(players_dir):
+    """Return a function saving a new random player in the players' directory."""
+    rng = random.Random(0)
+
+    def make(player_id: int = 1, extension: str = "json"):
+        player = generate_player(rng, f"Joueur {player_id}")
+        player.filename = str(players_dir / f"player_{player_id}.{extension}")
+        player.save_in_file(force=True)
+        return player
+
+    return make
@@ -0,0 +1,39 @@
+"""The exact distributions of the skill tests, against every roll enumerated."""
+
+import itertools
+
+import pytest
+
+from waste import dice
+
+
+def brute_force(target: int, critical: int, complication_range: int, dice_count: int):
+    """Count the rolls giving each (successes, complications), one roll at a time."""
+    counts = {}
+    for roll in itertools.product(range(1, dice.DIE_FACES + 1), repeat=dice_count):
+        successes = sum(2 if face <= critical else 1 if face <= target else 0 for face in roll)
+        complications = sum(face > dice.DIE_FACES - complication_range for face in roll)
+        counts[successes, complications] = counts.get((successes, complications), 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize(
+    "critical, complication_range, dice_count",
+    [(1, 1, 2), (3, 1, 2), (6, 2, 2), (1, 3, 3), (4, 1, 3)],
+)
+def test_table_against_brute_force(critical, complication_range, dice_count):
+    distributions = dice.table(critical, complication_range, dice_count)
+    assert len(distributions) == dice.DIE_FACES + 1
+    for target, counts in enumerate(distributions):
+        expected = brute_force(target, critical, complication_range, dice_count)
+        assert sum(map(sum, counts)) == dice.DIE_FACES**dice_count
+        for successes, row in enumerate(counts):
+            for complications, count in enumerate(row):
+                assert count == expected.get((successes, complications), 0)
+
+
+def test_success_table():
+    chances = dice.success_table(1, 1, 2, 1)
+    assert chances[0] == pytest.approx(1 - (19 / 20) ** 2)
+    assert chances[dice.DIE_FACES] == 1
+    assert list(chances) == sorted(chances)
@@ -0,0 +1,124 @@
+"""The recovery and the compaction of the journal of the edits."""
+
+import pytest
+
+from waste import journal
+from waste.journal import Journal, get_value, journal_path, set_value
+from waste.player import load_player
+
+
+def edit(player_journal, path, value):
+    """Make an edit on the player of a journal and record it."""
+    old = get_value(player_journal.player, path)
+    set_value(player_journal.player, path, value)
+    player_journal.record(path, old, value)
+
+
+def test_recover_edits(make_player):
+    player = make_player()
+    player_journal = Journal(player)
+    edit(player_journal, ("NAME",), "Renommé")
+    # Every edit changes the random player
+    edit(player_journal, ("STAT", "DEFENSE"), player.data["DEFENSE"] + 1)
+    edit(
+        player_journal,
+        ("RESISTANCE", "ENERGY_RESISTANCE", 2),
+        player.data["ENERGY_RESISTANCE"][2] + 1,
+    )
+    edit(player_journal, ("SKILL", "4"), None if "4" in player.skills else [2, 1])
+    rank = player.perks.get("0", 0) + 1
+    edit(player_journal, ("PERK", "0"), rank)
+    player_journal.undo()
+    player_journal.close()
+    assert len(player_journal.done) == 4
+
+    # The application stopped before the save
+    recovered = load_player(player.filename)
+    recovered_journal = Journal(recovered)
+    assert recovered_journal.recover()
+    assert recovered.to_dict() == player.to_dict()
+
+    # The undo and redo stacks are recovered too
+    assert recovered_journal.redo() == ("PERK", "0")
+    assert recovered.perks["0"] == rank
+    assert recovered_journal.undo() == ("PERK", "0")
+    assert recovered_journal.undo() == ("SKILL", "4")
+
+
+def test_recover_after_save(make_player):
+    player = make_player()
+    player_journal = Journal(player)
+    edit(player_journal, ("STAT", "DEFENSE"), 9)
+    player.save_in_file()
+    player_journal.saved(player.version)
+    player_journal.close()
+
+    recovered = load_player(player.filename)
+    assert not Journal(recovered).recover()
+    assert recovered.to_dict() == player.to_dict()
+
+
+def test_recover_other_version(make_player):
+    player = make_player()
+    player_journal = Journal(player)
+    edit(player_journal, ("STAT", "DEFENSE"), 9)
+    player_journal.close()
+
+    # Saved by another instance: the journal no longer applies
+    other = load_player(player.filename)
+    other.save_in_file(force=True)
+    recovered = load_player(player.filename)
+    assert not Journal(recovered).recover()
+    assert recovered.data["DEFENSE"] == other.data["DEFENSE"]
+
+
+def test_recover_missing_or_broken(make_player):
+    player = make_player()
+    assert not Journal(player).recover()
+
+    with open(journal_path(player.filename), "w", encoding="utf-8") as file:
+        file.write("{not json\n")
+    assert not Journal(player).recover()
+
+
+@pytest.mark.parametrize("undone", [0, 5])
+def test_compaction(monkeypatch, make_player, undone):
+    monkeypatch.setattr(journal, "COMPACT_SIZE", 16)
+    player = make_player()
+    player_journal = Journal(player)
+    for value in range(100):
+        edit(player_journal, ("STAT", "DEFENSE"), value)
+    for _ in range(undone):
+        player_journal.undo()
+    player_journal.close()
+
+    with open(player_journal.path, "r", encoding="utf-8") as file:
+        lines = file.readlines()
+    assert len(lines) <= 100 + 1 + journal.COMPACT_SIZE
+
+    recovered = load_player(player.filename)
+    recovered_journal = Journal(recovered)
+    assert recovered_journal.recover()
+    assert recovered.to_dict() == player.to_dict()
+    assert recovered.data["DEFENSE"] == 99 - undone
+    assert len(recovered_journal.undone) == undone
+    assert len(recovered_journal.done) == 100 - undone
+
+
+def test_compaction_undo_limit(monkeypatch, make_player):
+    monkeypatch.setattr(journal, "COMPACT_SIZE", 16)
+    monkeypatch.setattr(journal, "UNDO_LIMIT", 10)
+    player = make_player()
+    player_journal = Journal(player)
+    for value in range(100):
+        edit(player_journal, ("STAT", "DEFENSE"), value)
+    player_journal.close()
+
+    with open(player_journal.path, "r", encoding="utf-8") as file:
+        assert len(file.readlines()) <= 1 + 10 + journal.COMPACT_SIZE
+
+    recovered = load_player(player.filename)
+    recovered_journal = Journal(recovered)
+    recovered_journal.recover()
+    assert recovered.data["DEFENSE"] == 99
+    assert len(recovered_journal.done) <= 10 + journal.COMPACT_SIZE
@@ -0,0 +1,100 @@
+"""The save formats and the versioned saves of the players."""
+
+import pytest
+
+from waste.concurrency import ConflictError
+from waste.player import (
+    BINARY_MAGIC,
+    decode_player_data,
+    encode_player_data,
+    load_player,
+    read_player_file,
+    write_player_file,
+)
+
+
+@pytest.mark.parametrize("save_format", ["json", "compact", "binary"])
+def test_encode_decode_round_trip(make_player, save_format):
+    player_data = make_player().to_dict()
+    payload = encode_player_data(player_data, save_format)
+    assert payload.startswith(BINARY_MAGIC) == (save_format == "binary")
+    assert decode_player_data(payload) == player_data
+
+
+def test_encode_unknown_format(make_player):
+    with pytest.raises(ValueError):
+        encode_player_data(make_player().to_dict(), "yaml")
+
+
+def test_decode_unsupported_binary_version():
+    with pytest.raises(ValueError):
+        decode_player_data(BINARY_MAGIC + b"\xff" + b"data")
+
+
+def test_load_saved_player(make_player):
+    player = make_player()
+    loaded = load_player(player.filename)
+    assert loaded.to_dict() == player.to_dict()
+    assert not loaded.dirty_fields()
+
+
+def test_write_player_file_conflict(make_player):
+    player = make_player()
+    payload = encode_player_data(player.to_dict())
+    write_player_file(player.filename, payload, player.version)
+
+    with pytest.raises(ConflictError) as error:
+        write_player_file(player.filename, payload, player.version - 1)
+    assert error.value.version == player.version
+    assert error.value.expected == player.version - 1
+
+
+def test_write_player_file_new_file(players_dir, make_player):
+    payload = encode_player_data(make_player().to_dict())
+    filename = str(players_dir / "player_2.json")
+    with pytest.raises(ConflictError):
+        write_player_file(filename, payload, 1)
+    write_player_file(filename, payload, 0)
+    assert read_player_file(filename) == decode_player_data(payload)
+
+
+def test_save_conflict_with_another_instance(make_player):
+    player = make_player()
+    other = load_player(player.filename)
+    other.data["DEFENSE"] += 1
+    assert other.save_in_file()
+
+    player.data["DEFENSE"] += 2
+    version = player.version
+    with pytest.raises(ConflictError):
+        player.save_in_file()
+    # The changes are kept for the next save
+    assert player.version == version
+    assert "DEFENSE" in player.dirty_fields()
+
+
+def test_aborted_save_chain(monkeypatch, make_player):
+    player = make_player()
+    version = player.version
+    player.data["DEFENSE"] += 1
+    first = player.prepare_save()
+    player.data["DEFENSE"] += 1
+    second = player.prepare_save()
+
+    def fail(*_):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("waste.player.write_atomic", fail)
+    with pytest.raises(OSError):
+        first.write()
+    first.abort()
+    monkeypatch.undo()
+
+    # The later save expected the first one to be written
+    with pytest.raises(ConflictError):
+        second.write()
+    second.abort()
+
+    assert player.version == version == read_player_file(player.filename)["VERSION"]
+    assert player.save_in_file()
+    assert read_player_file(player.filename) == player.to_dict()
@@ -0,0 +1,106 @@
+"""The refreshes of the roster manifest, with the files saved by other instances."""
+
+import os
+import time
+
+from waste.player import encode_player_data, load_player, write_player_file
+from waste.roster import Manifest, get_manifest
+
+
+def other_instance_write(player, filename: str, expected_version: int):
+    """Write a player's file as another instance does: not recorded in this manifest."""
+    # The directory's modification time has a coarse resolution on some file systems
+    time.sleep(0.02)
+    player_data = player.to_dict()
+    player_data["VERSION"] = expected_version + 1
+    write_player_file(filename, encode_player_data(player_data), expected_version)
+
+
+def test_own_saves_keep_manifest_current(players_dir, make_player):
+    manifest = get_manifest(str(players_dir))
+    player = make_player(1)
+    manifest.refresh()
+    assert manifest.is_current()
+
+    time.sleep(0.02)
+    player.data["DEFENSE"] += 1
+    assert player.save_in_file()
+    make_player(2)
+    assert manifest.is_current()
+    assert manifest.entries[player.filename].player is player
+
+    # Another instance reads the manifest and its log, without reading the files again
+    restarted = Manifest(str(players_dir))
+    assert restarted.is_current()
+    assert set(restarted.entries) == set(manifest.entries)
+    assert restarted.entries[player.filename].to_dict() == (
+        manifest.entries[player.filename].to_dict()
+    )
+
+
+def test_refresh_finds_files_of_other_instances(players_dir, make_player):
+    manifest = get_manifest(str(players_dir))
+    player = make_player(1)
+    manifest.refresh()
+
+    other_filename = str(players_dir / "player_2.json")
+    other_instance_write(player, other_filename, 0)
+
+    # The save of this instance does not hide the file added by the other one
+    time.sleep(0.02)
+    assert player.save_in_file(force=True)
+    assert not manifest.is_current()
+    added, changed, removed = manifest.refresh()
+    assert [entry.filename for entry in added] == [other_filename]
+    assert not changed and not removed
+    assert manifest.is_current()
+
+    # Nor is it hidden after a restart
+    other_instance_write(player, str(players_dir / "player_3.json"), 0)
+    time.sleep(0.02)
+    assert player.save_in_file(force=True)
+    restarted = Manifest(str(players_dir))
+    assert not restarted.is_current()
+    added, _, _ = restarted.refresh()
+    assert [entry.filename for entry in added] == [str(players_dir / "player_3.json")]
+
+
+def test_refresh_restores_changed_players(players_dir, make_player):
+    manifest = get_manifest(str(players_dir))
+    player = make_player(1)
+    edited = make_player(2)
+    manifest.refresh()
+    assert manifest.entries[player.filename].player is player
+
+    changed_player = load_player(player.filename)
+    changed_player.data["DEFENSE"] += 3
+    other_instance_write(changed_player, player.filename, player.version)
+    edited.editing = True
+    other_instance_write(load_player(edited.filename), edited.filename, edited.version)
+    manifest.entries[edited.filename]._player = edited  # pylint: disable=protected-access
+
+    _, changed, _ = manifest.refresh()
+    assert {entry.filename for entry in changed} == {player.filename, edited.filename}
+    # The Player is restored in place, unless it is being edited
+    assert player.data["DEFENSE"] == changed_player.data["DEFENSE"]
+    assert player.version == changed_player.version + 1
+    assert manifest.entries[edited.filename].stale
+
+
+def test_refresh_removed_files(players_dir, make_player):
+    manifest = get_manifest(str(players_dir))
+    player = make_player(1)
+    kept = make_player(2)
+    manifest.refresh()
+
+    time.sleep(0.02)
+    os.remove(player.filename)
+    _, _, removed = manifest.refresh()
+    assert [entry.filename for entry in removed] == [player.filename]
+    assert list(manifest.entries) == [kept.filename]
+
+    manifest.delete(kept.filename)
+    assert not manifest.entries
+    assert manifest.is_current()
+    # Its journal and its lock are removed with it
+    assert os.listdir(players_dir) == [".player_1.json.lock"]
@@ -1,20 +1,236 @@
-"""Main function to run the UI."""
-import gi
-gi.require_version("Gtk", "3.0")
+"""Main function to run the UI, or the headless commands."""
+import time
 
-from gi.repository import Gtk
+# The imports of this module are part of the startup profile
+IMPORTS_START = time.perf_counter()
 
-from waste.ui import MainHandler
+# pylint: disable=wrong-import-position
+import argparse
+import sys
 
+from waste import gamedata, planner, sync, tracing
+from waste.perks import get_index
+from waste.player import PLAYERS_DIR
+from waste.profiling import StartupProfile
+from waste.storage import DATABASE_PATH, STORAGE
+
+
+def run_ui(profile: StartupProfile, trace: str = "", serve: str = ""):
+    """
+    Run the GTK interface. The window is shown first, the roster and the game's data are
+    loaded once it has been drawn. The handlers are traced in the given Chrome trace file, if
+    any, and the roster is served to the players' devices on the given address, if any.
+    """
+    with profile.phase("imports"):
+        import gi  # pylint: disable=import-outside-toplevel
+        gi.require_version("Gtk", "3.0")
+
+        from gi.repository import GLib, Gtk  # pylint: disable=import-outside-toplevel
+
+        from waste.ui import MainHandler, new_builder  # pylint: disable=import-outside-toplevel
+
+    if trace:
+        # Before any handler is connected to a signal
+        tracing.install(trace)
 
-def main():
     # builder
-    builder = Gtk.Builder()
-    builder.add_from_file("waste/ui/waste.glade")
-    builder.connect_signals(MainHandler(builder))
-    window = builder.get_object("main_window")
-    window.connect("destroy", Gtk.main_quit)
+    with profile.phase("glade parse"):
+        builder = new_builder("waste.glade")
+        handler = MainHandler(builder)
+        builder.connect_signals(handler)
+        window = builder.get_object("main_window")
+        window.connect("destroy", Gtk.main_quit)
+
+    def after_first_frame():
+        handler.start(profile)
+        if serve:
+            sync.start(serve, handler.roster)
+        # Warm the data up for the editor, it is not needed by the main window
+        with profile.phase("data load"):
+            for table in gamedata.TABLES:
+                gamedata.REGISTRY[table]  # pylint: disable=pointless-statement
+            get_index()
+        profile.report()
+        return False
+
+    def on_first_draw(*_):
+        window.disconnect(draw_handler)
+        profile.mark("first frame")
+        GLib.idle_add(after_first_frame)
+        return False
+
+    draw_handler = window.connect_after("draw", on_first_draw)
 
     # main loop
     window.show_all()
     Gtk.main()
+
+
+def parse_args(args=None):
+    """Parse the command line."""
+    parser = argparse.ArgumentParser(
+        prog="waste-run", description="Wasteland Adventure Support Tool and Enhancer"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print the duration of each phase of the startup of the interface",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        default=tracing.TRACE_FILE,
+        help="trace the handlers of the interface in a Chrome trace file, and print the slowest"
+        " ones at exit",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        default=sync.SYNC_ADDRESS,
+        help="serve the roster and the edits live to the players' devices (default host:"
+        f" {sync.DEFAULT_HOST}, use 0.0.0.0 for the local network)",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    for command, help_message in (
+        ("validate", "check every player's file against the schema and the rules of the game"),
+        ("report", "summarize every player's file"),
+        ("recompute", "rebuild the roster manifest and list the available perks of each player"),
+    ):
+        subparser = commands.add_parser(command, help=help_message)
+        subparser.add_argument(
+            "directory", nargs="?", default=PLAYERS_DIR, help="the players' directory"
+        )
+        subparser.add_argument(
+            "-j", "--jobs", type=int, default=None, help="number of processes (default: all CPUs)"
+        )
+
+    for command, help_message in (
+        ("migrate", "copy every player's file of the directory into the database"),
+        ("export", "write every player of the database as a file of the directory"),
+    ):
+        subparser = commands.add_parser(command, help=help_message)
+        subparser.add_argument(
+            "directory", nargs="?", default=PLAYERS_DIR, help="the players' directory"
+        )
+        subparser.add_argument(
+            "--database", default=DATABASE_PATH, help=f"the database (default: {DATABASE_PATH})"
+        )
+
+    for command, help_message in (
+        ("archive", "write the whole roster in a single bundle file"),
+        ("restore", "merge the players of a bundle file into the roster"),
+    ):
+        subparser = commands.add_parser(command, help=help_message)
+        subparser.add_argument("bundle", help="the bundle file")
+        subparser.add_argument(
+            "directory", nargs="?", default=PLAYERS_DIR, help="the players' directory"
+        )
+        subparser.add_argument(
+            "--database",
+            default=DATABASE_PATH if STORAGE == "sqlite" else None,
+            help="use this database instead of the directory",
+        )
+        subparser.add_argument(
+            "-j", "--jobs", type=int, default=None, help="number of processes (default: all CPUs)"
+        )
+
+    subparser = commands.add_parser(
+        "matrix", help="list the perks each player can take, in one vectorized pass (NumPy)"
+    )
+    subparser.add_argument(
+        "directory", nargs="?", default=PLAYERS_DIR, help="the players' directory"
+    )
+    subparser.add_argument(
+        "--level", type=int, default=None, help="check the players as if they were at this level"
+    )
+    subparser.add_argument(
+        "--perk", type=int, default=None, help="only list the players that can take this perk"
+    )
+
+    subparser = commands.add_parser(
+        "plan", help="find the lowest level at which a player can have the given perks"
+    )
+    subparser.add_argument("player", help="the player's file")
+    subparser.add_argument(
+        "perks", nargs="+", type=planner.parse_wish, help="the wished perks, as id or id:rank"
+    )
+
+    subparser = commands.add_parser("odds", help="give the odds of every skill test of a player")
+    subparser.add_argument("player", help="the player's file")
+    subparser.add_argument(
+        "-d", "--difficulty", type=int, default=1, help="the successes needed (default: 1)"
+    )
+    subparser.add_argument(
+        "--extra-dice", type=int, default=0, help="the dice bought with Lucky Points"
+    )
+    subparser.add_argument(
+        "--complication-range",
+        type=int,
+        default=1,
+        help="the number of faces, from 20, that are complications (default: 1)",
+    )
+
+    args = parser.parse_args(args)
+    if args.command == "matrix" and args.perk is not None:
+        if not 0 <= args.perk < len(gamedata.perks()):
+            parser.error(f"unknown perk: {args.perk}")
+    return args
+
+
+def main():
+    profile = StartupProfile(origin=IMPORTS_START)
+    profile.mark("main")
+    args = parse_args()
+    profile.enabled = args.profile_startup
+
+    if args.command is None:
+        run_ui(profile, args.trace, args.serve)
+        return
+
+    if args.command in ("migrate", "export"):
+        from waste import roster  # pylint: disable=import-outside-toplevel
+
+        if args.command == "migrate":
+            count = roster.migrate(args.directory, args.database)
+            print(f"{count} players copied into {args.database}")
+        else:
+            count = roster.export(args.database, args.directory)
+            print(f"{count} players written in {args.directory}")
+        return
+
+    if args.command in ("archive", "restore"):
+        from waste import bundle  # pylint: disable=import-outside-toplevel
+
+        if args.command == "archive":
+            count = bundle.archive(args.bundle, args.directory, args.database, args.jobs)
+            print(f"{count} players written in {args.bundle}")
+            return
+        sys.exit(bundle.restore(args.bundle, args.directory, args.database, args.jobs))
+
+    if args.command == "matrix":
+        try:
+            from waste import matrix  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            sys.exit("waste-run matrix needs NumPy: pip install WASTE[matrix]")
+        from waste.batch import list_player_files  # pylint: disable=import-outside-toplevel
+
+        sys.exit(matrix.run(list_player_files(args.directory), args.level, args.perk))
+
+    if args.command == "plan":
+        sys.exit(planner.run(args.player, dict(args.perks)))
+
+    if args.command == "odds":
+        from waste import dice  # pylint: disable=import-outside-toplevel
+
+        sys.exit(
+            dice.run(args.player, args.difficulty, args.extra_dice, args.complication_range)
+        )
+
+    from waste import batch  # pylint: disable=import-outside-toplevel
+
+    sys.exit(batch.run(args.command, args.directory, args.jobs))
+
+
+if __name__ == "__main__":
+    main()
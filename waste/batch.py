@@ -0,0 +1,254 @@
+"""Headless commands run on a whole players' directory, spread over a pool of processes."""
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from waste import gamedata
+from waste.perks import CN_INDEX, DN_INDEX, eligibility
+from waste.player import PLAYERS_DIR, Player, _split_file_data, read_player_file
+from waste.roster import PLAYER_EXTENSIONS, Manifest, RosterEntry
+
+INT_FIELDS = ("LVL", "ORIGIN", "HEALTH_POINT", "LUCKY_POINT", "CARRY_WEIGHT", "DEFENSE")
+RESISTANCES_FIELDS = (
+    "PHYSICAL_RESISTANCE",
+    "ENERGY_RESISTANCE",
+    "RADIATION_RESISTANCE",
+    "POISON_RESISTANCE",
+)
+MAX_SKILL_RANK = 6
+
+
+def _is_int(value):
+    """Check if a value is an int (booleans excluded)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def check_schema(player_data: dict):
+    """Return the list of the errors in the structure of a player's file."""
+    errors = []
+
+    if not isinstance(player_data.get("NAME"), str):
+        errors.append("NAME: missing or not a string")
+
+    for field in INT_FIELDS:
+        if not _is_int(player_data.get(field)):
+            errors.append(f"{field}: missing or not an integer")
+
+    for field in RESISTANCES_FIELDS:
+        value = player_data.get(field)
+        if not isinstance(value, list) or len(value) != 6 or not all(map(_is_int, value)):
+            errors.append(f"{field}: expected a list of 6 integers")
+
+    if "VERSION" in player_data and not _is_int(player_data["VERSION"]):
+        errors.append("VERSION: not an integer")
+
+    special = player_data.get("SPECIAL")
+    if not isinstance(special, dict) or set(special) != set(gamedata.special()):
+        errors.append(f"SPECIAL: expected the keys {', '.join(gamedata.special())}")
+    elif not all(map(_is_int, special.values())):
+        errors.append("SPECIAL: values must be integers")
+
+    skills = player_data.get("SKILLS")
+    if not isinstance(skills, dict):
+        errors.append("SKILLS: missing or not a dictionnary")
+    else:
+        for skill_id, value in skills.items():
+            if not skill_id.isdigit() or int(skill_id) >= len(gamedata.skills()):
+                errors.append(f"SKILLS: unknown skill {skill_id}")
+            elif (
+                not isinstance(value, list)
+                or len(value) != 2
+                or not _is_int(value[0])
+                or not 0 <= value[0] <= MAX_SKILL_RANK
+                or value[1] not in (0, 1)
+            ):
+                errors.append(f"SKILLS: {skill_id} must be [rank (0-{MAX_SKILL_RANK}), tag (0/1)]")
+
+    perks = player_data.get("PERKS")
+    if not isinstance(perks, dict):
+        errors.append("PERKS: missing or not a dictionnary")
+    else:
+        for perk_id, rank in perks.items():
+            if not perk_id.isdigit() or int(perk_id) >= len(gamedata.perks()):
+                errors.append(f"PERKS: unknown perk {perk_id}")
+            elif not _is_int(rank):
+                errors.append(f"PERKS: rank of {perk_id} is not an integer")
+
+    return errors
+
+
+def check_rules(player: Player):
+    """Return the list of the players' perks that break the rules of the game."""
+    errors = []
+    perks = gamedata.perks()
+
+    origin = player.data["ORIGIN"]
+    if not -1 <= origin < len(gamedata.origins()):
+        errors.append(f"ORIGIN: unknown origin {origin}")
+
+    for perk_id, rank in player.perks.items():
+        perk = perks[int(perk_id)]
+        if not 1 <= rank <= perk["rank"]:
+            errors.append(f"PERKS: {perk['name']} at rank {rank}, limit is {perk['rank']}")
+            continue
+
+        # The requirements of each rank taken have to be met
+        for current_rank, requirements in enumerate(perk["requirements"][:rank]):
+            if not player.check_requirements(requirements):
+                errors.append(
+                    f"PERKS: requirements of {perk['name']} not met for rank {current_rank + 1}"
+                )
+                break
+
+    if str(DN_INDEX) in player.perks and str(CN_INDEX) in player.perks:
+        errors.append(
+            f"PERKS: {perks[DN_INDEX]['name']} and {perks[CN_INDEX]['name']} are exclusive"
+        )
+
+    return errors
+
+
+def _load(filename: str):
+    """Read a player's file, returns its raw data and the errors found."""
+    try:
+        player_data = read_player_file(filename)
+    except (OSError, ValueError) as error:
+        return None, [f"unreadable file: {error}"]
+    if not isinstance(player_data, dict):
+        return None, ["unreadable file: not a player"]
+    return player_data, check_schema(player_data)
+
+
+def validate_file(filename: str):
+    """Check a player's file against the schema and the rules of the game."""
+    player_data, errors = _load(filename)
+    if not errors:
+        errors = check_rules(Player(*_split_file_data(filename, player_data)))
+    return {
+        "file": filename,
+        "name": player_data.get("NAME") if player_data else None,
+        "valid": not errors,
+        "errors": errors,
+    }
+
+
+def report_file(filename: str):
+    """Summarize a player's file."""
+    player_data, errors = _load(filename)
+    if errors:
+        return {"file": filename, "valid": False, "errors": errors}
+
+    player = Player(*_split_file_data(filename, player_data))
+    return {
+        "file": filename,
+        "valid": True,
+        "name": player.name,
+        "LVL": player.data["LVL"],
+        "ORIGIN": player.data["ORIGIN"],
+        "SPECIAL": dict(player.data["SPECIAL"]),
+        "skills": len(player.skills),
+        "tagged_skills": sum(tagged for _, tagged in player.skills.values()),
+        "perks": len(player.perks),
+        "perk_ranks": sum(player.perks.values()),
+        "available_perks": len(eligibility(player).sync()),
+    }
+
+
+def recompute_file(filename: str):
+    """Recompute the roster manifest's entry and the available perks of a player's file."""
+    player_data, errors = _load(filename)
+    if errors:
+        return {"file": filename, "valid": False, "errors": errors}
+
+    stat = os.stat(filename)
+    player = Player(*_split_file_data(filename, player_data))
+    return {
+        "file": filename,
+        "valid": True,
+        "entry": RosterEntry(
+            filename,
+            player.name,
+            player.data["LVL"],
+            player.data["ORIGIN"],
+            stat.st_mtime_ns,
+            stat.st_size,
+        ).to_dict(),
+        "available_perks": eligibility(player).sync(),
+    }
+
+
+COMMANDS = {
+    "validate": validate_file,
+    "report": report_file,
+    "recompute": recompute_file,
+}
+
+
+def list_player_files(directory: str):
+    """Return the sorted paths of the players' files of a directory."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if not name.startswith(".") and name.endswith(PLAYER_EXTENSIONS)
+    )
+
+
+def run(command: str, directory: str = PLAYERS_DIR, jobs: int = None, output=None):
+    """
+    Run a command on every player's file of a directory and stream the results as JSON lines.
+
+    Parameters
+    ----------
+    command : str
+        "validate", "report" or "recompute".
+    directory : str
+        The players' directory.
+    jobs : int
+        The number of processes, defaults to the number of CPUs.
+    output : file
+        Where the JSON lines are written, defaults to the standard output.
+
+    Returns
+    -------
+    int
+        The exit code: 0 if every file is valid, 1 otherwise.
+    """
+    output = output or sys.stdout
+    function = COMMANDS[command]
+    directory = os.path.normpath(directory)
+    files = list_player_files(directory)
+    jobs = jobs or os.cpu_count() or 1
+    manifest = Manifest(directory) if command == "recompute" else None
+
+    exit_code = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        chunksize = max(1, len(files) // (jobs * 8))
+        for result in executor.map(function, files, chunksize=chunksize):
+            if not result["valid"]:
+                exit_code = 1
+            if manifest is not None and result["valid"]:
+                entry = result["entry"]
+                manifest.entries[result["file"]] = RosterEntry(
+                    result["file"],
+                    entry["NAME"],
+                    entry["LVL"],
+                    entry["ORIGIN"],
+                    entry["MTIME"],
+                    entry["SIZE"],
+                )
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+
+    if manifest is not None:
+        existing = set(files)
+        manifest.entries = {
+            filename: entry
+            for filename, entry in sorted(manifest.entries.items())
+            if filename in existing
+        }
+        manifest.dir_mtime = os.stat(directory).st_mtime_ns
+        manifest.write()
+
+    return exit_code
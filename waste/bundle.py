@@ -0,0 +1,447 @@
+"""
+Roster bundles: a whole roster in a single file, to move a campaign between machines.
+
+A bundle is a gzip file made of several members, so it can be read by any gzip tool:
+
+- the header, a JSON line padded to HEADER_SIZE and stored without compression, so it can be
+  rewritten in place once the roster is written: the version of the game's data, the number
+  of players, their greatest id, and the offset and the number of players of each chunk;
+- the chunks, each one a gzip member of CHUNK_SIZE JSON lines ``{"ID", "DIGEST", "PLAYER"}``.
+
+The chunks are encoded and decoded by a pool of processes, with a bounded number of chunks in
+flight, so the memory used does not depend on the size of the roster.
+"""
+
+import collections
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from waste import gamedata, storage
+from waste.batch import check_rules, check_schema
+from waste.concurrency import ConflictError
+from waste.player import (
+    BINARY_MAGIC,
+    PLAYERS_DIR,
+    Player,
+    _split_file_data,
+    allocate_filename,
+    encode_player_data,
+    read_player_file,
+    write_player_file,
+)
+from waste.roster import get_manifest, get_sqlite_roster
+
+BUNDLE_FORMAT = "waste-bundle"
+BUNDLE_VERSION = 1
+HEADER_SIZE = 16384
+CHUNK_SIZE = 256
+PLAYER_ID = re.compile(r"player_(\d+)\.(?:json|wst)$")
+
+# Digests of the players already restored, set in each process of the pool by _init_decoder
+_KNOWN_DIGESTS = frozenset()
+
+
+def _compress_header(header: dict):
+    """Return the header as a gzip member of a fixed size, None if it does not fit."""
+    line = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    if len(line) >= HEADER_SIZE:
+        return None
+    return gzip.compress(line.ljust(HEADER_SIZE - 1) + b"\n", compresslevel=0, mtime=0)
+
+
+HEADER_MEMBER_SIZE = len(_compress_header({}))
+
+
+def digest(player_data: dict):
+    """Return the digest of a player's data, the same for the same content at any version."""
+    content = {field: value for field, value in player_data.items() if field != "VERSION"}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _player_id(location: str):
+    """Return the id of a player from its file name or its location in a database."""
+    if storage.is_database_location(location):
+        return storage.parse_location(location)[1]
+    return int(PLAYER_ID.search(location).group(1))
+
+
+def _locations(directory: str, database: str):
+    """Return the sorted locations of the players of a directory or of a database."""
+    if database is not None:
+        store = storage.get_store(database)
+        return [storage.make_location(database, row[0]) for row in store.summaries()]
+    matches = filter(None, map(PLAYER_ID.fullmatch, os.listdir(directory)))
+    return [
+        os.path.join(directory, name)
+        for _, name in sorted((int(match.group(1)), match.group(0)) for match in matches)
+    ]
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    """Split a list in lists of the given size."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _bounded_map(executor, function, arguments, window: int):
+    """Like ``executor.map``, with at most ``window`` calls in flight."""
+    pending = collections.deque()
+    for argument in arguments:
+        pending.append(executor.submit(function, argument))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _encode_chunk(locations: list):
+    """Read players and return them as a chunk of the bundle, on a process of the pool."""
+    lines = []
+    for location in locations:
+        player_data = read_player_file(location)
+        record = {
+            "ID": _player_id(location),
+            "DIGEST": digest(player_data),
+            "PLAYER": player_data,
+        }
+        lines.append(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+    return gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), mtime=0), len(lines)
+
+
+def archive(
+    filename: str, directory: str = PLAYERS_DIR, database: str = None, jobs: int = None
+):
+    """
+    Write every player of a directory, or of a database, in a bundle.
+
+    Parameters
+    ----------
+    filename : str
+        The bundle.
+    directory : str
+        The players' directory.
+    database : str
+        The database to read instead of the directory.
+    jobs : int
+        The number of processes, defaults to the number of CPUs.
+
+    Returns
+    -------
+    int
+        The number of players written.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    header = {
+        "FORMAT": BUNDLE_FORMAT,
+        "BUNDLE_VERSION": BUNDLE_VERSION,
+        "DATA_VERSION": gamedata.REGISTRY.version(),
+        "COUNT": None,
+        "MAX_ID": None,
+        "CHUNKS": None,
+    }
+    locations = _locations(directory, database)
+    chunks = []
+    count = 0
+    with open(filename, "wb") as file:
+        file.write(_compress_header(header))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for member, length in _bounded_map(
+                executor, _encode_chunk, _chunks(locations), jobs * 2
+            ):
+                chunks.append((file.tell(), length))
+                file.write(member)
+                count += length
+
+        # The index is left out if it does not fit, the bundle is then read sequentially
+        header.update(
+            COUNT=count, MAX_ID=max(map(_player_id, locations), default=0), CHUNKS=chunks
+        )
+        if (member := _compress_header(header)) is None:
+            member = _compress_header({**header, "CHUNKS": None})
+        file.seek(0)
+        file.write(member)
+    return count
+
+
+def read_header(filename: str):
+    """Return the header of a bundle, raises ValueError if the file is not a bundle."""
+    with open(filename, "rb") as file:
+        member = file.read(HEADER_MEMBER_SIZE)
+    try:
+        header = json.loads(gzip.decompress(member))
+    except (OSError, EOFError, ValueError) as error:
+        raise ValueError(f"{filename} is not a roster bundle") from error
+    if header.get("FORMAT") != BUNDLE_FORMAT or header.get("BUNDLE_VERSION") != BUNDLE_VERSION:
+        raise ValueError(f"{filename} is not a roster bundle of version {BUNDLE_VERSION}")
+    return header
+
+
+def _raw_chunks(filename: str, header: dict):
+    """
+    Yield the chunks of a bundle: (filename, offset, length) to be read by the processes of
+    the pool, or the lines themselves when the bundle has no index.
+    """
+    if header["CHUNKS"] is not None:
+        ends = [offset for offset, _ in header["CHUNKS"][1:]] + [os.path.getsize(filename)]
+        for (offset, _), end in zip(header["CHUNKS"], ends):
+            yield filename, offset, end - offset
+        return
+
+    with gzip.open(filename, "rb") as file:
+        file.readline()
+        lines = []
+        for line in file:
+            lines.append(line)
+            if len(lines) == CHUNK_SIZE:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+
+
+def _max_id(filename: str, header: dict):
+    """Return the greatest id of the players of a bundle, read from the bundle if needed."""
+    if header.get("MAX_ID") is not None:
+        return header["MAX_ID"]
+    with gzip.open(filename, "rb") as file:
+        file.readline()
+        return max((json.loads(line)["ID"] for line in file), default=0)
+
+
+def _init_decoder(digests: frozenset):
+    """Give the digests of the players already restored to a process of the pool."""
+    global _KNOWN_DIGESTS  # pylint: disable=global-statement
+    _KNOWN_DIGESTS = digests
+
+
+def _decode_chunk(chunk):
+    """
+    Parse and validate a chunk of the bundle, on a process of the pool.
+
+    Returns
+    -------
+    list
+        The records, as (id, digest, name, version, level, origin, payload, errors): the
+        payload is encoded in the save format, the errors are those of ``waste-run validate``.
+        The players already restored are neither checked nor encoded.
+    """
+    if isinstance(chunk, tuple):
+        filename, offset, length = chunk
+        with open(filename, "rb") as file:
+            file.seek(offset)
+            chunk = gzip.decompress(file.read(length)).splitlines()
+
+    records = []
+    for line in chunk:
+        record = json.loads(line)
+        player_data = record["PLAYER"]
+        if (player_digest := digest(player_data)) in _KNOWN_DIGESTS:
+            records.append((record["ID"], player_digest, None, None, None, None, None, []))
+            continue
+        errors = check_schema(player_data)
+        if not errors:
+            errors = check_rules(Player(*_split_file_data("", player_data)))
+        records.append(
+            (
+                record["ID"],
+                player_digest,
+                player_data.get("NAME"),
+                player_data.get("VERSION", 0),
+                player_data.get("LVL"),
+                player_data.get("ORIGIN"),
+                None if errors else encode_player_data(player_data),
+                errors,
+            )
+        )
+    return records
+
+
+def _summarize(locations: list):
+    """Return the (id, digest, name, version) of players, on a process of the pool."""
+    summaries = []
+    for location in locations:
+        try:
+            player_data = read_player_file(location)
+        except (OSError, ValueError):
+            continue
+        summaries.append(
+            (
+                _player_id(location),
+                digest(player_data),
+                player_data.get("NAME"),
+                player_data.get("VERSION", 0),
+            )
+        )
+    return summaries
+
+
+class _Target:
+    """Where the players of a bundle are restored: a directory or a database."""
+
+    def __init__(self, directory: str, database: str):
+        """Constructor method."""
+        self.directory = directory
+        self.database = database
+        self.store = storage.get_store(database) if database is not None else None
+        if self.store is None:
+            os.makedirs(directory, exist_ok=True)
+            self.roster = get_manifest(directory)
+        else:
+            self.roster = get_sqlite_roster(database)
+
+    def location(self, player_id: int, payload: bytes):
+        """
+        Return the location of the player of an id. A player already saved in the other
+        format keeps its file, as with the saves of the editor.
+        """
+        if self.store is not None:
+            return storage.make_location(self.database, player_id)
+        extensions = ("wst", "json") if payload.startswith(BINARY_MAGIC) else ("json", "wst")
+        location, other = (
+            os.path.join(self.directory, f"player_{player_id}.{extension}")
+            for extension in extensions
+        )
+        return other if os.path.exists(other) else location
+
+    def allocate(self, payload: bytes, after: int):
+        """Return the id of a new player, greater than ``after``."""
+        if self.store is not None:
+            return _player_id(self.store.allocate(after))
+        extension = "wst" if payload.startswith(BINARY_MAGIC) else "json"
+        return _player_id(allocate_filename(extension, self.directory, after))
+
+    def write(self, player_id: int, payload: bytes, expected_version: int, summary: tuple):
+        """
+        Write a player under its lock and record it in the roster.
+
+        Parameters
+        ----------
+        player_id : int
+            The id of the player.
+        payload : bytes
+            The encoded data.
+        expected_version : int
+            The version of the player of the same id, 0 for a new id.
+        summary : tuple
+            The (name, level, origin) of the player, for the roster.
+
+        Raises
+        ------
+        ConflictError
+            If the player of the same id has been saved by another instance in the meantime.
+        """
+        location = self.location(player_id, payload)
+        dir_mtime = None if self.store is not None else os.stat(self.directory).st_mtime_ns
+        write_player_file(location, payload, expected_version)
+        self.roster.record_file(location, *summary, dir_mtime)
+
+
+def restore(
+    filename: str,
+    directory: str = PLAYERS_DIR,
+    database: str = None,
+    jobs: int = None,
+    output=None,
+):
+    """
+    Merge the players of a bundle into a directory, or a database.
+
+    A player whose content is already there is skipped. A player replaces the one of the same
+    id and name if it has a greater version, otherwise it is added under a new id when its id
+    is already taken. The new ids are greater than every id of the roster and of the bundle,
+    so they never take the id of a player restored later.
+
+    Parameters
+    ----------
+    filename : str
+        The bundle.
+    directory : str
+        The players' directory.
+    database : str
+        The database to write instead of the directory.
+    jobs : int
+        The number of processes, defaults to the number of CPUs.
+    output : file
+        Where the invalid players, the players saved by another instance meanwhile, and the
+        summary are written as JSON lines, defaults to the standard output.
+
+    Returns
+    -------
+    int
+        The exit code: 0 if every player of the bundle is valid and written, 1 otherwise.
+    """
+    output = output or sys.stdout
+    jobs = jobs or os.cpu_count() or 1
+    header = read_header(filename)
+    target = _Target(directory, database)
+
+    # The players already there: {id: (name, version)}, and the digests of their contents
+    existing = {}
+    digests = set()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for summaries in _bounded_map(
+            executor, _summarize, _chunks(_locations(directory, database)), jobs * 2
+        ):
+            for player_id, player_digest, name, version in summaries:
+                existing[player_id] = (name, version)
+                digests.add(player_digest)
+
+    # The new ids are given after every id already used, by the roster or by the bundle
+    last_id = max(max(existing, default=0), _max_id(filename, header))
+    counts = collections.Counter()
+    remapped = {}
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_decoder, initargs=(frozenset(digests),)
+    ) as executor:
+        for records in _bounded_map(
+            executor, _decode_chunk, _raw_chunks(filename, header), jobs * 2
+        ):
+            for record in records:
+                player_id, player_digest, name, version, level, origin, payload, errors = record
+                if player_digest in digests:
+                    counts["unchanged"] += 1
+                    continue
+                if errors:
+                    counts["invalid"] += 1
+                    output.write(
+                        json.dumps({"id": player_id, "valid": False, "errors": errors}) + "\n"
+                    )
+                    continue
+
+                expected_version, outcome = 0, "added"
+                if player_id in existing:
+                    current_name, current_version = existing[player_id]
+                    if current_name == name and version > current_version:
+                        expected_version, outcome = current_version, "updated"
+                    else:
+                        last_id = target.allocate(payload, last_id)
+                        remapped[player_id] = player_id = last_id
+                        outcome = "remapped"
+                try:
+                    target.write(player_id, payload, expected_version, (name, level, origin))
+                except ConflictError as error:
+                    # Saved by another instance since the roster was read: its save is kept
+                    counts["conflict"] += 1
+                    output.write(json.dumps({"id": player_id, "conflict": str(error)}) + "\n")
+                    continue
+                counts[outcome] += 1
+                existing[player_id] = (name, version)
+                digests.add(player_digest)
+
+    summary = {
+        "bundle": filename,
+        "data_version": header["DATA_VERSION"],
+        "same_data_version": header["DATA_VERSION"] == gamedata.REGISTRY.version(),
+        **{
+            key: counts[key]
+            for key in ("added", "updated", "remapped", "unchanged", "invalid", "conflict")
+        },
+        "remapped_ids": remapped,
+    }
+    output.write(json.dumps(summary) + "\n")
+    return 1 if counts["invalid"] or counts["conflict"] else 0
@@ -0,0 +1,70 @@
+"""
+Advisory locks, so several instances can share the same players' directory.
+
+Each player has its own lock file, so saving different players never waits on each other. The
+locks are POSIX record locks, which also work on network file systems; they are skipped on the
+systems without ``fcntl``.
+"""
+
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover, Windows
+    fcntl = None
+
+
+class ConflictError(Exception):
+    """A player was saved by another instance since it was loaded."""
+
+    def __init__(self, filename: str, version: int, expected: int):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        filename : str
+            The player's file.
+        version : int
+            The version of the file.
+        expected : int
+            The version the player was loaded from.
+        """
+        super().__init__(f"{filename} is at version {version}, expected {expected}")
+        self.filename = filename
+        self.version = version
+        self.expected = expected
+
+
+def lock_path(filename: str):
+    """Return the path of the lock file of a file, hidden next to it."""
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f".{name}.lock")
+
+
+def remove_lock(filename: str):
+    """
+    Remove the lock file of a deleted file, if any. An instance still waiting on it takes a lock
+    nobody else can see, which only matters for a file that no longer exists.
+    """
+    try:
+        os.remove(lock_path(filename))
+    except FileNotFoundError:
+        pass
+
+
+@contextlib.contextmanager
+def file_lock(filename: str):
+    """Hold the exclusive advisory lock of a file, waiting for the other instances."""
+    if fcntl is None:
+        yield
+        return
+
+    descriptor = os.open(lock_path(filename), os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        fcntl.lockf(descriptor, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(descriptor)
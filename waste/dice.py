@@ -0,0 +1,298 @@
+"""
+Exact odds of the 2d20 skill tests of the players.
+
+A test rolls 2d20, plus up to 3 dice bought with Lucky Points. Each die equal or under the
+target number (attribute + skill rank) is a success, each die equal or under the critical
+range is two successes: the skill rank if the skill is tagged, 1 otherwise. Each die in the
+complication range (20 by default) is a complication. The test passes with at least as many
+successes as its difficulty.
+
+The distributions are computed for every target number at once and cached by (critical range,
+complication range, number of dice), so the odds of a whole roster are only lookups.
+"""
+
+import functools
+import json
+import sys
+
+from waste import gamedata
+from waste.player import load_player
+
+DIE_FACES = 20
+BASE_DICE = 2
+MAX_DICE = 5
+MAX_DIFFICULTY = 5
+
+# Attribute of each skill, in the order of the skills' table
+SKILL_ATTRIBUTES = (
+    "PER",  # Energy Weapons
+    "STR",  # Melee Weapons
+    "AGI",  # Small Guns
+    "END",  # Big Guns
+    "STR",  # Athletics
+    "PER",  # Lockpick
+    "CHA",  # Speech
+    "AGI",  # Sneak
+    "PER",  # Explosives
+    "STR",  # Unarmed
+    "INT",  # Medicine
+    "PER",  # Pilot
+    "AGI",  # Throwing
+    "INT",  # Repair
+    "INT",  # Science
+    "END",  # Survival
+    "CHA",  # Barter
+)
+
+
+def _die(target: int, critical: int, complication_range: int):
+    """Return the outcomes of one die: {(successes, complications): number of faces}."""
+    outcomes = {}
+    for face in range(1, DIE_FACES + 1):
+        successes = 2 if face <= critical else 1 if face <= target else 0
+        complications = 1 if face > DIE_FACES - complication_range else 0
+        outcomes[successes, complications] = outcomes.get((successes, complications), 0) + 1
+    return outcomes
+
+
+@functools.lru_cache(maxsize=None)
+def table(critical: int, complication_range: int, dice: int):
+    """
+    Return the distributions of a roll for every target number, from 0 to DIE_FACES.
+
+    Parameters
+    ----------
+    critical : int
+        The faces up to this one are two successes.
+    complication_range : int
+        The number of faces, from the highest, that are complications.
+    dice : int
+        The number of dice rolled.
+
+    Returns
+    -------
+    tuple
+        For each target number, the number of rolls (out of ``DIE_FACES ** dice``) that give
+        each result: ``counts[successes][complications]``.
+    """
+    distributions = []
+    for target in range(DIE_FACES + 1):
+        die = _die(target, critical, complication_range)
+        counts = {(0, 0): 1}
+        for _ in range(dice):
+            rolled = {}
+            for (successes, complications), count in counts.items():
+                for (die_successes, die_complications), faces in die.items():
+                    key = (successes + die_successes, complications + die_complications)
+                    rolled[key] = rolled.get(key, 0) + count * faces
+            counts = rolled
+        distributions.append(
+            tuple(
+                tuple(
+                    counts.get((successes, complications), 0)
+                    for complications in range(dice + 1)
+                )
+                for successes in range(2 * dice + 1)
+            )
+        )
+    return tuple(distributions)
+
+
+@functools.lru_cache(maxsize=None)
+def success_table(critical: int, complication_range: int, dice: int, difficulty: int):
+    """Return the chance to pass a test of the given difficulty, for every target number."""
+    total = DIE_FACES**dice
+    return tuple(
+        sum(sum(row) for row in counts[difficulty:]) / total
+        for counts in table(critical, complication_range, dice)
+    )
+
+
+class Odds:
+    """The distribution of the results of a test."""
+
+    def __init__(self, counts: tuple, dice: int, difficulty: int):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        counts : tuple
+            The number of rolls that give each result: ``counts[successes][complications]``.
+        dice : int
+            The number of dice rolled.
+        difficulty : int
+            The successes needed to pass the test.
+        """
+        self.counts = counts
+        self.dice = dice
+        self.difficulty = difficulty
+        self.total = DIE_FACES**dice
+
+    def successes(self):
+        """Return the chance of each number of successes, from 0 to twice the dice."""
+        return [sum(row) / self.total for row in self.counts]
+
+    def success_chance(self):
+        """Return the chance to pass the test."""
+        return sum(sum(row) for row in self.counts[self.difficulty:]) / self.total
+
+    def complication_chance(self):
+        """Return the chance of at least one complication."""
+        return 1 - sum(row[0] for row in self.counts) / self.total
+
+    def expected_successes(self):
+        """Return the mean number of successes."""
+        return sum(successes * sum(row) for successes, row in enumerate(self.counts)) / self.total
+
+    def to_dict(self):
+        """Return the odds as a JSON-compatible dictionnary."""
+        return {
+            "DICE": self.dice,
+            "DIFFICULTY": self.difficulty,
+            "SUCCESS": self.success_chance(),
+            "COMPLICATION": self.complication_chance(),
+            "EXPECTED_SUCCESSES": self.expected_successes(),
+        }
+
+
+def _test_key(player, skill_id: int, attribute: str = None):
+    """Return the (target number, critical range) of a player's test of a skill."""
+    rank, tagged = player.skills.get(str(skill_id), (0, 0))
+    target = player[attribute or SKILL_ATTRIBUTES[skill_id]] + rank
+    return min(max(target, 0), DIE_FACES), max(rank, 1) if tagged else 1
+
+
+def _check(player, difficulty: int, extra_dice: int, complication_range: int):
+    """Check the parameters of a test, raises ValueError if they are out of the rules."""
+    if not 0 <= difficulty <= MAX_DIFFICULTY:
+        raise ValueError(f"difficulty must be between 0 and {MAX_DIFFICULTY}")
+    if not 0 <= extra_dice <= MAX_DICE - BASE_DICE:
+        raise ValueError(f"at most {MAX_DICE - BASE_DICE} extra dice can be bought")
+    if player is not None and extra_dice > player["LUCKY_POINT"]:
+        raise ValueError(f"{player.name} has only {player['LUCKY_POINT']} Lucky Points")
+    if not 1 <= complication_range <= DIE_FACES:
+        raise ValueError(f"complication range must be between 1 and {DIE_FACES}")
+
+
+def skill_test(
+    player,
+    skill_id: int,
+    difficulty: int = 1,
+    attribute: str = None,
+    extra_dice: int = 0,
+    complication_range: int = 1,
+):
+    """
+    Return the Odds of a skill test of a player.
+
+    Parameters
+    ----------
+    player : Player
+        The player.
+    skill_id : int
+        The skill tested, the player may not have it.
+    difficulty : int
+        The successes needed, from 0 to 5.
+    attribute : str
+        The S.P.E.C.I.A.L. added to the skill, defaults to the usual one of the skill.
+    extra_dice : int
+        The dice bought with Lucky Points, from 0 to 3.
+    complication_range : int
+        The number of faces, from 20, that are complications.
+
+    Raises
+    ------
+    ValueError
+        If a parameter is out of the rules, or the player has not enough Lucky Points.
+    """
+    _check(player, difficulty, extra_dice, complication_range)
+    target, critical = _test_key(player, skill_id, attribute)
+    dice = BASE_DICE + extra_dice
+    return Odds(table(critical, complication_range, dice)[target], dice, difficulty)
+
+
+def roster_odds(
+    players: list, difficulty: int = 1, extra_dice: int = 0, complication_range: int = 1
+):
+    """
+    Return the chance of every player to pass a test of every skill.
+
+    Parameters
+    ----------
+    players : list
+        The Player's instances.
+    difficulty : int
+        The successes needed, from 0 to 5.
+    extra_dice : int
+        The dice bought with Lucky Points, the same for every player whatever their Lucky
+        Points.
+    complication_range : int
+        The number of faces, from 20, that are complications.
+
+    Returns
+    -------
+    list
+        For each player, the chance to pass the test of each skill, in the order of the
+        skills' table.
+    """
+    _check(None, difficulty, extra_dice, complication_range)
+    dice = BASE_DICE + extra_dice
+    attributes = SKILL_ATTRIBUTES[:len(gamedata.skills())]
+    untrained = success_table(1, complication_range, dice, difficulty)
+    odds = []
+    for player in players:
+        special = {stat: player[stat] for stat in set(attributes)}
+        # The skills the player does not have are tested with the attribute alone
+        row = [untrained[min(max(special[stat], 0), DIE_FACES)] for stat in attributes]
+        for skill_id, (rank, tagged) in player.skills.items():
+            skill_id = int(skill_id)
+            target = min(max(special[attributes[skill_id]] + rank, 0), DIE_FACES)
+            critical = max(rank, 1) if tagged else 1
+            row[skill_id] = success_table(critical, complication_range, dice, difficulty)[target]
+        odds.append(row)
+    return odds
+
+
+def run(
+    filename: str,
+    difficulty: int = 1,
+    extra_dice: int = 0,
+    complication_range: int = 1,
+    output=None,
+):
+    """
+    Write the odds of every skill test of a player's file as JSON.
+
+    Parameters
+    ----------
+    filename : str
+        The player's file.
+    difficulty : int
+        The successes needed, from 0 to 5.
+    extra_dice : int
+        The dice bought with Lucky Points.
+    complication_range : int
+        The number of faces, from 20, that are complications.
+    output : file
+        Where the JSON is written, defaults to the standard output.
+
+    Returns
+    -------
+    int
+        The exit code: 0 if the test can be made, 1 otherwise.
+    """
+    output = output or sys.stdout
+    player = load_player(filename)
+    try:
+        skills = {
+            name: skill_test(
+                player, skill_id, difficulty, None, extra_dice, complication_range
+            ).to_dict()
+            for skill_id, name in enumerate(gamedata.skills())
+        }
+        result = {"file": filename, "valid": True, "SKILLS": skills}
+    except ValueError as error:
+        result = {"file": filename, "valid": False, "errors": [str(error)]}
+    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return 0 if result["valid"] else 1
@@ -0,0 +1,133 @@
+"""Registry of the game's data tables, located in the package and loaded on first access."""
+
+import hashlib
+import importlib.resources
+import json
+import os
+import pickle
+
+TABLES = ("special", "origins", "skills", "perks")
+# To be increased each time the normalization of the tables changes
+CACHE_VERSION = 1
+
+
+def cache_directory():
+    """Return the directory of the precompiled tables."""
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "waste")
+
+
+def _normalize(name: str, table):
+    """
+    Normalize a table as loaded from its JSON file: the S.P.E.C.I.A.L. are upper-cased and the
+    perks' requirements are turned into tuples.
+    """
+    if name == "special":
+        return {key.upper(): value for key, value in table.items()}
+
+    if name == "perks":
+        for perk in table:
+            perk["requirements"] = tuple(
+                tuple(
+                    (
+                        requirement_name.upper(),
+                        (
+                            requirement_level
+                            if isinstance(requirement_level, int)
+                            else tuple(requirement_level)
+                        ),
+                    )
+                    for requirement_name, requirement_level in requirements
+                )
+                for requirements in perk["requirements"]
+            )
+    return table
+
+
+class GameData:
+    """
+    Lazy registry of the data tables. A table is parsed on its first access, and its
+    normalized form is cached on the disk, keyed by the hash of the JSON file.
+    """
+
+    def __init__(self, use_cache: bool = True):
+        """Constructor method."""
+        self.use_cache = use_cache
+        self.tables = {}
+        self.hashes = {}
+
+    def __getitem__(self, name: str):
+        """Return the requested table, loading it if needed."""
+        if name not in self.tables:
+            self.tables[name] = self.__load(name)
+        return self.tables[name]
+
+    def digest(self, name: str):
+        """Return the hash of the JSON file of a table."""
+        if name not in self.hashes:
+            self.hashes[name] = hashlib.sha256(self.__read(name)).hexdigest()
+        return self.hashes[name]
+
+    def version(self):
+        """Return a hash of all the tables, that identifies the game's data."""
+        return hashlib.sha256(
+            "".join(self.digest(name) for name in TABLES).encode("ascii")
+        ).hexdigest()[:16]
+
+    @staticmethod
+    def __read(name: str):
+        """Return the raw content of the JSON file of a table."""
+        return (importlib.resources.files("waste") / "data" / f"{name}.json").read_bytes()
+
+    def __load(self, name: str):
+        """Load a table from the cache if it is up to date, from its JSON file otherwise."""
+        raw = self.__read(name)
+        self.hashes[name] = hashlib.sha256(raw).hexdigest()
+        if not self.use_cache:
+            return _normalize(name, json.loads(raw))
+
+        cache_file = os.path.join(
+            cache_directory(), f"{name}-{CACHE_VERSION}-{self.hashes[name][:16]}.pickle"
+        )
+        try:
+            with open(cache_file, "rb") as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        table = _normalize(name, json.loads(raw))
+        try:
+            os.makedirs(cache_directory(), exist_ok=True)
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, "wb") as file:
+                pickle.dump(table, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            # The cache is only an optimization
+            pass
+        return table
+
+
+REGISTRY = GameData(use_cache=os.environ.get("WASTE_DATA_CACHE", "1") != "0")
+
+
+def special():
+    """Return the S.P.E.C.I.A.L.: {short name (upper-case): name, ...}."""
+    return REGISTRY["special"]
+
+
+def origins():
+    """Return the names of the origins."""
+    return REGISTRY["origins"]
+
+
+def skills():
+    """Return the names of the skills."""
+    return REGISTRY["skills"]
+
+
+def perks():
+    """Return the perks, with their requirements as tuples."""
+    return REGISTRY["perks"]
@@ -0,0 +1,249 @@
+"""
+Append-only journal of the edits of a player, for the undo/redo of the editor and the recovery
+of the edits not saved when the application stopped.
+
+The journal of a player's file is a hidden file next to it, made of JSON lines. The first line
+is a header: the version of the file the edits apply to, and an optional snapshot of the
+player. The other lines are the edits, ``["e", path, old, new]``, and the undo and redo marks,
+``["u"]`` and ``["r"]``. An edit sets a field to a value, so replaying edits already in the
+file or in the snapshot changes nothing.
+"""
+
+import json
+import os
+
+from waste import storage
+from waste.player import write_atomic
+
+# Number of lines appended after which the journal is compacted into a snapshot. A compaction
+# writes the undo and redo stacks back, so it is counted from the size the journal had then.
+COMPACT_SIZE = 256
+# Number of edits that can be undone
+UNDO_LIMIT = 200
+
+
+def journal_path(filename: str):
+    """Return the path of the journal of a player's file, None for an unsaved player."""
+    if not filename:
+        return None
+    if storage.is_database_location(filename):
+        path, player_id = storage.parse_location(filename)
+        return f"{path}.player-{player_id}.journal"
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f".{name}.journal")
+
+
+def remove(filename: str):
+    """Remove the journal of a deleted player, if any."""
+    if (path := journal_path(filename)) is not None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_value(player, path: tuple):
+    """
+    Return the value of a field of a player.
+
+    Parameters
+    ----------
+    player : Player
+        The player.
+    path : tuple
+        The field: ("NAME",), ("STAT", stat), ("RESISTANCE", resistance, body part index),
+        ("SKILL", id) or ("PERK", id).
+    """
+    kind = path[0]
+    if kind == "NAME":
+        return player.name
+    if kind == "STAT":
+        return player[path[1]]
+    if kind == "RESISTANCE":
+        return player.data[path[1]][path[2]]
+    if kind == "SKILL":
+        return list(player.skills[path[1]]) if path[1] in player.skills else None
+    if kind == "PERK":
+        return player.perks.get(path[1], 0)
+    raise KeyError(path)
+
+
+def set_value(player, path: tuple, value):
+    """Set a field of a player, a skill of None or a perk of rank 0 is removed."""
+    kind = path[0]
+    if kind == "NAME":
+        player.name = value
+    elif kind == "STAT":
+        if path[1] in player.data["SPECIAL"]:
+            player.data["SPECIAL"][path[1]] = value
+        else:
+            player.data[path[1]] = value
+    elif kind == "RESISTANCE":
+        player.data[path[1]][path[2]] = value
+    elif kind == "SKILL":
+        if value is not None:
+            # The editor changes the skills in place, the journal keeps its own lists
+            player.skills[path[1]] = list(value)
+        elif path[1] in player.skills:
+            del player.skills[path[1]]
+    elif kind == "PERK":
+        if value:
+            player.perks[path[1]] = value
+        else:
+            player.perks.pop(path[1], None)
+    else:
+        raise KeyError(path)
+
+
+class Journal:
+    """The journal of the edits of a player, with its undo and redo stacks."""
+
+    def __init__(self, player):
+        """Constructor method, the journal file is only read by ``recover``."""
+        self.player = player
+        self.path = journal_path(player.filename)
+        # Edits as (path, old, new), the last ones at the end
+        self.done = []
+        self.undone = []
+        self.lines = 0
+        # Lines of the journal after its last compaction
+        self.compacted_lines = 0
+        self.file = None
+
+    def recover(self):
+        """
+        Replay the journal of the player, if it applies to the version of its file.
+
+        Returns
+        -------
+        bool
+            True if the player has been changed by the replay.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline())
+                records = [json.loads(line) for line in file if line.endswith("\n")]
+        except (OSError, ValueError, TypeError):
+            # Missing, or too broken to be trusted
+            return False
+
+        if header.get("BASE") != self.player.version:
+            # The file has been saved since, by this instance or another one
+            self.reset()
+            return False
+
+        before = self.player.to_dict()
+        if header.get("SNAPSHOT") is not None:
+            self.player.restore_from_data(header["SNAPSHOT"])
+        for record in records:
+            if record[0] == "e":
+                self.done.append((tuple(record[1]), record[2], record[3]))
+                self.undone.clear()
+                set_value(self.player, tuple(record[1]), record[3])
+            elif record[0] == "u" and self.done:
+                edit = self.done.pop()
+                self.undone.append(edit)
+                set_value(self.player, edit[0], edit[1])
+            elif record[0] == "r" and self.undone:
+                edit = self.undone.pop()
+                self.done.append(edit)
+                set_value(self.player, edit[0], edit[2])
+        self.lines = 1 + len(records)
+        return self.player.to_dict() != before
+
+    def __append(self, record: list):
+        """Append a line to the journal, compacting it when it is too long."""
+        if self.path is None:
+            return
+        if self.lines >= self.compacted_lines + COMPACT_SIZE:
+            self.compact()
+            return
+        if self.file is None:
+            if self.lines == 0:
+                self.compact()
+                return
+            # pylint: disable-next=consider-using-with
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.lines += 1
+
+    def record(self, path: tuple, old, new):
+        """Record an edit already made on the player."""
+        if old == new:
+            return
+        self.done.append((path, old, new))
+        self.undone.clear()
+        self.__append(["e", list(path), old, new])
+
+    def undo(self):
+        """Undo the last edit, returns the path of the field changed, None if none."""
+        if not self.done:
+            return None
+        edit = self.done.pop()
+        self.undone.append(edit)
+        set_value(self.player, edit[0], edit[1])
+        self.__append(["u"])
+        return edit[0]
+
+    def redo(self):
+        """Redo the last undone edit, returns the path of the field changed, None if none."""
+        if not self.undone:
+            return None
+        edit = self.undone.pop()
+        self.done.append(edit)
+        set_value(self.player, edit[0], edit[2])
+        self.__append(["r"])
+        return edit[0]
+
+    def compact(self, snapshot: bool = True, version: int = None):
+        """
+        Rewrite the journal as a header followed by the undo and redo stacks only.
+
+        Parameters
+        ----------
+        snapshot : bool
+            Keep a snapshot of the player in the header, not needed when the file has just been
+            saved.
+        version : int
+            The version of the file, defaults to the version of the player.
+        """
+        if self.path is None:
+            return
+        self.close()
+        del self.done[:-UNDO_LIMIT]
+        del self.undone[:-UNDO_LIMIT]
+
+        header = {
+            "BASE": self.player.version if version is None else version,
+            "SNAPSHOT": self.player.to_dict() if snapshot else None,
+        }
+        # The undone edits are redone then undone again, to rebuild the redo stack
+        records = [["e", list(path), old, new] for path, old, new in self.done]
+        records += [["e", list(path), old, new] for path, old, new in reversed(self.undone)]
+        records += [["u"]] * len(self.undone)
+        lines = [json.dumps(header, separators=(",", ":"), ensure_ascii=False)] + [
+            json.dumps(record, separators=(",", ":"), ensure_ascii=False) for record in records
+        ]
+        write_atomic(self.path, ("\n".join(lines) + "\n").encode("utf-8"))
+        self.lines = self.compacted_lines = len(lines)
+
+    def saved(self, version: int):
+        """The player has been saved at the given version: its file becomes the base."""
+        self.path = journal_path(self.player.filename)
+        self.compact(snapshot=False, version=version)
+
+    def reset(self):
+        """Forget every edit, the journal is removed."""
+        self.close()
+        self.done.clear()
+        self.undone.clear()
+        self.lines = self.compacted_lines = 0
+        if self.path is not None:
+            remove(self.player.filename)
+
+    def close(self):
+        """Close the journal file, it is reopened by the next edit."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,238 @@
+"""
+Eligibility of a whole roster to every perk, computed in one vectorized pass.
+
+Needs NumPy, which is an optional dependency: ``pip install WASTE[matrix]``.
+"""
+
+import json
+import sys
+
+import numpy
+
+from waste.perks import CN_INDEX, DN_INDEX, LVL_NAME, ORIGIN_NAME, SPECIAL_STATS, get_index
+from waste.player import load_player
+
+# Numeric stats compared with the minimums, in the order of the columns of the arrays
+MIN_STATS = SPECIAL_STATS + (LVL_NAME,)
+LVL_COLUMN = len(SPECIAL_STATS)
+NO_MINIMUM = numpy.iinfo(numpy.int16).min
+
+
+class RequirementMatrix:
+    """
+    The requirements of every rank of every perk, packed in arrays indexed by
+    ``[perk_id, rank]``, the rank being counted from 0.
+
+    Only the origin can be required to be in a set of values, as in the game's data.
+    """
+
+    def __init__(self, index=None):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        index : PerkIndex
+            The compiled perks, defaults to the game's ones.
+        """
+        index = index or get_index()
+        perks_count = len(index.caps)
+        max_rank = max(index.caps)
+        origins = {
+            origin
+            for ranks in index.ranks
+            for requirements in ranks
+            for requirement_name, requirement_level in requirements
+            if requirement_name == ORIGIN_NAME
+            for origin in requirement_level
+        }
+        # The origins go from -1 (none) to the greatest one required
+        self.origins_count = max(origins, default=-1) + 2
+
+        self.caps = numpy.array(index.caps, dtype=numpy.int16)
+        # The ranks beyond the cap, or without requirements in the data, cannot be taken
+        self.available = numpy.zeros((perks_count, max_rank), dtype=bool)
+        self.minimums = numpy.full(
+            (perks_count, max_rank, len(MIN_STATS)), NO_MINIMUM, dtype=numpy.int16
+        )
+        # The last column stands for the origins no perk requires
+        self.origins = numpy.ones((perks_count, max_rank, self.origins_count + 1), dtype=bool)
+
+        for perk_id, ranks in enumerate(index.ranks):
+            for rank, requirements in enumerate(ranks[:index.caps[perk_id]]):
+                self.available[perk_id, rank] = True
+                for requirement_name, requirement_level in requirements:
+                    if requirement_name == ORIGIN_NAME:
+                        self.origins[perk_id, rank, :] = False
+                        for origin in requirement_level:
+                            self.origins[perk_id, rank, origin + 1] = True
+                    elif isinstance(requirement_level, int):
+                        column = MIN_STATS.index(requirement_name)
+                        self.minimums[perk_id, rank, column] = requirement_level
+                    else:
+                        raise ValueError(f"unsupported set of values for {requirement_name}")
+
+
+class RosterArrays:
+    """The stats and the perks' ranks of a list of players, packed in arrays."""
+
+    def __init__(self, players: list, perks_count: int, origins_count: int):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        players : list
+            The Player's instances.
+        perks_count : int
+            The number of perks.
+        origins_count : int
+            The number of origins known by the RequirementMatrix, the other origins share its
+            last column.
+        """
+        self.players = list(players)
+        self.stats = numpy.array(
+            [[player[stat] for stat in MIN_STATS] for player in self.players], dtype=numpy.int16
+        ).reshape(len(self.players), len(MIN_STATS))
+        origins = numpy.array([player[ORIGIN_NAME] for player in self.players], dtype=numpy.int64)
+        self.origin_columns = numpy.where(
+            (origins >= -1) & (origins < origins_count - 1), origins + 1, origins_count
+        )
+        self.ranks = numpy.zeros((len(self.players), perks_count), dtype=numpy.int16)
+        for row, player in enumerate(self.players):
+            for perk_id, rank in player.perks.items():
+                self.ranks[row, int(perk_id)] = rank
+
+
+class EligibilityMatrix:
+    """The players × perks eligibility of a roster, at the next rank of each perk."""
+
+    def __init__(self, players: list, requirements: RequirementMatrix = None):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        players : list
+            The Player's instances.
+        requirements : RequirementMatrix
+            The packed requirements, defaults to the game's ones.
+        """
+        self.requirements = requirements or get_requirements()
+        self.roster = RosterArrays(
+            players, len(self.requirements.caps), self.requirements.origins_count
+        )
+
+    @property
+    def players(self):
+        """The players, in the order of the rows of the matrix."""
+        return self.roster.players
+
+    def compute(self, level: int = None):
+        """
+        Return the eligibility matrix: ``matrix[row, perk_id]`` is True if the player of the row
+        can take the perk at its next rank.
+
+        Parameters
+        ----------
+        level : int
+            Check the players as if they were at this level, instead of their own.
+        """
+        requirements = self.requirements
+        stats = self.roster.stats
+        if level is not None:
+            stats = stats.copy()
+            stats[:, LVL_COLUMN] = level
+
+        ranks = self.roster.ranks
+        perk_ids = numpy.arange(ranks.shape[1])[numpy.newaxis, :]
+        # The requirements of the next rank, a capped perk looks at its last rank
+        next_ranks = numpy.minimum(ranks, requirements.available.shape[1] - 1)
+
+        matrix = (ranks < requirements.caps) & requirements.available[perk_ids, next_ranks]
+        matrix &= (stats[:, numpy.newaxis, :] >= requirements.minimums[perk_ids, next_ranks]).all(
+            axis=2
+        )
+        matrix &= requirements.origins[
+            perk_ids, next_ranks, self.roster.origin_columns[:, numpy.newaxis]
+        ]
+
+        # Conflict between Daring Nature and Cautious Nature
+        has_nature = (ranks[:, DN_INDEX] > 0) | (ranks[:, CN_INDEX] > 0)
+        matrix[:, [DN_INDEX, CN_INDEX]] &= ~has_nature[:, numpy.newaxis]
+        return matrix
+
+    def players_for(self, perk_id: int, level: int = None):
+        """Return the players that can take a perk at its next rank."""
+        rows = numpy.flatnonzero(self.compute(level)[:, perk_id])
+        return [self.players[row] for row in rows]
+
+    def perks_for_all(self, level: int = None):
+        """Return the ids of the perks every player can take at its next rank."""
+        return numpy.flatnonzero(self.compute(level).all(axis=0)).tolist()
+
+
+_REQUIREMENTS = None
+
+
+def get_requirements():
+    """Return the RequirementMatrix of the game's perks, packed on first use."""
+    global _REQUIREMENTS  # pylint: disable=global-statement
+    if _REQUIREMENTS is None:
+        _REQUIREMENTS = RequirementMatrix()
+    return _REQUIREMENTS
+
+
+def run(files: list, level: int = None, perk_id: int = None, output=None):
+    """
+    Write the eligibility of the players' files as JSON lines: the perks available to each
+    player, then the perks available to every player.
+
+    Parameters
+    ----------
+    files : list
+        The players' files.
+    level : int
+        Check the players as if they were at this level.
+    perk_id : int
+        Only list the players that can take this perk.
+    output : file
+        Where the JSON lines are written, defaults to the standard output.
+
+    Returns
+    -------
+    int
+        The exit code: 0 if every file could be read, 1 otherwise.
+    """
+    output = output or sys.stdout
+    exit_code = 0
+    players = []
+    for filename in files:
+        try:
+            players.append(load_player(filename))
+        except (OSError, ValueError, KeyError) as error:
+            exit_code = 1
+            output.write(
+                json.dumps({"file": filename, "valid": False, "errors": [str(error)]}) + "\n"
+            )
+
+    matrix = EligibilityMatrix(players)
+    eligible = matrix.compute(level)
+
+    if perk_id is not None:
+        rows = numpy.flatnonzero(eligible[:, perk_id])
+        result = {"perk": perk_id, "players": [players[row].filename for row in rows]}
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return exit_code
+
+    for row, player in enumerate(players):
+        result = {
+            "file": player.filename,
+            "valid": True,
+            "name": player.name,
+            "available_perks": numpy.flatnonzero(eligible[row]).tolist(),
+        }
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    everyone = numpy.flatnonzero(eligible.all(axis=0)).tolist() if players else []
+    output.write(json.dumps({"everyone": everyone}) + "\n")
+    return exit_code
@@ -0,0 +1,196 @@
+"""Compiled perks' requirements and per-player eligibility cache."""
+
+import bisect
+import weakref
+
+from waste import gamedata
+
+LVL_NAME = "LVL"
+ORIGIN_NAME = "ORIGIN"
+DN_INDEX = 54  # Daring Nature index in PERKS list
+CN_INDEX = 55  # Cautious Nature index in PERKS list
+
+SPECIAL_STATS = ("STR", "PER", "END", "CHA", "INT", "AGI", "LCK")
+STATS = SPECIAL_STATS + (LVL_NAME, ORIGIN_NAME)
+
+
+class PerkIndex:
+    """
+    Requirements of the perks compiled once, and indexed by the stat they depend on.
+
+    For each perk, ``ranks[perk_id][rank]`` is a tuple of ``(stat, threshold)`` where the
+    threshold is either the minimum value (int) or a frozenset of authorized values.
+    """
+
+    def __init__(self, perks: list):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        perks : list
+            The perks as loaded from ``perks.json``.
+        """
+        self.caps = tuple(perk["rank"] for perk in perks)
+        self.ranks = tuple(
+            tuple(
+                tuple(
+                    (
+                        requirement_name,
+                        (
+                            requirement_level
+                            if isinstance(requirement_level, int)
+                            else frozenset(requirement_level)
+                        ),
+                    )
+                    for requirement_name, requirement_level in requirements
+                )
+                for requirements in perk["requirements"]
+            )
+            for perk in perks
+        )
+
+        # {stat: {threshold: {perk_id, ...}}}, a None threshold stands for a set of values
+        dependents = {stat: {} for stat in STATS}
+        for perk_id, ranks in enumerate(self.ranks):
+            for requirements in ranks:
+                for requirement_name, requirement_level in requirements:
+                    threshold = requirement_level if isinstance(requirement_level, int) else None
+                    dependents.setdefault(requirement_name, {}).setdefault(
+                        threshold, set()
+                    ).add(perk_id)
+
+        self.any_value = {
+            stat: frozenset(by_level.pop(None, ())) for stat, by_level in dependents.items()
+        }
+        self.thresholds = {stat: sorted(by_level) for stat, by_level in dependents.items()}
+        self.dependents = {
+            stat: [frozenset(by_level[threshold]) for threshold in self.thresholds[stat]]
+            for stat, by_level in dependents.items()
+        }
+
+    def affected_by(self, stat: str, old_value, new_value):
+        """
+        Return the perks whose requirements may have changed when ``stat`` went from
+        ``old_value`` to ``new_value``.
+        """
+        affected = set(self.any_value.get(stat, ()))
+        if isinstance(old_value, int) and isinstance(new_value, int):
+            # A minimum of t only flips when t is in ]min(old, new), max(old, new)]
+            thresholds = self.thresholds.get(stat, [])
+            start = bisect.bisect_right(thresholds, min(old_value, new_value))
+            stop = bisect.bisect_right(thresholds, max(old_value, new_value))
+            for perks in self.dependents[stat][start:stop]:
+                affected |= perks
+        else:
+            for perks in self.dependents.get(stat, ()):
+                affected |= perks
+        return affected
+
+    def is_eligible(self, perk_id: int, stats: dict, perks: dict):
+        """
+        Check if a perk can be taken at its next rank.
+
+        Parameters
+        ----------
+        perk_id : int
+            The index of the perk in PERKS.
+        stats : dict
+            The values of the player for each stat of STATS.
+        perks : dict
+            The perks of the player: {id: rank (int), ...}.
+        """
+        current_rank = perks.get(str(perk_id), 0)
+
+        # Rank check
+        if current_rank >= self.caps[perk_id] or current_rank >= len(self.ranks[perk_id]):
+            return False
+
+        # Conflict between Daring Nature and Cautious Nature
+        if perk_id in {DN_INDEX, CN_INDEX} and (str(DN_INDEX) in perks or str(CN_INDEX) in perks):
+            return False
+
+        # Requirements check
+        for requirement_name, requirement_level in self.ranks[perk_id][current_rank]:
+            value = stats[requirement_name]
+            if isinstance(requirement_level, int):
+                if value < requirement_level:
+                    return False
+            elif value not in requirement_level:
+                return False
+        return True
+
+
+class PerkEligibility:
+    """Eligible perks of a player, only recomputed for the perks touched by a change."""
+
+    def __init__(self, player, index: PerkIndex = None):
+        """Constructor method."""
+        self.player = player
+        self.index = index or get_index()
+        self.stats = {}
+        self.perks = {}
+        self.eligible = set()
+        self.refresh()
+
+    def __snapshot(self):
+        """Return the current stats and perks of the player."""
+        return {stat: self.player[stat] for stat in STATS}, dict(self.player.perks)
+
+    def __recompute(self, perk_ids):
+        """Recompute the eligibility of the given perks."""
+        for perk_id in perk_ids:
+            if self.index.is_eligible(perk_id, self.stats, self.perks):
+                self.eligible.add(perk_id)
+            else:
+                self.eligible.discard(perk_id)
+
+    def refresh(self):
+        """Recompute the eligibility of every perk."""
+        self.stats, self.perks = self.__snapshot()
+        self.eligible = set()
+        self.__recompute(range(len(self.index.caps)))
+
+    def sync(self):
+        """
+        Bring the cache up to date with the player, returns the sorted ids of the eligible perks.
+        """
+        stats, perks = self.__snapshot()
+        affected = set()
+
+        for stat, value in stats.items():
+            if self.stats[stat] != value:
+                affected |= self.index.affected_by(stat, self.stats[stat], value)
+
+        for perk_id in perks.keys() ^ self.perks.keys():
+            affected.add(int(perk_id))
+        for perk_id in perks.keys() & self.perks.keys():
+            if perks[perk_id] != self.perks[perk_id]:
+                affected.add(int(perk_id))
+
+        # Taking or dropping one of the natures changes the other one
+        if affected & {DN_INDEX, CN_INDEX}:
+            affected |= {DN_INDEX, CN_INDEX}
+
+        self.stats, self.perks = stats, perks
+        self.__recompute(affected)
+        return sorted(self.eligible)
+
+
+_INDEX = None
+_CACHE = weakref.WeakKeyDictionary()
+
+
+def get_index():
+    """Return the PerkIndex of the game's perks, compiled on first use."""
+    global _INDEX  # pylint: disable=global-statement
+    if _INDEX is None:
+        _INDEX = PerkIndex(gamedata.perks())
+    return _INDEX
+
+
+def eligibility(player):
+    """Return the cached PerkEligibility of the given player, call ``sync`` before reading it."""
+    if (cached := _CACHE.get(player)) is None:
+        cached = _CACHE[player] = PerkEligibility(player)
+    return cached
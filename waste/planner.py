@@ -0,0 +1,322 @@
+"""Build planner: the lowest level at which a player can have a wish-list of perks."""
+
+import heapq
+import itertools
+import json
+import sys
+
+from waste import gamedata
+from waste.perks import CN_INDEX, DN_INDEX, LVL_NAME, ORIGIN_NAME, SPECIAL_STATS, get_index
+from waste.player import load_player
+
+# Intense Training index in PERKS list, each rank raises a S.P.E.C.I.A.L. by 1
+INTENSE_TRAINING_INDEX = 26
+SPECIAL_MAX = 10
+
+
+class NoPlanError(ValueError):
+    """The wish-list cannot be reached by the player, whatever the order of the picks."""
+
+
+class Plan:
+    """The picks that lead a player to its wish-list, one pick per level."""
+
+    def __init__(self, level: int, steps: list):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        level : int
+            The level of the player once the wish-list is reached.
+        steps : list
+            The picks, in order, as (level, perk_id, rank, stat) tuples: the stat is the
+            S.P.E.C.I.A.L. raised by an Intense Training rank, "" for a free choice, None for
+            the other perks. A perk_id of None is a pick left to the player.
+        """
+        self.level = level
+        self.steps = steps
+
+    def to_dict(self):
+        """Return the plan as a JSON-compatible dictionnary."""
+        return {
+            "LVL": self.level,
+            "STEPS": [
+                {"LVL": level, "PERK": perk_id, "RANK": rank, "SPECIAL": stat}
+                for level, perk_id, rank, stat in self.steps
+            ],
+        }
+
+    def describe(self):
+        """Return the plan as lines of text, for the user."""
+        perks = gamedata.perks()
+        special = gamedata.special()
+        lines = []
+        for level, perk_id, rank, stat in self.steps:
+            if perk_id is None:
+                lines.append(f"Niveau {level} : atout au choix")
+                continue
+            line = f"Niveau {level} : {perks[perk_id]['name']} (Rang {rank})"
+            if stat:
+                line += f", +1 {special[stat]}"
+            lines.append(line)
+        return lines
+
+
+class _Search:
+    """
+    A* search over the picks of the wish-list's ranks and of the Intense Training ranks that
+    raise the S.P.E.C.I.A.L. to the wish-list's requirements.
+
+    A state is (ranks of the wished perks, S.P.E.C.I.A.L., Intense Training rank), its cost is
+    the number of picks made. Since the stats and the level only grow, a useful pick is never
+    delayed: a pick is only left to the player when none of the wish-list can be taken.
+    """
+
+    def __init__(self, player, wishlist: dict):
+        """Compile the wish-list for the given player, raises NoPlanError if it is out of reach."""
+        index = get_index()
+        perks = gamedata.perks()
+        self.level = player[LVL_NAME]
+        # A perk is gained at each level, including the first one
+        self.unspent = max(0, self.level - sum(player.perks.values()))
+        self.special = tuple(player[stat] for stat in SPECIAL_STATS)
+        self.training = player.perks.get(str(INTENSE_TRAINING_INDEX), 0)
+        origin = player[ORIGIN_NAME]
+
+        wishlist = {int(perk_id): rank for perk_id, rank in wishlist.items()}
+        training_target = max(self.training, wishlist.pop(INTENSE_TRAINING_INDEX, 0))
+
+        final_perks = {int(perk_id) for perk_id in player.perks} | {
+            perk_id for perk_id, rank in wishlist.items() if rank > 0
+        }
+        if {DN_INDEX, CN_INDEX} <= final_perks:
+            raise NoPlanError(
+                f"{perks[DN_INDEX]['name']} and {perks[CN_INDEX]['name']} are exclusive"
+            )
+
+        # Only the ranks still to take are kept
+        self.perk_ids = []
+        self.start_ranks = []
+        target_ranks = []
+        # For each wished perk, the requirements of each rank: (special requirements, min level)
+        self.requirements = []
+        needed = [0] * len(SPECIAL_STATS)
+        for perk_id, rank in sorted(wishlist.items()):
+            current_rank = player.perks.get(str(perk_id), 0)
+            if rank <= current_rank:
+                continue
+            if rank > min(index.caps[perk_id], len(index.ranks[perk_id])):
+                raise NoPlanError(f"{perks[perk_id]['name']} has no rank {rank}")
+
+            ranks = []
+            for requirements in index.ranks[perk_id][:rank]:
+                special, min_level = [], 0
+                for requirement_name, requirement_level in requirements:
+                    if requirement_name == LVL_NAME:
+                        min_level = requirement_level
+                    elif requirement_name == ORIGIN_NAME:
+                        if origin not in requirement_level:
+                            raise NoPlanError(f"{perks[perk_id]['name']} needs another origin")
+                    else:
+                        slot = SPECIAL_STATS.index(requirement_name)
+                        special.append((slot, requirement_level))
+                ranks.append((tuple(special), min_level))
+
+            for special, _ in ranks[current_rank:]:
+                for slot, threshold in special:
+                    if threshold > SPECIAL_MAX:
+                        raise NoPlanError(
+                            f"{perks[perk_id]['name']} needs {SPECIAL_STATS[slot]} {threshold}"
+                        )
+                    needed[slot] = max(needed[slot], threshold)
+
+            self.perk_ids.append(perk_id)
+            self.start_ranks.append(current_rank)
+            self.requirements.append(ranks)
+            target_ranks.append(rank)
+        self.target_ranks = tuple(target_ranks)
+        self.needed = tuple(needed)
+
+        # The Intense Training ranks needed to raise the S.P.E.C.I.A.L., and the wished ones
+        deficit = sum(max(0, need - value) for need, value in zip(self.needed, self.special))
+        self.training_target = max(training_target, self.training + deficit)
+        training_ranks = index.ranks[INTENSE_TRAINING_INDEX]
+        if self.training_target > min(index.caps[INTENSE_TRAINING_INDEX], len(training_ranks)):
+            raise NoPlanError(
+                f"{perks[INTENSE_TRAINING_INDEX]['name']} cannot raise the S.P.E.C.I.A.L. enough"
+            )
+        self.training_levels = tuple(
+            dict(requirements).get(LVL_NAME, 0) for requirements in training_ranks
+        )
+        # Past this level, every pick of the plan only depends on the S.P.E.C.I.A.L.
+        self.last_level = max(
+            self.training_levels[:self.training_target]
+            + tuple(min_level for ranks in self.requirements for _, min_level in ranks),
+            default=0,
+        )
+
+    def pick_level(self, picks: int):
+        """Return the level of the player at its given pick, counted from 0."""
+        if picks < self.unspent:
+            return self.level
+        return self.level + picks - self.unspent + 1
+
+    def bound(self, picks: int, ranks: tuple, special: tuple, training: int):
+        """
+        Return a lower bound of the final level from a state: every remaining pick takes a
+        level, and each remaining rank needs its own level.
+        """
+        remaining = self.training_target - training
+        bound = self.level
+        if remaining:
+            bound = self.training_levels[self.training_target - 1]
+        for position, rank in enumerate(ranks):
+            target = self.target_ranks[position]
+            if rank < target:
+                remaining += target - rank
+                bound = max(bound, self.requirements[position][target - 1][1])
+        if remaining == 0:
+            return self.pick_level(picks - 1) if picks else self.level
+        return max(bound, self.pick_level(picks + remaining - 1))
+
+    def moves(self, picks: int, ranks: tuple, special: tuple, training: int):
+        """Yield the useful picks from a state: (step, ranks, special, training)."""
+        level = self.pick_level(picks)
+
+        for position, rank in enumerate(ranks):
+            if rank == self.target_ranks[position]:
+                continue
+            requirements, min_level = self.requirements[position][rank]
+            if level < min_level:
+                continue
+            if all(special[slot] >= threshold for slot, threshold in requirements):
+                perk_id = self.perk_ids[position]
+                yield (
+                    (level, perk_id, rank + 1, None),
+                    ranks[:position] + (rank + 1,) + ranks[position + 1:],
+                    special,
+                    training,
+                )
+
+        if training == self.training_target or level < self.training_levels[training]:
+            return
+        deficit = 0
+        for slot, need in enumerate(self.needed):
+            if special[slot] < need:
+                deficit += need - special[slot]
+                yield (
+                    (level, INTENSE_TRAINING_INDEX, training + 1, SPECIAL_STATS[slot]),
+                    ranks,
+                    special[:slot] + (special[slot] + 1,) + special[slot + 1:],
+                    training + 1,
+                )
+        # The wished ranks beyond the S.P.E.C.I.A.L. needed are free to raise any stat
+        if self.training_target - training > deficit:
+            yield ((level, INTENSE_TRAINING_INDEX, training + 1, ""), ranks, special, training + 1)
+
+    def run(self):
+        """Return the Plan with the lowest final level, raises NoPlanError if there is none."""
+        start = (tuple(self.start_ranks), self.special, self.training)
+        counter = itertools.count()
+        # (bound, remaining picks, tie breaker, picks, state, path)
+        queue = [(self.bound(0, *start), 0, next(counter), 0, start, None)]
+        # Memoized sub-states: the fewest picks a state has been reached with
+        best = {start: 0}
+
+        while queue:
+            bound, _, _, picks, state, path = heapq.heappop(queue)
+            if best.get(state, picks) < picks:
+                continue
+
+            ranks, special, training = state
+            if ranks == self.target_ranks and training == self.training_target:
+                steps = []
+                while path is not None:
+                    path, step = path
+                    steps.append(step)
+                return Plan(bound, steps[::-1])
+
+            # While nothing of the wish-list can be taken at this level, the picks are left free
+            while not (moves := list(self.moves(picks, *state))):
+                if self.pick_level(picks) > self.last_level:
+                    break
+                path = (path, (self.pick_level(picks), None, None, None))
+                picks += 1
+
+            for step, *next_state in moves:
+                next_state = tuple(next_state)
+                if best.get(next_state, picks + 2) <= picks + 1:
+                    continue
+                best[next_state] = picks + 1
+                next_bound = max(bound, self.bound(picks + 1, *next_state))
+                remaining = sum(self.target_ranks) - sum(next_state[0])
+                remaining += self.training_target - next_state[2]
+                heapq.heappush(
+                    queue,
+                    (next_bound, remaining, next(counter), picks + 1, next_state, (path, step)),
+                )
+
+        raise NoPlanError("the wish-list cannot be reached")
+
+
+def plan(player, wishlist: dict):
+    """
+    Find the lowest level at which a player can have a wish-list of perks, and the picks that
+    lead to it.
+
+    Parameters
+    ----------
+    player : Player
+        The player, as it is now.
+    wishlist : dict
+        The wished perks: {id: rank (int), ...}.
+
+    Returns
+    -------
+    Plan
+        The picks of the perks, in order, one per level. The S.P.E.C.I.A.L. can only be raised
+        by the ranks of Intense Training.
+
+    Raises
+    ------
+    NoPlanError
+        If no order of the picks reaches the wish-list.
+    """
+    return _Search(player, wishlist).run()
+
+
+def parse_wish(wish: str):
+    """Parse a wished perk given as "id" or "id:rank" on the command line."""
+    perk_id, _, rank = wish.partition(":")
+    if not perk_id.isdigit() or int(perk_id) >= len(gamedata.perks()):
+        raise ValueError(f"unknown perk: {perk_id}")
+    return perk_id, int(rank or 1)
+
+
+def run(filename: str, wishlist: dict, output=None):
+    """
+    Plan the wished perks of a player's file and write the plan as JSON.
+
+    Parameters
+    ----------
+    filename : str
+        The player's file.
+    wishlist : dict
+        The wished perks: {id: rank (int), ...}.
+    output : file
+        Where the JSON is written, defaults to the standard output.
+
+    Returns
+    -------
+    int
+        The exit code: 0 if the wish-list can be reached, 1 otherwise.
+    """
+    output = output or sys.stdout
+    try:
+        build_plan = plan(load_player(filename), wishlist)
+        result = {"file": filename, "reachable": True, **build_plan.to_dict()}
+    except NoPlanError as error:
+        result = {"file": filename, "reachable": False, "errors": [str(error)]}
+    output.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return 0 if result["reachable"] else 1
@@ -1,25 +1,88 @@
 """Manage player."""
 
+import array
+import collections.abc
+import contextlib
 import json
 import os
+import re
+import secrets
+import sqlite3
+import zlib
 
-with open("waste/data/special.json", "r", encoding="utf-8") as datafile:
-    SPECIAL = json.load(datafile)
+from waste import gamedata, storage
+from waste.concurrency import ConflictError, file_lock
 
-with open("waste/data/origins.json", "r", encoding="utf-8") as datafile:
-    ORIGINS = json.load(datafile)
+PLAYERS_DIR = "waste/players/"
 
-with open("waste/data/skills.json", "r", encoding="utf-8") as datafile:
-    SKILLS = json.load(datafile)
+# On-disk encoding of the saves: "json" (indented), "compact" (minified JSON) or "binary"
+SAVE_FORMAT = os.environ.get("WASTE_SAVE_FORMAT", "json")
+BINARY_MAGIC = b"WASTE"
+BINARY_VERSION = 1
 
-with open("waste/data/perks.json", "r", encoding="utf-8") as datafile:
-    PERKS = json.load(datafile)
+# Counter of the ids of the new players, shared by the instances using the directory
+NEXT_ID_FILE = ".next_id"
+PLAYER_FILE = re.compile(r"player_(\d+)\.(?:json|wst)")
+
+
+def __getattr__(name: str):
+    """Give access to the game's data tables, which are only loaded when first used."""
+    if name in {"SPECIAL", "ORIGINS", "SKILLS", "PERKS"}:
+        return gamedata.REGISTRY[name.lower()]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Fixed layout of the arrays of Player
+SPECIAL_NAMES = ("STR", "PER", "END", "CHA", "INT", "AGI", "LCK")
+STATS_NAMES = SPECIAL_NAMES + (
+    "LVL",
+    "ORIGIN",
+    "HEALTH_POINT",
+    "LUCKY_POINT",
+    "CARRY_WEIGHT",
+    "DEFENSE",
+)
+STATS_SLOTS = {name: slot for slot, name in enumerate(STATS_NAMES)}
+SPECIAL_SLOTS = {name: STATS_SLOTS[name] for name in SPECIAL_NAMES}
+RESISTANCES_NAMES = (
+    "PHYSICAL_RESISTANCE",
+    "ENERGY_RESISTANCE",
+    "RADIATION_RESISTANCE",
+    "POISON_RESISTANCE",
+)
+BODY_PARTS_COUNT = 6  # head, torso, right arm, left arm, right leg, left leg
+NO_SKILL = -1  # Value of the skills the player does not have
+FIELDS = (
+    ("NAME",) + STATS_NAMES[len(SPECIAL_NAMES):] + RESISTANCES_NAMES + ("SPECIAL", "SKILLS", "PERKS")
+)
 
 
 class Player:
-    """Player class that handle the interface between files and players in the script."""
+    """
+    Player class that handle the interface between files and players in the script.
 
-    def __init__(self, filename: str, name: str, data: dict, skills: dict, perks: dict):
+    The stats, the resistances and the skills are stored in arrays with a fixed layout, the
+    ``data`` and ``skills`` attributes are views on these arrays that behave like the
+    dictionnaries of the file.
+    """
+
+    __slots__ = (
+        "filename",
+        "name",
+        "stats",
+        "resistances",
+        "skill_values",
+        "skill_tags",
+        "perks",
+        "version",
+        "editing",
+        "_saved",
+        "__weakref__",
+    )
+
+    def __init__(
+        self, filename: str, name: str, data: dict, skills: dict, perks: dict, version: int = 0
+    ):
         """
         Constructor method.
 
@@ -49,63 +112,215 @@ class Player:
             The skills of the player: {id: [value (int), tagged (bool)], ...}.
         perks : dict
             The perks of the player: {id: rank (int), ...}.
+        version : int
+            The version of the file, increased by each save. A save is rejected if the file is
+            no longer at the version the player was loaded from.
         """
         self.filename = filename
+        self.version = version
+        # Set while an editor is bound to the player, the roster does not restore it then
+        self.editing = False
+        self._saved = None
+        self.__assign(name, data, skills, perks)
+
+    def __assign(self, name: str, data: dict, skills: dict, perks: dict):
+        """Fill the arrays of the player from the dictionnaries of its file."""
         self.name = name
-        self.data = data
-        self.skills = skills
-        self.perks = perks
+        self.stats = array.array(
+            "h",
+            [data["SPECIAL"][stat] for stat in SPECIAL_NAMES]
+            + [data[stat] for stat in STATS_NAMES[len(SPECIAL_NAMES):]],
+        )
+        self.resistances = array.array(
+            "h", [value for resistance in RESISTANCES_NAMES for value in data[resistance]]
+        )
+        skills_count = len(gamedata.skills())
+        self.skill_values = array.array("b", [NO_SKILL]) * skills_count
+        self.skill_tags = array.array("b", [0]) * skills_count
+        for skill_id, (value, tagged) in skills.items():
+            self.skill_values[int(skill_id)] = value
+            self.skill_tags[int(skill_id)] = tagged
+        self.perks = dict(perks)
+
+    @property
+    def data(self):
+        """The player's data, as a dictionnary-like view on the arrays."""
+        return _PlayerData(self)
+
+    @property
+    def skills(self):
+        """The player's skills: {id: [value (int), tagged (int)], ...}, as a view on the arrays."""
+        return _Skills(self)
 
     def __getitem__(self, item: str):
         """Return requested data on player."""
-        if item.lower() in SPECIAL.keys():
-            return self.data["SPECIAL"][item]
+        if (slot := STATS_SLOTS.get(item)) is not None:
+            return self.stats[slot]
         return self.data[item]
 
     def restore_from_file(self):
         """Overwrite the Player's instance with the content of the reference file for the player."""
-        with open(self.filename, "r", encoding="utf-8") as file:
-            player_data = json.load(file)
-            self.name = player_data["NAME"]
-            self.data = {
-                "LVL": player_data["LVL"],
-                "ORIGIN": player_data["ORIGIN"],
-                "HEALTH_POINT": player_data["HEALTH_POINT"],
-                "LUCKY_POINT": player_data["LUCKY_POINT"],
-                "CARRY_WEIGHT": player_data["CARRY_WEIGHT"],
-                "DEFENSE": player_data["DEFENSE"],
-                "PHYSICAL_RESISTANCE": player_data["PHYSICAL_RESISTANCE"],
-                "ENERGY_RESISTANCE": player_data["ENERGY_RESISTANCE"],
-                "RADIATION_RESISTANCE": player_data["RADIATION_RESISTANCE"],
-                "POISON_RESISTANCE": player_data["POISON_RESISTANCE"],
-                "SPECIAL": player_data["SPECIAL"],
-            }
-            self.skills = player_data["SKILLS"]
-            self.perks = player_data["PERKS"]
-
-    def save_in_file(self):
-        """Save the player's data into its file."""
-        if not self.filename:
-            self.filename = f"waste/players/player_{len(os.listdir("waste/players/")) + 1}.json"
-
-        data = {
-            "NAME": self.name,
-            "LVL": self.data["LVL"],
-            "ORIGIN": self.data["ORIGIN"],
-            "HEALTH_POINT": self.data["HEALTH_POINT"],
-            "LUCKY_POINT": self.data["LUCKY_POINT"],
-            "CARRY_WEIGHT": self.data["CARRY_WEIGHT"],
-            "DEFENSE": self.data["DEFENSE"],
-            "PHYSICAL_RESISTANCE": self.data["PHYSICAL_RESISTANCE"],
-            "ENERGY_RESISTANCE": self.data["ENERGY_RESISTANCE"],
-            "RADIATION_RESISTANCE": self.data["RADIATION_RESISTANCE"],
-            "POISON_RESISTANCE": self.data["POISON_RESISTANCE"],
-            "SPECIAL": self.data["SPECIAL"],
-            "SKILLS": self.skills,
-            "PERKS": self.perks,
+        self.restore_from_data(read_player_file(self.filename))
+        self.mark_saved()
+
+    def restore_from_data(self, player_data: dict):
+        """Overwrite the Player's instance with the content of a player's file, already read."""
+        _, name, data, skills, perks, self.version = _split_file_data(self.filename, player_data)
+        self.__assign(name, data, skills, perks)
+
+    def merge_from_file(self):
+        """
+        Take the changes saved in the file by another instance, while keeping the fields changed
+        here. Nothing is merged if a field has been changed on both sides.
+
+        Returns
+        -------
+        set
+            The fields changed on both sides, empty if the merge was done.
+        """
+        other = load_player(self.filename)
+        local_fields = self.dirty_fields()
+        # The fields the other instance changed since this player was loaded or saved
+        other._saved = self._saved  # pylint: disable=protected-access
+        if conflicts := local_fields & other.dirty_fields():
+            return conflicts
+
+        data = other.to_dict()
+        local_data = self.to_dict()
+        for field in local_fields:
+            data[field] = local_data[field]
+        self.restore_from_data(data)
+        # The local changes are still to be saved
+        other.mark_saved()
+        self._saved = other._saved  # pylint: disable=protected-access
+        return set()
+
+    def to_dict(self):
+        """Return the player's data as stored in its file."""
+        data = {"NAME": self.name}
+        for slot, stat in enumerate(STATS_NAMES[len(SPECIAL_NAMES):], len(SPECIAL_NAMES)):
+            data[stat] = self.stats[slot]
+        for index, resistance in enumerate(RESISTANCES_NAMES):
+            data[resistance] = self.resistances[
+                index * BODY_PARTS_COUNT:(index + 1) * BODY_PARTS_COUNT
+            ].tolist()
+        data["SPECIAL"] = {stat: self.stats[slot] for slot, stat in enumerate(SPECIAL_NAMES)}
+        data["SKILLS"] = {
+            str(skill_id): [value, self.skill_tags[skill_id]]
+            for skill_id, value in enumerate(self.skill_values)
+            if value != NO_SKILL
         }
-        with open(self.filename, "w", encoding="utf-8") as file:
-            file.write(json.dumps(data, indent=8))
+        data["PERKS"] = dict(self.perks)
+        data["VERSION"] = self.version
+        return data
+
+    def __snapshot(self):
+        """Return a compact copy of the player's data."""
+        return (
+            self.name,
+            self.stats.tobytes(),
+            self.resistances.tobytes(),
+            self.skill_values.tobytes() + self.skill_tags.tobytes(),
+            frozenset(self.perks.items()),
+        )
+
+    def mark_saved(self):
+        """Remember the current data as the content of the file."""
+        self._saved = self.__snapshot()
+
+    def dirty_fields(self):
+        """Return the set of the fields changed since the last load or save."""
+        if self._saved is None:
+            return set(FIELDS)
+
+        name, stats, resistances, skills, perks = self._saved
+        fields = set()
+        if name != self.name:
+            fields.add("NAME")
+
+        if stats != self.stats.tobytes():
+            saved_stats = array.array("h")
+            saved_stats.frombytes(stats)
+            for slot, stat in enumerate(STATS_NAMES):
+                if saved_stats[slot] != self.stats[slot]:
+                    fields.add("SPECIAL" if stat in SPECIAL_NAMES else stat)
+
+        if resistances != self.resistances.tobytes():
+            saved_resistances = array.array("h")
+            saved_resistances.frombytes(resistances)
+            for index, resistance in enumerate(RESISTANCES_NAMES):
+                part = slice(index * BODY_PARTS_COUNT, (index + 1) * BODY_PARTS_COUNT)
+                if saved_resistances[part] != self.resistances[part]:
+                    fields.add(resistance)
+
+        if skills != self.skill_values.tobytes() + self.skill_tags.tobytes():
+            fields.add("SKILLS")
+        if perks != frozenset(self.perks.items()):
+            fields.add("PERKS")
+        return fields
+
+    def prepare_save(self, force: bool = False):
+        """
+        Encode the player for a save and consider it as saved. A new player gets its file name.
+
+        Parameters
+        ----------
+        force : bool
+            Encode the player even if it did not change.
+
+        Returns
+        -------
+        PendingSave
+            The save to write, None if there is nothing to write.
+        """
+        if self.filename and not force and not self.dirty_fields():
+            return None
+
+        if not self.filename and storage.STORAGE == "sqlite":
+            self.filename = storage.get_store().allocate()
+        elif not self.filename:
+            self.filename = allocate_filename("wst" if SAVE_FORMAT == "binary" else "json")
+
+        pending = PendingSave(self, self._saved)
+        self.version += 1
+        self.mark_saved()
+        pending.payload = encode_player_data(self.to_dict())
+        return pending
+
+    def save_in_file(self, force: bool = False):
+        """
+        Save the player's data into its file, or its row of the database, and keep the roster
+        up to date. The file is replaced atomically, and nothing is written if the player did
+        not change.
+
+        Parameters
+        ----------
+        force : bool
+            Write the file even if the player did not change.
+
+        Returns
+        -------
+        bool
+            True if the file was written.
+
+        Raises
+        ------
+        ConflictError
+            If the file has been saved by another instance since the player was loaded.
+        """
+        from waste.roster import record  # pylint: disable=import-outside-toplevel
+
+        if (pending := self.prepare_save(force)) is None:
+            return False
+
+        try:
+            pending.write()
+        except (OSError, ConflictError):
+            pending.abort()
+            raise
+
+        record(self, pending.dir_mtime)
+        return True
 
     def check_requirements(self, requirements: list):
         """
@@ -130,6 +345,370 @@ class Player:
         ]
 
 
+class PendingSave:
+    """A save encoded by Player.prepare_save, its ``write`` can be called from any thread."""
+
+    __slots__ = ("player", "filename", "payload", "version", "previous", "dir_mtime")
+
+    def __init__(self, player: Player, previous):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        player : Player
+            The saved player.
+        previous
+            What the player knew of its file before this save.
+        """
+        self.player = player
+        self.filename = player.filename
+        self.payload = None
+        # The version the file has to be at
+        self.version = player.version
+        self.previous = previous
+        # The modification time of the players' directory before the write, for the roster
+        self.dir_mtime = None
+
+    def write(self):
+        """Write the save, raises ConflictError if the file is no longer at the expected version."""
+        if not storage.is_database_location(self.filename):
+            self.dir_mtime = os.stat(os.path.dirname(self.filename) or ".").st_mtime_ns
+        write_player_file(self.filename, self.payload, self.version)
+
+    def abort(self):
+        """
+        Forget a save that could not be written, the next save will write the changes again.
+
+        The saves prepared after this one expected it to be written, so they will fail too: the
+        player goes back to the version its file is still at, and the aborts of the later saves
+        change nothing.
+        """
+        if self.player.version > self.version:
+            self.player.version = self.version
+            self.player._saved = self.previous  # pylint: disable=protected-access
+
+
+class _PlayerData:
+    """Dictionnary-like view on the data of a player, as described in Player's constructor."""
+
+    __slots__ = ("_player",)
+
+    def __init__(self, player: Player):
+        """Constructor method."""
+        self._player = player
+
+    def __getitem__(self, item: str):
+        """Return a stat, a resistance (writable view of 6 values) or the S.P.E.C.I.A.L."""
+        if (slot := STATS_SLOTS.get(item)) is not None and item not in SPECIAL_NAMES:
+            return self._player.stats[slot]
+        if item in RESISTANCES_NAMES:
+            index = RESISTANCES_NAMES.index(item)
+            return memoryview(self._player.resistances)[
+                index * BODY_PARTS_COUNT:(index + 1) * BODY_PARTS_COUNT
+            ]
+        if item == "SPECIAL":
+            return _Special(self._player)
+        raise KeyError(item)
+
+    def __setitem__(self, item: str, value):
+        """Overwrite a stat, a resistance or the S.P.E.C.I.A.L."""
+        if (slot := STATS_SLOTS.get(item)) is not None and item not in SPECIAL_NAMES:
+            self._player.stats[slot] = value
+        elif item in RESISTANCES_NAMES:
+            self[item][:] = array.array("h", value)
+        elif item == "SPECIAL":
+            for stat, stat_value in value.items():
+                self._player.stats[SPECIAL_SLOTS[stat]] = stat_value
+        else:
+            raise KeyError(item)
+
+
+class _Special(collections.abc.MutableMapping):
+    """Dictionnary-like view on the S.P.E.C.I.A.L. of a player: {"STR": value, ...}."""
+
+    __slots__ = ("_player",)
+
+    def __init__(self, player: Player):
+        """Constructor method."""
+        self._player = player
+
+    def __getitem__(self, stat: str):
+        return self._player.stats[SPECIAL_SLOTS[stat]]
+
+    def __setitem__(self, stat: str, value: int):
+        self._player.stats[SPECIAL_SLOTS[stat]] = value
+
+    def __delitem__(self, stat: str):
+        raise TypeError("the S.P.E.C.I.A.L. of a player cannot be removed")
+
+    def __iter__(self):
+        return iter(SPECIAL_NAMES)
+
+    def __len__(self):
+        return len(SPECIAL_NAMES)
+
+
+class _Skills(collections.abc.MutableMapping):
+    """Dictionnary-like view on the skills of a player: {id: [value, tagged], ...}."""
+
+    __slots__ = ("_player",)
+
+    def __init__(self, player: Player):
+        """Constructor method."""
+        self._player = player
+
+    def __index(self, skill_id: str):
+        """Return the index of a skill the player has."""
+        index = int(skill_id)
+        if not 0 <= index < len(self._player.skill_values):
+            raise KeyError(skill_id)
+        if self._player.skill_values[index] == NO_SKILL:
+            raise KeyError(skill_id)
+        return index
+
+    def __getitem__(self, skill_id: str):
+        return _Skill(self._player, self.__index(skill_id))
+
+    def __setitem__(self, skill_id: str, value):
+        index = int(skill_id)
+        self._player.skill_values[index], self._player.skill_tags[index] = value
+
+    def __delitem__(self, skill_id: str):
+        self._player.skill_values[self.__index(skill_id)] = NO_SKILL
+        self._player.skill_tags[int(skill_id)] = 0
+
+    def __contains__(self, skill_id):
+        try:
+            self.__index(skill_id)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+    def __iter__(self):
+        for index, value in enumerate(self._player.skill_values):
+            if value != NO_SKILL:
+                yield str(index)
+
+    def __len__(self):
+        return len(self._player.skill_values) - self._player.skill_values.count(NO_SKILL)
+
+
+class _Skill:
+    """Writable [value, tagged] pair of a skill of a player."""
+
+    __slots__ = ("_player", "_index")
+
+    def __init__(self, player: Player, index: int):
+        """Constructor method."""
+        self._player = player
+        self._index = index
+
+    def __arrays(self):
+        return (self._player.skill_values, self._player.skill_tags)
+
+    def __getitem__(self, item: int):
+        return self.__arrays()[item][self._index]
+
+    def __setitem__(self, item: int, value: int):
+        self.__arrays()[item][self._index] = value
+
+    def __iter__(self):
+        return iter((self[0], self[1]))
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def encode_player_data(data: dict, save_format: str = None):
+    """
+    Encode the content of a player's file.
+
+    Parameters
+    ----------
+    data : dict
+        The content of the file, as returned by Player.to_dict.
+    save_format : str
+        "json", "compact" or "binary", defaults to SAVE_FORMAT.
+    """
+    save_format = save_format or SAVE_FORMAT
+    if save_format == "json":
+        return json.dumps(data, indent=8).encode("utf-8")
+
+    compact = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if save_format == "compact":
+        return compact
+    if save_format == "binary":
+        return BINARY_MAGIC + bytes((BINARY_VERSION,)) + zlib.compress(compact, 9)
+    raise ValueError(f"unknown save format: {save_format}")
+
+
+def decode_player_data(raw: bytes):
+    """Decode the content of a player's file, whatever its format."""
+    if raw.startswith(BINARY_MAGIC):
+        version = raw[len(BINARY_MAGIC)]
+        if version != BINARY_VERSION:
+            raise ValueError(f"unsupported binary save version: {version}")
+        raw = zlib.decompress(raw[len(BINARY_MAGIC) + 1:])
+    return json.loads(raw.decode("utf-8"))
+
+
+def read_player_file(filename: str):
+    """Read a player's file, or its row of a database, and return its content as a dictionnary."""
+    if storage.is_database_location(filename):
+        path, player_id = storage.parse_location(filename)
+        return decode_player_data(storage.get_store(path).read(player_id))
+    with open(filename, "rb") as file:
+        return decode_player_data(file.read())
+
+
+def write_player_file(filename: str, payload: bytes, expected_version: int = None):
+    """
+    Write the encoded data of a player in its file, or in its row of a database.
+
+    Parameters
+    ----------
+    filename : str
+        The player's file.
+    payload : bytes
+        The encoded data.
+    expected_version : int
+        The version the file has to be at, its own lock is held while it is checked and
+        replaced. None writes the file whatever its version.
+
+    Raises
+    ------
+    ConflictError
+        If the file is not at the expected version.
+    """
+    if storage.is_database_location(filename):
+        path, player_id = storage.parse_location(filename)
+        player_data = decode_player_data(payload)
+        try:
+            storage.get_store(path).write(
+                player_id,
+                payload,
+                player_data["NAME"],
+                player_data["LVL"],
+                player_data["ORIGIN"],
+                player_data["VERSION"],
+                expected_version,
+            )
+        except sqlite3.Error as error:
+            raise OSError(f"cannot write {filename}: {error}") from error
+        return
+
+    with file_lock(filename):
+        if expected_version is not None:
+            try:
+                version = read_player_file(filename).get("VERSION", 0)
+            except FileNotFoundError:
+                version = 0
+            if version != expected_version:
+                raise ConflictError(filename, version, expected_version)
+        write_atomic(filename, payload)
+
+
+def allocate_filename(extension: str, directory: str = PLAYERS_DIR, after: int = 0):
+    """
+    Return the name of the file of a new player, whose id is greater than ``after``. The ids
+    come from a counter shared by the instances using the directory, so they never pick the
+    same name and the directory is only listed once, to start the counter.
+    """
+    counter = os.path.join(directory, NEXT_ID_FILE)
+    with file_lock(counter):
+        try:
+            with open(counter, "r", encoding="ascii") as file:
+                player_id = int(file.read())
+        except (OSError, ValueError):
+            player_id = 1 + max(
+                (
+                    int(match.group(1))
+                    for name in os.listdir(directory)
+                    if (match := PLAYER_FILE.fullmatch(name))
+                ),
+                default=0,
+            )
+        player_id = max(player_id, after + 1)
+
+        # A counter synced from another machine may be late
+        while any(
+            os.path.exists(os.path.join(directory, f"player_{player_id}.{other_extension}"))
+            for other_extension in ("json", "wst")
+        ):
+            player_id += 1
+        write_atomic(counter, str(player_id + 1).encode("ascii"))
+    return os.path.join(directory, f"player_{player_id}.{extension}")
+
+
+def write_atomic(filename: str, payload: bytes):
+    """
+    Replace the content of a file atomically: a crash leaves either the old or the new file,
+    never a truncated one.
+    """
+    directory = os.path.dirname(filename) or "."
+    # Unlike tempfile.mkstemp, the file is created with the usual permissions for a save
+    temp_filename = os.path.join(
+        directory, f".{os.path.basename(filename)}.{os.getpid()}.{secrets.token_hex(4)}.tmp"
+    )
+    try:
+        with open(temp_filename, "xb") as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, filename)
+    except BaseException:
+        # The temporary file is not there if it could not be created, the error is kept
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_filename)
+        raise
+
+    # Make the rename itself durable
+    if hasattr(os, "O_DIRECTORY"):
+        dir_descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_descriptor)
+        finally:
+            os.close(dir_descriptor)
+
+
+def _split_file_data(filename: str, player_data: dict):
+    """Return the arguments of Player's constructor from the raw content of a player's file."""
+    return (
+        filename,
+        player_data["NAME"],
+        {
+            "LVL": player_data["LVL"],
+            "ORIGIN": player_data["ORIGIN"],
+            "HEALTH_POINT": player_data["HEALTH_POINT"],
+            "LUCKY_POINT": player_data["LUCKY_POINT"],
+            "CARRY_WEIGHT": player_data["CARRY_WEIGHT"],
+            "DEFENSE": player_data["DEFENSE"],
+            "PHYSICAL_RESISTANCE": player_data["PHYSICAL_RESISTANCE"],
+            "ENERGY_RESISTANCE": player_data["ENERGY_RESISTANCE"],
+            "RADIATION_RESISTANCE": player_data["RADIATION_RESISTANCE"],
+            "POISON_RESISTANCE": player_data["POISON_RESISTANCE"],
+            "SPECIAL": player_data["SPECIAL"],
+        },
+        player_data["SKILLS"],
+        player_data["PERKS"],
+        player_data.get("VERSION", 0),
+    )
+
+
+def load_player(filename: str):
+    """Load a player from its file, returns a Player's instance."""
+    player = Player(*_split_file_data(filename, read_player_file(filename)))
+    player.mark_saved()
+    return player
+
+
 def new_player():
     """Create a new player, returns a Player's instance."""
     return Player(
@@ -146,7 +725,7 @@ def new_player():
             "ENERGY_RESISTANCE": [0, 0, 0, 0, 0, 0],
             "RADIATION_RESISTANCE": [0, 0, 0, 0, 0, 0],
             "POISON_RESISTANCE": [0, 0, 0, 0, 0, 0],
-            "SPECIAL": {key.upper(): 5 for key in SPECIAL.keys()},
+            "SPECIAL": {key: 5 for key in gamedata.special()},
         },
         {},
         {},
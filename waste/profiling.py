@@ -0,0 +1,48 @@
+"""Timing of the startup phases, printed by ``waste-run --profile-startup``."""
+
+import contextlib
+import sys
+import time
+
+
+class StartupProfile:
+    """Record the duration of the named phases of the startup."""
+
+    def __init__(self, enabled: bool = True, origin: float = None):
+        """
+        Constructor method, the time origin is the creation of the profile unless an earlier
+        ``time.perf_counter()`` is given.
+        """
+        self.enabled = enabled
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []  # [(name, start, duration), ...] in seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as a phase."""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - self.origin, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        """Record an instant, as a phase without duration."""
+        if self.enabled:
+            self.phases.append((name, time.perf_counter() - self.origin, 0.0))
+
+    def report(self, file=None):
+        """Print the breakdown of the phases."""
+        if not self.enabled:
+            return
+
+        file = file or sys.stderr
+        print("Startup profile (ms):", file=file)
+        print(f"  {'phase':<20} {'start':>9} {'duration':>9}", file=file)
+        for name, start, duration in self.phases:
+            print(f"  {name:<20} {start * 1000:>9.1f} {duration * 1000:>9.1f}", file=file)
+        print(f"  {'total':<20} {(time.perf_counter() - self.origin) * 1000:>9.1f}", file=file)
@@ -0,0 +1,598 @@
+"""Roster manifest: a summary of every player's file so the full saves are only read on demand."""
+
+import json
+import os
+
+from waste import journal, storage
+from waste.concurrency import remove_lock
+from waste.player import (
+    BINARY_MAGIC,
+    PLAYERS_DIR,
+    decode_player_data,
+    load_player,
+    read_player_file,
+    write_atomic,
+)
+
+MANIFEST_VERSION = 1
+PLAYER_EXTENSIONS = (".json", ".wst")
+# Number of saves appended to the log of the manifest before the manifest is rewritten
+MANIFEST_LOG_SIZE = 1000
+
+
+def manifest_path(directory: str):
+    """Return the path of the manifest for the given players' directory."""
+    return os.path.normpath(directory) + ".manifest.json"
+
+
+def manifest_log_path(directory: str):
+    """Return the path of the log of the saves made since the manifest was written."""
+    return os.path.normpath(directory) + ".manifest.log"
+
+
+class RosterEntry:
+    """Summary of a player's file, the Player itself is only loaded when it is needed."""
+
+    def __init__(self, filename: str, name: str, level: int, origin: int, mtime: int, size: int):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        filename : str
+            The path and name of the save file.
+        name : str
+            The name of the player.
+        level : int
+            The level of the player.
+        origin : int
+            The origin of the player.
+        mtime : int
+            The modification time of the file (in nanoseconds) when the entry was made, the
+            revision of the row for a player stored in a database.
+        size : int
+            The size of the file when the entry was made, 0 for a player stored in a database.
+        """
+        self.filename = filename
+        self.name = name
+        self.level = level
+        self.origin = origin
+        self.mtime = mtime
+        self.size = size
+        self._player = None
+        # The file changed while the Player could not be restored
+        self.stale = False
+
+    @property
+    def player(self):
+        """
+        The Player described by this entry, loaded from its file on first access. A stale
+        Player is restored once it is neither edited nor changed.
+        """
+        if self._player is None:
+            self._player = load_player(self.filename)
+        elif self.stale and not self._player.editing and not self._player.dirty_fields():
+            self._player.restore_from_file()
+            self.stale = False
+        return self._player
+
+    def update(self, entry):
+        """
+        Take the summary of a newer entry of the same file, the Player is restored in place.
+
+        A Player bound to an editor, or with unsaved changes, is left as is and the entry is
+        flagged as stale: the Player keeps the version it was loaded from, so its next save is
+        rejected with a ConflictError and the editor asks what to do with the other save.
+        """
+        self.name = entry.name
+        self.level = entry.level
+        self.origin = entry.origin
+        self.mtime = entry.mtime
+        self.size = entry.size
+        if self._player is None:
+            return
+        if self._player.editing or self._player.dirty_fields():
+            self.stale = True
+        else:
+            self._player.restore_from_file()
+            self.stale = False
+
+    def to_dict(self):
+        """Return the entry as stored in the manifest."""
+        return {
+            "NAME": self.name,
+            "LVL": self.level,
+            "ORIGIN": self.origin,
+            "MTIME": self.mtime,
+            "SIZE": self.size,
+        }
+
+
+def _read_entry(filename: str, stat: os.stat_result):
+    """Parse a player's file and return its RosterEntry."""
+    player_data = read_player_file(filename)
+    return RosterEntry(
+        filename,
+        player_data["NAME"],
+        player_data["LVL"],
+        player_data["ORIGIN"],
+        stat.st_mtime_ns,
+        stat.st_size,
+    )
+
+
+class Manifest:
+    """Persistent manifest of the players' files of a directory."""
+
+    def __init__(self, directory: str = PLAYERS_DIR):
+        """Constructor method."""
+        self.directory = directory
+        self.path = manifest_path(directory)
+        # A save only appends its entry to the log, the manifest is rewritten by the refreshes
+        # or once the log is long enough
+        self.log_path = manifest_log_path(directory)
+        self.log_lines = 0
+        self.dir_mtime = None
+        self.entries = {}
+        self.__read()
+
+    def __read(self):
+        """
+        Load the manifest from the disk, then the saves of its log. A missing or broken
+        manifest is just empty.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        if manifest.get("VERSION") != MANIFEST_VERSION:
+            return
+
+        self.dir_mtime = manifest["DIR_MTIME"]
+        self.entries = {
+            filename: RosterEntry(
+                filename,
+                entry["NAME"],
+                entry["LVL"],
+                entry["ORIGIN"],
+                entry["MTIME"],
+                entry["SIZE"],
+            )
+            for filename, entry in manifest["PLAYERS"].items()
+        }
+        self.__read_log()
+
+    def __read_log(self):
+        """
+        Apply the saves of the log to the manifest just read. A line left over from a crash
+        can only make an entry older than its file, so the file is read again by a refresh.
+        """
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as file:
+                lines = [line for line in file if line.endswith("\n")]
+        except OSError:
+            return
+
+        for line in lines:
+            try:
+                filename, entry, dir_mtime = json.loads(line)
+            except (ValueError, TypeError):
+                continue
+            if entry is None:
+                self.entries.pop(filename, None)
+            else:
+                self.entries[filename] = RosterEntry(
+                    filename,
+                    entry["NAME"],
+                    entry["LVL"],
+                    entry["ORIGIN"],
+                    entry["MTIME"],
+                    entry["SIZE"],
+                )
+            self.dir_mtime = dir_mtime
+        self.log_lines = len(lines)
+
+    def write(self):
+        """Write the manifest on the disk, atomically, the log is then emptied."""
+        manifest = {
+            "VERSION": MANIFEST_VERSION,
+            "DIR_MTIME": self.dir_mtime,
+            "PLAYERS": {filename: entry.to_dict() for filename, entry in self.entries.items()},
+        }
+        write_atomic(self.path, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+        try:
+            os.remove(self.log_path)
+        except FileNotFoundError:
+            pass
+        self.log_lines = 0
+
+    def __append(self, filename: str, entry):
+        """
+        Log the change of an entry, None for a removed one, so a save does not rewrite the
+        whole manifest. The manifest is rewritten once the log is long enough.
+        """
+        if self.log_lines + 1 >= MANIFEST_LOG_SIZE:
+            self.write()
+            return
+        line = [filename, None if entry is None else entry.to_dict(), self.dir_mtime]
+        with open(self.log_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.log_lines += 1
+
+    def scan(self):
+        """
+        Return the entries of every player's file of the directory.
+
+        If the directory has not changed since the manifest was written, the manifest is
+        trusted as is. Otherwise, only the files whose mtime or size changed are parsed again.
+        """
+        if not self.is_current():
+            self.refresh()
+        return list(self.entries.values())
+
+    def is_current(self):
+        """
+        Check if the directory has not changed since the manifest was written, so its entries
+        can be trusted without listing the directory. A file changed in place by another tool
+        is only found by a refresh.
+        """
+        try:
+            return os.stat(self.directory).st_mtime_ns == self.dir_mtime
+        except OSError:
+            return False
+
+    def refresh(self):
+        """
+        Compare the directory with the manifest and reload only the added or changed files.
+
+        The entries of the unchanged files are kept along with their Player, and the Player of
+        a changed file is restored in place. Returns the lists of the added, changed and
+        removed entries.
+        """
+        to_load, removed, dir_mtime = self.find_changes(self.state())
+        return self.apply(
+            [entry for entry in map(self.load_entry, to_load) if entry is not None],
+            removed,
+            dir_mtime,
+        )
+
+    # A refresh is split in three steps so the reading of the files can be done outside of the
+    # main loop: ``state`` and ``apply`` have to be called from the thread that owns the
+    # manifest, ``find_changes`` and ``load_entry`` can be called from any thread.
+
+    def state(self):
+        """Return a copy of what the manifest knows of the files, for ``find_changes``."""
+        return {filename: (entry.mtime, entry.size) for filename, entry in self.entries.items()}
+
+    def find_changes(self, state: dict):
+        """
+        Compare the directory with a state of the manifest.
+
+        Returns
+        -------
+        tuple
+            The (filename, stat) of the added or changed files, the names of the removed files
+            and the modification time of the directory.
+        """
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        to_load, found = [], set()
+        with os.scandir(self.directory) as files:
+            for file in files:
+                if file.name.startswith(".") or not file.name.endswith(PLAYER_EXTENSIONS):
+                    continue
+                filename = os.path.join(self.directory, file.name)
+                stat = file.stat()
+                found.add(filename)
+                if state.get(filename) != (stat.st_mtime_ns, stat.st_size):
+                    to_load.append((filename, stat))
+
+        return to_load, [filename for filename in state if filename not in found], dir_mtime
+
+    @staticmethod
+    def load_entry(change: tuple):
+        """Parse an added or changed file, returns its RosterEntry."""
+        return _read_entry(*change)
+
+    def apply(self, entries: list, removed: list, dir_mtime: int = None):
+        """
+        Merge the entries of added or changed files and drop the removed ones. The manifest is
+        only written once the modification time of the directory is given, which marks the
+        last part of a refresh.
+
+        Returns
+        -------
+        tuple
+            The lists of the added, changed and removed entries.
+        """
+        added, changed, removed_entries = [], [], []
+        for entry in entries:
+            if (current := self.entries.get(entry.filename)) is None:
+                self.entries[entry.filename] = entry
+                added.append(entry)
+            elif (current.mtime, current.size) != (entry.mtime, entry.size):
+                current.update(entry)
+                changed.append(current)
+
+        for filename in removed:
+            if (entry := self.entries.pop(filename, None)) is not None:
+                removed_entries.append(entry)
+
+        if dir_mtime is not None and (
+            added or changed or removed_entries or dir_mtime != self.dir_mtime
+        ):
+            self.entries = dict(sorted(self.entries.items()))
+            self.dir_mtime = dir_mtime
+            self.write()
+        return added, changed, removed_entries
+
+    def record(self, player, dir_mtime: int = None):
+        """
+        Update the entry of a player that has just been saved, returns the entry. ``dir_mtime``
+        is the modification time of the directory before the save.
+        """
+        stat = os.stat(player.filename)
+        if (entry := self.entries.get(player.filename)) is None:
+            entry = self.entries[player.filename] = RosterEntry(player.filename, "", 0, -1, 0, 0)
+        entry.name = player.name
+        entry.level = player.data["LVL"]
+        entry.origin = player.data["ORIGIN"]
+        entry.mtime = stat.st_mtime_ns
+        entry.size = stat.st_size
+        entry._player = player  # pylint: disable=protected-access
+        entry.stale = False
+
+        self.__touch(dir_mtime)
+        self.__append(player.filename, entry)
+        return entry
+
+    def record_file(
+        self, filename: str, name: str, level: int, origin: int, dir_mtime: int = None
+    ):
+        """
+        Update the entry of a file written without its Player, by a restore, returns the entry.
+        A Player already loaded from the file is restored as after a save of another instance.
+        """
+        stat = os.stat(filename)
+        entry = RosterEntry(filename, name, level, origin, stat.st_mtime_ns, stat.st_size)
+        if (current := self.entries.get(filename)) is None:
+            self.entries[filename] = entry
+        else:
+            current.update(entry)
+            entry = current
+
+        self.__touch(dir_mtime)
+        self.__append(filename, entry)
+        return entry
+
+    def __touch(self, dir_mtime: int):
+        """
+        Keep the manifest in sync with the directory after a change made by this instance. If
+        the directory had changed before, other instances may have added files: the manifest
+        is left out of date, so the next check reads the directory.
+        """
+        if self.dir_mtime is not None and dir_mtime == self.dir_mtime:
+            self.dir_mtime = os.stat(self.directory).st_mtime_ns
+
+    def forget(self, filename: str, dir_mtime: int = None):
+        """
+        Remove the entry of a deleted file, ``dir_mtime`` is the modification time of the
+        directory before the file was deleted.
+        """
+        if self.entries.pop(filename, None) is not None:
+            self.__touch(dir_mtime)
+            self.__append(filename, None)
+
+    def delete(self, filename: str):
+        """Delete a player's file, its journal, its lock and its entry."""
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        os.remove(filename)
+        journal.remove(filename)
+        remove_lock(filename)
+        self.forget(filename, dir_mtime)
+
+
+class SqliteRoster:
+    """
+    The roster of the players stored in a database, with the same interface as Manifest. The
+    summaries are read from the indexed columns, and the revision counter of the database
+    tells which rows changed since the last refresh.
+    """
+
+    def __init__(self, path: str = storage.DATABASE_PATH):
+        """Constructor method."""
+        self.store = storage.get_store(path)
+        self.revision = 0
+        self.entries = {}
+
+    def scan(self):
+        """Return the entries of every player of the database."""
+        self.refresh()
+        return list(self.entries.values())
+
+    def is_current(self):
+        """Check if no row has changed since the last refresh."""
+        return self.store.revision() == self.revision
+
+    def refresh(self):
+        """
+        Reload only the summaries of the rows changed since the last refresh. Returns the lists
+        of the added, changed and removed entries, as Manifest.refresh.
+        """
+        to_load, removed, revision = self.find_changes(self.state())
+        return self.apply(to_load, removed, revision)
+
+    def state(self):
+        """Return the revision of the last refresh, for ``find_changes``."""
+        return self.revision
+
+    def find_changes(self, state: int):
+        """
+        Read the summaries of the rows changed since a revision, can be called from any thread.
+
+        Returns
+        -------
+        tuple
+            The entries of the added or changed rows, the "file names" of the removed rows and
+            the current revision of the database.
+        """
+        revision = self.store.revision()
+        if revision == state:
+            return [], [], revision
+
+        to_load = [
+            RosterEntry(
+                storage.make_location(self.store.path, player_id),
+                name,
+                level,
+                origin,
+                row_revision,
+                0,
+            )
+            for player_id, name, level, origin, row_revision in self.store.summaries(state)
+        ]
+        removed = [
+            storage.make_location(self.store.path, player_id)
+            for player_id in self.store.deleted_since(state)
+        ]
+        return to_load, removed, revision
+
+    @staticmethod
+    def load_entry(change: RosterEntry):
+        """The summaries are already read by ``find_changes``."""
+        return change
+
+    def apply(self, entries: list, removed: list, revision: int = None):
+        """Merge the entries of the changed rows, as Manifest.apply."""
+        added, changed, removed_entries = [], [], []
+        for entry in entries:
+            if (current := self.entries.get(entry.filename)) is None:
+                self.entries[entry.filename] = entry
+                added.append(entry)
+            elif current.mtime != entry.mtime:
+                current.update(entry)
+                changed.append(current)
+
+        for filename in removed:
+            if (entry := self.entries.pop(filename, None)) is not None:
+                removed_entries.append(entry)
+
+        if revision is not None:
+            self.revision = revision
+        return added, changed, removed_entries
+
+    def record(self, player, dir_mtime: int = None):  # pylint: disable=unused-argument
+        """Update the entry of a player that has just been saved, returns the entry."""
+        _, player_id = storage.parse_location(player.filename)
+        if (entry := self.entries.get(player.filename)) is None:
+            entry = self.entries[player.filename] = RosterEntry(player.filename, "", 0, -1, 0, 0)
+        entry.name = player.name
+        entry.level = player.data["LVL"]
+        entry.origin = player.data["ORIGIN"]
+        entry.mtime = self.store.revision(player_id)
+        entry._player = player  # pylint: disable=protected-access
+        entry.stale = False
+        return entry
+
+    def record_file(
+        self, filename: str, name: str, level: int, origin: int, dir_mtime: int = None
+    ):  # pylint: disable=unused-argument
+        """Update the entry of a row written without its Player, as Manifest.record_file."""
+        _, player_id = storage.parse_location(filename)
+        entry = RosterEntry(filename, name, level, origin, self.store.revision(player_id), 0)
+        if (current := self.entries.get(filename)) is None:
+            self.entries[filename] = entry
+            return entry
+        current.update(entry)
+        return current
+
+    def forget(self, filename: str):
+        """Remove the entry of a deleted player."""
+        self.entries.pop(filename, None)
+
+    def delete(self, filename: str):
+        """Delete a player from the database, its journal and its entry."""
+        _, player_id = storage.parse_location(filename)
+        self.store.delete(player_id)
+        journal.remove(filename)
+        self.forget(filename)
+
+
+_MANIFESTS = {}
+
+
+def get_manifest(directory: str = PLAYERS_DIR):
+    """Return the shared Manifest of the given directory."""
+    directory = os.path.normpath(directory)
+    if directory not in _MANIFESTS:
+        _MANIFESTS[directory] = Manifest(directory)
+    return _MANIFESTS[directory]
+
+
+def get_sqlite_roster(path: str = storage.DATABASE_PATH):
+    """Return the shared SqliteRoster of the given database."""
+    path = os.path.normpath(path)
+    if path not in _MANIFESTS:
+        _MANIFESTS[path] = SqliteRoster(path)
+    return _MANIFESTS[path]
+
+
+def get_roster():
+    """Return the roster of the configured storage: a Manifest or a SqliteRoster."""
+    if storage.STORAGE == "sqlite":
+        return get_sqlite_roster()
+    return get_manifest()
+
+
+def record(player, dir_mtime: int = None):
+    """
+    Record the save of a player in the roster it belongs to, ``dir_mtime`` is the modification
+    time of the players' directory before the save.
+    """
+    if storage.is_database_location(player.filename):
+        path, _ = storage.parse_location(player.filename)
+        return get_sqlite_roster(path).record(player)
+    return get_manifest(os.path.dirname(player.filename)).record(player, dir_mtime)
+
+
+def migrate(directory: str = PLAYERS_DIR, path: str = storage.DATABASE_PATH):
+    """
+    Copy every player's file of a directory into a database, the files are left untouched.
+    Returns the number of players copied.
+    """
+    store = storage.get_store(path)
+    count = 0
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(".") or not name.endswith(PLAYER_EXTENSIONS):
+            continue
+        with open(os.path.join(directory, name), "rb") as file:
+            payload = file.read()
+        player_data = decode_player_data(payload)
+        _, player_id = storage.parse_location(store.allocate())
+        store.write(
+            player_id,
+            payload,
+            player_data["NAME"],
+            player_data["LVL"],
+            player_data["ORIGIN"],
+            player_data.get("VERSION", 0),
+        )
+        count += 1
+    return count
+
+
+def export(path: str = storage.DATABASE_PATH, directory: str = PLAYERS_DIR):
+    """
+    Write every player of a database as a file of a directory, named after its id in the
+    database. Returns the number of players written.
+    """
+    store = storage.get_store(path)
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for player_id, *_ in store.summaries():
+        payload = store.read(player_id)
+        extension = "wst" if payload.startswith(BINARY_MAGIC) else "json"
+        write_atomic(os.path.join(directory, f"player_{player_id}.{extension}"), payload)
+        count += 1
+    return count
@@ -0,0 +1,440 @@
+"""
+The delta-sync server started by ``waste-run --serve``, see ``waste.sync``. It runs an asyncio
+loop on its own thread and never blocks the interface. It serves:
+
+- ``GET /players``: the players of the roster, ``{key: name}``;
+- ``GET /players/<key>``: a player as JSON, with an ETag, and the ``X-Sync-Sequence`` of the
+  feed to follow from, so no edit is missed between the two requests;
+- ``GET /events?player=<key>&since=<id>``: a Server-Sent Events feed of the edits made in the
+  editor, one field per event ``[key, path, value]``, resumed from the ``Last-Event-ID``
+  header;
+- ``GET /changes?player=<key>&since=<id>``: the same edits, by long polling;
+- ``GET /sheet/<key>``: a page displaying a player, updated by its feed.
+
+The key of a player is the id of its file, or of its row in the database. The ids of the events
+are ``<nonce>-<sequence>``, the nonce being drawn at each start of the server: a client that
+resumes with an id of another run is sent a ``reset`` event, and has to fetch its player again.
+"""
+
+import asyncio
+import collections
+import json
+import secrets
+import threading
+import urllib.parse
+
+from waste import gamedata
+from waste.player import read_player_file
+from waste.sync import player_key
+
+# Events kept for the clients that reconnect, the older ones have to fetch the players again
+BACKLOG_SIZE = 1024
+# Seconds between two comments on an idle feed, so dead clients are noticed
+KEEPALIVE_INTERVAL = 15
+# Longest wait of a long polling request, in seconds
+POLL_TIMEOUT = 25
+REQUEST_TIMEOUT = 10
+
+STATUS = {
+    200: "200 OK",
+    304: "304 Not Modified",
+    400: "400 Bad Request",
+    404: "404 Not Found",
+    405: "405 Method Not Allowed",
+}
+
+
+def apply_edit(document: dict, path: list, value):
+    """Apply an edit of the feed to a player's data, as ``journal.set_value`` does on a Player."""
+    kind = path[0]
+    if kind == "NAME":
+        document["NAME"] = value
+    elif kind == "STAT":
+        if path[1] in document["SPECIAL"]:
+            document["SPECIAL"][path[1]] = value
+        else:
+            document[path[1]] = value
+    elif kind == "RESISTANCE":
+        document[path[1]][path[2]] = value
+    elif kind in ("SKILL", "PERK"):
+        field = "SKILLS" if kind == "SKILL" else "PERKS"
+        if value:
+            document[field][path[1]] = value
+        else:
+            document[field].pop(path[1], None)
+
+
+class SyncServer:
+    """
+    The server and its feed of edits. The edits are published from the interface's thread,
+    everything else happens on the server's own loop.
+    """
+
+    def __init__(self, host: str, port: int, roster=None):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        host : str
+            The address to listen on, "0.0.0.0" for the other devices of the network.
+        port : int
+            The port to listen on, 0 picks a free one.
+        roster : Manifest or SqliteRoster
+            The roster whose players are served.
+        """
+        self.host = host
+        self.port = port
+        self.roster = roster
+        self.loop = None
+        self.server = None
+        self.ready = threading.Event()
+        # Part of the event ids and of the ETags made from the sequence numbers, which start
+        # over with the server: "<nonce>-<sequence>"
+        self.nonce = secrets.token_hex(4)
+
+        # Owned by the loop
+        self.sequence = 0
+        self.events = collections.deque(maxlen=BACKLOG_SIZE)  # (sequence, key, kind, data)
+        # The players edited in this session: {key: (data, sequence of their last event)}
+        self.documents = {}
+        self.locations = {}  # {key: filename} of the roster
+        self.wakeup = None
+
+    def start(self):
+        """Start the server on its own thread, returns once it is listening."""
+        threading.Thread(
+            target=asyncio.run, args=(self.__serve(),), name="waste-sync", daemon=True
+        ).start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    async def __serve(self):
+        """Listen until the server is closed."""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.server = await asyncio.start_server(self.__handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    # Publication, from the interface's thread
+
+    def publish(self, filename: str, path: tuple, value):
+        """Publish the edit of a field of a player."""
+        if (key := player_key(filename)) is not None:
+            self.loop.call_soon_threadsafe(self.__add_edit, key, path, value)
+
+    def publish_player(self, player):
+        """Publish a whole player, only sent to the clients if it changed."""
+        if (key := player_key(player.filename)) is not None:
+            self.loop.call_soon_threadsafe(self.__add_document, key, player.to_dict())
+
+    # Feed, on the loop
+
+    def __add_event(self, key: str, kind: str, data: str):
+        """Add an event to the feed and wake the clients up."""
+        self.sequence += 1
+        self.events.append((self.sequence, key, kind, data))
+        self.wakeup.set()
+        self.wakeup = asyncio.Event()
+
+    def __add_edit(self, key: str, path: tuple, value):
+        """Record the edit of a field in the feed."""
+        if key in self.documents:
+            apply_edit(self.documents[key][0], path, value)
+            self.documents[key] = (self.documents[key][0], self.sequence + 1)
+        data = json.dumps([key, list(path), value], separators=(",", ":"), ensure_ascii=False)
+        self.__add_event(key, "", data)
+
+    def __add_document(self, key: str, document: dict):
+        """Record a whole player in the feed, if it changed."""
+        if key in self.documents and self.documents[key][0] == document:
+            return
+        self.documents[key] = (document, self.sequence + 1)
+        data = json.dumps(
+            {"key": key, "player": document}, separators=(",", ":"), ensure_ascii=False
+        )
+        self.__add_event(key, "player", data)
+
+    def __event_id(self, sequence: int):
+        """Return the id of the event of a sequence number, as sent to the clients."""
+        return f"{self.nonce}-{sequence}"
+
+    def __parse_event_id(self, event_id: str):
+        """
+        Return the sequence number of an event id given by a client, None if it comes from
+        another run of the server. Raises ValueError if it is not an event id.
+        """
+        nonce, _, sequence = event_id.rpartition("-")
+        sequence = int(sequence)
+        if (nonce and nonce != self.nonce) or sequence > self.sequence:
+            return None
+        return sequence
+
+    def __events_since(self, sequence, key: str = None):
+        """
+        Return the events after a sequence number, of one player or of all of them. None if
+        some of them are no longer in the backlog, or the sequence number is not known.
+        """
+        if sequence is None or (self.events and sequence < self.events[0][0] - 1):
+            return None
+        events = []
+        for event in reversed(self.events):
+            if event[0] <= sequence:
+                break
+            if key is None or event[1] == key:
+                events.append(event)
+        return events[::-1]
+
+    # HTTP, on the loop
+
+    async def __handle(self, reader, writer):
+        """Serve a request, the connection is closed afterwards."""
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+            request_line, *header_lines = request.decode("latin-1").split("\r\n")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {
+                name.strip().lower(): value.strip()
+                for name, _, value in (line.partition(":") for line in header_lines if line)
+            }
+            url = urllib.parse.urlsplit(target)
+            query = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+
+            if method != "GET":
+                await self.__respond(writer, 405)
+            else:
+                await self.__route(writer, url.path.rstrip("/").split("/")[1:], query, headers)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            pass
+        except ValueError:
+            await self.__respond(writer, 400)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def __route(self, writer, parts: list, query: dict, headers: dict):
+        """Dispatch a GET request on its path."""
+        if parts == ["players"]:
+            players = {
+                key: entry.name
+                for filename, entry in list(self.roster.entries.items())
+                if (key := player_key(filename)) is not None
+            }
+            await self.__respond_json(writer, players)
+        elif len(parts) == 2 and parts[0] == "players":
+            await self.__player(writer, parts[1], headers)
+        elif parts == ["events"]:
+            since = headers.get("last-event-id") or query.get("since")
+            since = self.sequence if since is None else self.__parse_event_id(since)
+            await self.__feed(writer, since, query.get("player"))
+        elif parts == ["changes"]:
+            since = query.get("since")
+            since = self.sequence if since is None else self.__parse_event_id(since)
+            await self.__poll(writer, since, query.get("player"))
+        elif len(parts) == 2 and parts[0] == "sheet":
+            await self.__respond(writer, 200, _sheet_page(parts[1]), "text/html; charset=utf-8")
+        else:
+            await self.__respond(writer, 404)
+
+    def __location(self, key: str):
+        """Return the filename of a player of the roster, None if there is none."""
+        if key not in self.locations:
+            self.locations = {
+                player_key(filename): filename for filename in list(self.roster.entries)
+            }
+        return self.locations.get(key)
+
+    async def __player(self, writer, key: str, headers: dict):
+        """Send a player, or 304 if the client already has it."""
+        # The sequence to follow the feed from: the data sent has every event up to it
+        sequence = self.sequence
+        if key in self.documents:
+            document, revision = self.documents[key]
+            etag = f'"{self.nonce}-{key}-{revision}"'
+            body = json.dumps(document, ensure_ascii=False).encode("utf-8")
+        else:
+            if (filename := self.__location(key)) is None:
+                await self.__respond(writer, 404)
+                return
+            try:
+                document = await self.loop.run_in_executor(None, read_player_file, filename)
+            except (OSError, ValueError):
+                await self.__respond(writer, 404)
+                return
+            etag = f'"{key}-v{document.get("VERSION", 0)}"'
+            body = json.dumps(document, ensure_ascii=False).encode("utf-8")
+
+        extra_headers = [f"ETag: {etag}", f"X-Sync-Sequence: {self.__event_id(sequence)}"]
+        if headers.get("if-none-match") == etag:
+            await self.__respond(writer, 304, headers=extra_headers)
+        else:
+            await self.__respond(writer, 200, body, headers=extra_headers)
+
+    async def __feed(self, writer, since, key: str = None):
+        """Stream the events of the feed until the client leaves."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\n"
+        )
+        while True:
+            wakeup = self.wakeup
+            if (events := self.__events_since(since, key)) is None:
+                # Too late to resume, the client has to fetch the players again
+                event_id = self.__event_id(self.sequence)
+                writer.write(f"id: {event_id}\nevent: reset\ndata: {{}}\n\n".encode("utf-8"))
+                events = []
+            since = self.sequence
+            for sequence, _, kind, data in events:
+                event_type = f"event: {kind}\n" if kind else ""
+                event_id = self.__event_id(sequence)
+                writer.write(f"id: {event_id}\n{event_type}data: {data}\n\n".encode("utf-8"))
+            await writer.drain()
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                writer.write(b": keep-alive\n\n")
+
+    async def __poll(self, writer, since, key: str = None):
+        """Send the events after a sequence number, waiting for one if there is none yet."""
+        deadline = self.loop.time() + POLL_TIMEOUT
+        while (events := self.__events_since(since, key)) == [] and self.loop.time() < deadline:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), deadline - self.loop.time())
+            except asyncio.TimeoutError:
+                break
+
+        if events is None:
+            body = f'{{"since":"{self.__event_id(self.sequence)}","reset":true}}'
+        else:
+            changes = ",".join(
+                f'{{"player":{data}}}' if kind else data for _, _, kind, data in events
+            )
+            body = f'{{"since":"{self.__event_id(self.sequence)}","changes":[{changes}]}}'
+        await self.__respond(writer, 200, body.encode("utf-8"))
+
+    @staticmethod
+    async def __respond(
+        writer, status: int, body: bytes = b"", content_type: str = None, headers: list = ()
+    ):
+        """Send a response and close the connection."""
+        lines = [
+            f"HTTP/1.1 {STATUS[status]}",
+            f"Content-Type: {content_type or 'application/json'}",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",
+            "Connection: close",
+            *headers,
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def __respond_json(self, writer, data):
+        """Send a JSON response."""
+        await self.__respond(writer, 200, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+_SHEET_PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>W.A.S.T.E.</title>
+<style>
+body { font-family: sans-serif; margin: 1em; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+td { padding: 0.2em 0.6em; border-bottom: 1px solid #ccc; }
+</style>
+</head>
+<body>
+<h1 id="name"></h1>
+<div id="sheet"></div>
+<script>
+const KEY = __KEY__;
+const NAMES = __NAMES__;
+let player = null;
+let feed = null;
+
+function table(title, rows) {
+  return "<h2>" + title + "</h2><table>" + rows.map(
+    ([name, value]) => "<tr><td>" + name + "</td><td>" + value + "</td></tr>"
+  ).join("") + "</table>";
+}
+
+function render() {
+  document.getElementById("name").textContent = player.NAME;
+  const special = Object.entries(player.SPECIAL).map(
+    ([stat, value]) => [NAMES.SPECIAL[stat], value]
+  );
+  const stats = ["LVL", "HEALTH_POINT", "LUCKY_POINT", "CARRY_WEIGHT", "DEFENSE"].map(
+    (stat) => [NAMES.STATS[stat], player[stat]]
+  );
+  const skills = Object.entries(player.SKILLS).map(
+    ([id, [rank, tag]]) => [NAMES.SKILLS[id] + (tag ? " ★" : ""), rank]
+  );
+  const perks = Object.entries(player.PERKS).map(([id, rank]) => [NAMES.PERKS[id], "Rang " + rank]);
+  document.getElementById("sheet").innerHTML = table("S.P.E.C.I.A.L.", special)
+    + table("Statistiques", stats) + table("Compétences", skills) + table("Atouts", perks);
+}
+
+function apply([key, path, value]) {
+  const [kind, field, index] = path;
+  if (kind === "NAME") player.NAME = value;
+  else if (kind === "STAT") {
+    if (field in player.SPECIAL) player.SPECIAL[field] = value; else player[field] = value;
+  } else if (kind === "RESISTANCE") player[field][index] = value;
+  else {
+    const target = kind === "SKILL" ? player.SKILLS : player.PERKS;
+    if (value) target[field] = value; else delete target[field];
+  }
+}
+
+// The feed is followed from the sequence of the data fetched, so no edit is missed in between
+async function follow() {
+  if (feed) feed.close();
+  const response = await fetch("/players/" + KEY);
+  player = await response.json();
+  render();
+  const since = response.headers.get("X-Sync-Sequence");
+  feed = new EventSource("/events?player=" + KEY + "&since=" + since);
+  feed.onmessage = (event) => { apply(JSON.parse(event.data)); render(); };
+  feed.addEventListener("player", (event) => { player = JSON.parse(event.data).player; render(); });
+  feed.addEventListener("reset", follow);
+}
+
+follow();
+</script>
+</body>
+</html>
+"""
+
+
+def _sheet_page(key: str):
+    """Return the page displaying a player."""
+    names = {
+        "SPECIAL": gamedata.special(),
+        "STATS": {
+            "LVL": "Niveau",
+            "HEALTH_POINT": "Points de vie",
+            "LUCKY_POINT": "Points de chance",
+            "CARRY_WEIGHT": "Charge",
+            "DEFENSE": "Défense",
+        },
+        "SKILLS": gamedata.skills(),
+        "PERKS": [perk["name"] for perk in gamedata.perks()],
+    }
+    # The JSON is made safe to embed in a script element
+    page = _SHEET_PAGE.replace("__KEY__", json.dumps(key).replace("<", "\\u003c"))
+    page = page.replace("__NAMES__", json.dumps(names, ensure_ascii=False).replace("<", "\\u003c"))
+    return page.encode("utf-8")
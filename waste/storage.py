@@ -0,0 +1,250 @@
+"""SQLite storage of the roster, an alternative to the directory of players' files."""
+
+import os
+import sqlite3
+import threading
+
+from waste.concurrency import ConflictError
+
+# "json" stores each player in its own file of PLAYERS_DIR, "sqlite" stores the whole roster in
+# the DATABASE_PATH database
+STORAGE = os.environ.get("WASTE_STORAGE", "json")
+DATABASE_PATH = os.environ.get("WASTE_DATABASE", "waste/players.sqlite3")
+
+# The "file name" of a player stored in a database is "sqlite:<database path>#<id>"
+DATABASE_PREFIX = "sqlite:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL DEFAULT '',
+    level INTEGER NOT NULL DEFAULT 0,
+    origin INTEGER NOT NULL DEFAULT -1,
+    revision INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    data BLOB
+);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+CREATE INDEX IF NOT EXISTS players_level ON players (level);
+CREATE INDEX IF NOT EXISTS players_origin ON players (origin);
+CREATE INDEX IF NOT EXISTS players_revision ON players (revision);
+CREATE TABLE IF NOT EXISTS deleted (
+    id INTEGER PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deleted_revision ON deleted (revision);
+CREATE TABLE IF NOT EXISTS counter (
+    value INTEGER NOT NULL
+);
+INSERT INTO counter (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM counter);
+"""
+
+
+def is_database_location(filename: str):
+    """Check if a player's "file name" designates a player stored in a database."""
+    return filename.startswith(DATABASE_PREFIX)
+
+
+def make_location(path: str, player_id: int):
+    """Return the "file name" of a player stored in a database."""
+    return f"{DATABASE_PREFIX}{path}#{player_id}"
+
+
+def parse_location(filename: str):
+    """Return the database path and the id of a player from its "file name"."""
+    path, _, player_id = filename[len(DATABASE_PREFIX):].rpartition("#")
+    return path, int(player_id)
+
+
+class SqliteStore:
+    """
+    A roster stored in a single SQLite database in WAL mode. Each thread gets its own
+    connection, so the autosave thread can write while the interface reads.
+    """
+
+    def __init__(self, path: str = DATABASE_PATH):
+        """Constructor method, the database is created if needed."""
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(players)")}
+            if "version" not in columns:
+                connection.execute(
+                    "ALTER TABLE players ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+
+    def connection(self):
+        """Return the connection of the current thread."""
+        if (connection := getattr(self.local, "connection", None)) is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    @staticmethod
+    def __next_revision(connection):
+        """Increment and return the revision counter, within the current transaction."""
+        connection.execute("UPDATE counter SET value = value + 1")
+        return connection.execute("SELECT value FROM counter").fetchone()[0]
+
+    def allocate(self, after: int = 0):
+        """Reserve the id of a new player, greater than ``after``, returns its "file name"."""
+        with self.connection() as connection:
+            if after:
+                # The ids of AUTOINCREMENT are greater than any id used before, even deleted
+                player_id = connection.execute(
+                    "INSERT INTO players (id, data) SELECT max(?, coalesce(max(seq), 0)) + 1, NULL "
+                    "FROM sqlite_sequence WHERE name = 'players'",
+                    (after,),
+                ).lastrowid
+            else:
+                player_id = connection.execute(
+                    "INSERT INTO players (data) VALUES (NULL)"
+                ).lastrowid
+        return make_location(self.path, player_id)
+
+    def read(self, player_id: int):
+        """Return the encoded data of a player."""
+        row = self.connection().execute(
+            "SELECT data FROM players WHERE id = ? AND data IS NOT NULL", (player_id,)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(make_location(self.path, player_id))
+        return row[0]
+
+    def write(
+        self,
+        player_id: int,
+        payload: bytes,
+        name: str,
+        level: int,
+        origin: int,
+        version: int = 0,
+        expected_version: int = None,
+    ):
+        """
+        Store the encoded data of a player, along with the indexed columns.
+
+        Parameters
+        ----------
+        player_id : int
+            The id of the player.
+        payload : bytes
+            The encoded data.
+        name, level, origin
+            The indexed columns.
+        version : int
+            The version of the data.
+        expected_version : int
+            The version the row has to be at, None writes the row whatever its version.
+
+        Raises
+        ------
+        ConflictError
+            If the row is not at the expected version.
+        """
+        with self.connection() as connection:
+            # The revision is increased first, so the row is checked within the write lock
+            revision = self.__next_revision(connection)
+            if expected_version is not None:
+                row = connection.execute(
+                    "SELECT version FROM players WHERE id = ?", (player_id,)
+                ).fetchone()
+                if (current := row[0] if row else 0) != expected_version:
+                    raise ConflictError(
+                        make_location(self.path, player_id), current, expected_version
+                    )
+            connection.execute(
+                "INSERT INTO players (id, name, level, origin, revision, version, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "name = excluded.name, level = excluded.level, origin = excluded.origin, "
+                "revision = excluded.revision, version = excluded.version, data = excluded.data",
+                (player_id, name, level, origin, revision, version, payload),
+            )
+            connection.execute("DELETE FROM deleted WHERE id = ?", (player_id,))
+
+    def delete(self, player_id: int):
+        """Delete a player."""
+        with self.connection() as connection:
+            revision = self.__next_revision(connection)
+            connection.execute("DELETE FROM players WHERE id = ?", (player_id,))
+            connection.execute(
+                "INSERT OR REPLACE INTO deleted (id, revision) VALUES (?, ?)", (player_id, revision)
+            )
+
+    def revision(self, player_id: int = None):
+        """Return the revision of the last change of a player, or of the whole database."""
+        if player_id is None:
+            return self.connection().execute("SELECT value FROM counter").fetchone()[0]
+        row = self.connection().execute(
+            "SELECT revision FROM players WHERE id = ?", (player_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def summaries(self, since: int = 0):
+        """
+        Return the (id, name, level, origin, revision) of the players changed after the given
+        revision, without reading their data.
+        """
+        return self.connection().execute(
+            "SELECT id, name, level, origin, revision FROM players "
+            "WHERE revision > ? AND data IS NOT NULL ORDER BY id",
+            (since,),
+        ).fetchall()
+
+    def deleted_since(self, since: int):
+        """Return the ids of the players deleted after the given revision."""
+        return [
+            row[0]
+            for row in self.connection().execute(
+                "SELECT id FROM deleted WHERE revision > ?", (since,)
+            )
+        ]
+
+    def query(self, name: str = None, min_level: int = None, max_level: int = None, origin=None):
+        """
+        Return the (id, name, level, origin) of the players matching all the given filters, using
+        the indexes of the database.
+
+        Parameters
+        ----------
+        name : str
+            A prefix of the name.
+        min_level, max_level : int
+            The bounds of the level.
+        origin : int
+            The origin.
+        """
+        conditions, parameters = ["data IS NOT NULL"], []
+        if name is not None:
+            conditions.append("name >= ? AND name < ?")
+            parameters += [name, name + "\U0010ffff"]
+        if min_level is not None:
+            conditions.append("level >= ?")
+            parameters.append(min_level)
+        if max_level is not None:
+            conditions.append("level <= ?")
+            parameters.append(max_level)
+        if origin is not None:
+            conditions.append("origin = ?")
+            parameters.append(origin)
+
+        return self.connection().execute(
+            "SELECT id, name, level, origin FROM players WHERE "
+            + " AND ".join(conditions)
+            + " ORDER BY name, id",
+            parameters,
+        ).fetchall()
+
+
+_STORES = {}
+
+
+def get_store(path: str = DATABASE_PATH):
+    """Return the shared SqliteStore of a database."""
+    path = os.path.normpath(path)
+    if path not in _STORES:
+        _STORES[path] = SqliteStore(path)
+    return _STORES[path]
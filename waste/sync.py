@@ -0,0 +1,75 @@
+"""
+Local delta-sync, so the players follow their own sheet on a phone or a tablet while the game
+master edits the roster.
+
+The editor publishes its edits here. They are only sent once the server of ``waste.server`` has
+been started by ``waste-run --serve [HOST:]PORT`` (or ``WASTE_SYNC_ADDRESS``): the server and
+asyncio are not even imported otherwise, so the startup does not pay for them.
+"""
+
+import os
+import sys
+
+from waste import storage
+from waste.player import PLAYER_FILE
+
+# The address of the server, empty to disable it
+SYNC_ADDRESS = os.environ.get("WASTE_SYNC_ADDRESS", "")
+DEFAULT_HOST = "127.0.0.1"
+
+
+def player_key(filename: str):
+    """Return the key of a player in the URLs, None for an unsaved player."""
+    if not filename:
+        return None
+    if storage.is_database_location(filename):
+        return str(storage.parse_location(filename)[1])
+    if (match := PLAYER_FILE.fullmatch(os.path.basename(filename))) is None:
+        return None
+    return match.group(1)
+
+
+def parse_address(address: str):
+    """Return the (host, port) of an address given as "port" or "host:port"."""
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_HOST, int(port)
+
+
+_SERVER = None
+
+
+def start(address: str, roster):
+    """
+    Start the sync server of the roster, the edits published afterwards are sent to the clients.
+
+    Parameters
+    ----------
+    address : str
+        "port" or "host:port", the host defaults to the local machine only.
+    roster : Manifest or SqliteRoster
+        The roster whose players are served.
+
+    Returns
+    -------
+    SyncServer
+        The running server.
+    """
+    global _SERVER  # pylint: disable=global-statement
+    from waste.server import SyncServer  # pylint: disable=import-outside-toplevel
+
+    host, port = parse_address(address)
+    _SERVER = SyncServer(host, port, roster).start()
+    print(f"Sync server listening on http://{host}:{_SERVER.port}/", file=sys.stderr)
+    return _SERVER
+
+
+def publish(player, path: tuple, value):
+    """Publish the edit of a field of a player, nothing is done if the server is not running."""
+    if _SERVER is not None:
+        _SERVER.publish(player.filename, path, value)
+
+
+def publish_player(player):
+    """Publish a whole player, nothing is done if the server is not running."""
+    if _SERVER is not None:
+        _SERVER.publish_player(player)
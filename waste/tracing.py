@@ -0,0 +1,160 @@
+"""
+Opt-in tracing of the UI's signal handlers and of the hot data paths, enabled by
+``waste-run --trace FILE`` or ``WASTE_TRACE=FILE``.
+
+The spans are written as a Chrome trace file, to be opened in chrome://tracing or Perfetto, and
+the slowest handlers are printed when the application stops. Nothing is wrapped unless the
+tracing is installed, so it costs nothing when it is disabled.
+"""
+
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+# The Chrome trace file, empty to disable the tracing
+TRACE_FILE = os.environ.get("WASTE_TRACE", "")
+# Spans kept for the trace file, the following ones are only counted in the summary
+MAX_EVENTS = 1_000_000
+# Number of handlers listed in the summary
+SUMMARY_SIZE = 15
+
+
+class Tracer:
+    """Record the spans of the traced functions, with their count and their durations."""
+
+    def __init__(self):
+        """Constructor method, the time origin is the creation of the tracer."""
+        self.origin = time.perf_counter()
+        self.events = []
+        # {name: [count, total duration, max duration], ...} in seconds
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def add(self, name: str, category: str, start: float, duration: float):
+        """Record a span, the times are given by ``time.perf_counter``."""
+        with self.lock:
+            if len(self.events) < MAX_EVENTS:
+                self.events.append(
+                    {
+                        "name": name,
+                        "cat": category,
+                        "ph": "X",
+                        "ts": (start - self.origin) * 1e6,
+                        "dur": duration * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_ident(),
+                    }
+                )
+            if (stats := self.stats.get(name)) is None:
+                stats = self.stats[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "code"):
+        """Trace the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, time.perf_counter() - start)
+
+    def wrap(self, function, name: str, category: str):
+        """Return the function traced under the given name."""
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(name, category, start, time.perf_counter() - start)
+
+        return traced
+
+    def instrument(self, cls, names: list, category: str):
+        """
+        Replace methods of a class by their traced version, before any instance connects them
+        to a signal.
+
+        Parameters
+        ----------
+        cls : type
+            The class.
+        names : list
+            The names of the methods, the private ones with their mangled names.
+        category : str
+            The category of the spans in the trace file.
+        """
+        for name in names:
+            display_name = name.replace(f"_{cls.__name__}__", "__")
+            traced = self.wrap(vars(cls)[name], f"{cls.__name__}.{display_name}", category)
+            setattr(cls, name, traced)
+
+    def write(self, filename: str):
+        """Write the spans as a Chrome trace file."""
+        with self.lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(trace, file)
+
+    def report(self, file=None, size: int = SUMMARY_SIZE):
+        """Print the traced functions that took the most time."""
+        file = file or sys.stderr
+        with self.lock:
+            stats = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        print("Slowest handlers (ms):", file=file)
+        print(f"  {'name':<45} {'count':>7} {'total':>9} {'mean':>7} {'max':>7}", file=file)
+        for name, (count, total, longest) in stats[:size]:
+            print(
+                f"  {name:<45} {count:>7} {total * 1000:>9.1f} {total / count * 1000:>7.2f}"
+                f" {longest * 1000:>7.2f}",
+                file=file,
+            )
+
+    def finish(self, filename: str):
+        """Write the trace file and print the summary, when the application stops."""
+        self.write(filename)
+        self.report()
+        print(f"Trace written in {filename}", file=sys.stderr)
+
+
+def install(filename: str):
+    """
+    Trace every signal handler of the main window and of the editor, the saves and the loads
+    of the players, the checks of the perks' requirements and the rebuilds of the editor's
+    grids. The trace is written in the given file at exit.
+
+    Returns
+    -------
+    Tracer
+        The tracer, to add spans of its own.
+    """
+    # Imported here, the UI needs a display and the tracing is only installed on request
+    from waste import ui  # pylint: disable=import-outside-toplevel
+    from waste.player import Player  # pylint: disable=import-outside-toplevel
+
+    tracer = Tracer()
+    for cls in (ui.MainHandler, ui.EditHandler):
+        handlers = [
+            name
+            for name, value in vars(cls).items()
+            if name.startswith("on_") and inspect.isfunction(value)
+        ]
+        tracer.instrument(cls, handlers, "handler")
+    tracer.instrument(
+        ui.EditHandler,
+        ["_EditHandler__update_skills_grid", "_EditHandler__update_perks_grid"],
+        "grid",
+    )
+    tracer.instrument(Player, ["save_in_file", "restore_from_file", "check_requirements"], "data")
+
+    atexit.register(tracer.finish, filename)
+    return tracer
@@ -1,234 +1,662 @@
 """Handle all the signals from the UI."""
 
-import json
+import functools
+import importlib.resources
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import gi
 
-from waste.player import ORIGINS, PERKS, SKILLS, SPECIAL, Player, new_player
+from waste import gamedata
+from waste.concurrency import ConflictError
+from waste.journal import Journal, get_value, set_value
+from waste.perks import eligibility
+from waste.planner import NoPlanError, plan
+from waste.player import Player, new_player
+from waste.profiling import StartupProfile
+from waste.roster import get_roster, record
+from waste.sync import publish, publish_player
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
+
+# Seconds between two checks of the players' directory for changes made by other tools or
+# other machines, 0 disables the polling
+POLL_INTERVAL = int(os.environ.get("WASTE_POLL_INTERVAL", "0"))
+
+# Milliseconds without change before the editor writes the player, 0 disables the autosave
+AUTOSAVE_DELAY = int(os.environ.get("WASTE_AUTOSAVE_DELAY", "0"))
+# A single worker keeps the autosaves of a player in order
+AUTOSAVE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="waste-autosave")
+
+# Threads reading the players' files, the loading is bound by the disk or the network
+LOAD_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("WASTE_LOAD_WORKERS", "8")), thread_name_prefix="waste-load"
+)
+# The loaded entries are added to the list by batches of LOAD_BATCH_SIZE entries, or every
+# LOAD_BATCH_INTERVAL seconds
+LOAD_BATCH_SIZE = 200
+LOAD_BATCH_INTERVAL = 0.1
+
+STATS_FIELDS = ("LVL", "HEALTH_POINT", "LUCKY_POINT", "CARRY_WEIGHT", "DEFENSE")
+RESISTANCES_FIELDS = (
+    "PHYSICAL_RESISTANCE",
+    "ENERGY_RESISTANCE",
+    "RADIATION_RESISTANCE",
+    "POISON_RESISTANCE",
+)
+BODY_PARTS = ("head", "torso", "rightarm", "leftarm", "rightleg", "leftleg")
+
+FILENAME_COLUMN = 3  # Column of the file name in the players_store list
+
+
+class RosterLoader:
+    """
+    Load the changes of a roster on LOAD_EXECUTOR's threads. The entries are delivered by
+    batches on the main loop, so a slow or huge players' directory never freezes the interface.
+    """
+
+    def __init__(self, roster, on_batch, on_done, on_progress):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        roster : Manifest or SqliteRoster
+            The roster to load.
+        on_batch : function
+            Called with a list of loaded entries.
+        on_done : function
+            Called with the last loaded entries, the removed files and the token to give to
+            the roster's ``apply`` once everything is loaded.
+        on_progress : function
+            Called with the number of files loaded and the number of files to load.
+        """
+        self.roster = roster
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.cancelled = threading.Event()
+
+    def start(self):
+        """Start the loading in the background, to be called from the main loop."""
+        threading.Thread(
+            target=self.__run, args=(self.roster.state(),), name="waste-roster", daemon=True
+        ).start()
+
+    def cancel(self):
+        """Stop the loading, nothing is delivered anymore."""
+        self.cancelled.set()
+
+    def __deliver(self, callback, *args):
+        """Call a callback on the main loop, unless the loading is cancelled by then."""
+
+        def deliver():
+            if not self.cancelled.is_set():
+                callback(*args)
+            return False
+
+        GLib.idle_add(deliver)
+
+    def __load_entry(self, change):
+        """Load an entry on a thread of the pool, None if it cannot be read."""
+        if self.cancelled.is_set():
+            return None
+        try:
+            return self.roster.load_entry(change)
+        except (OSError, ValueError, KeyError):
+            # An unreadable file is left out of the roster
+            return None
+
+    def __run(self, state):
+        """Find the changes of the roster and load them, on the loader's thread."""
+        try:
+            to_load, removed, token = self.roster.find_changes(state)
+        except OSError:
+            self.__deliver(self.on_done, [], [], None)
+            return
 
-LVL_NAME = "LVL"
-ORIGIN_NAME = "ORIGIN"
-DN_INDEX = 54  # Daring Nature index in PERKS list
-CN_INDEX = 55  # Cautious Nature index in PERKS list
+        total = len(to_load)
+        self.__deliver(self.on_progress, 0, total)
+        batch, done, last_delivery = [], 0, time.monotonic()
+        for entry in LOAD_EXECUTOR.map(self.__load_entry, to_load):
+            if self.cancelled.is_set():
+                return
+            done += 1
+            if entry is not None:
+                batch.append(entry)
+            elapsed = time.monotonic() - last_delivery
+            if len(batch) >= LOAD_BATCH_SIZE or elapsed >= LOAD_BATCH_INTERVAL:
+                self.__deliver(self.on_batch, batch)
+                self.__deliver(self.on_progress, done, total)
+                batch, last_delivery = [], time.monotonic()
+
+        self.__deliver(self.on_done, batch, removed, token)
 
 
 class MainHandler:
     """Handle all the signals from the UI."""
 
     def __init__(self, builder):
-        """Constructor."""
+        """Constructor, the players are only loaded by ``start``."""
         self.builder = builder
-        self.players = []
+        self.roster = None
+        self.loader = None
+        self.store = self.builder.get_object("players_store")
+        self.rows = {}  # {filename: Gtk.TreeRowReference, ...} of the displayed players
+
+    def start(self, profile: StartupProfile = None):
+        """
+        Load the roster, meant to be called once the window is drawn. Does nothing if it is
+        already loaded.
+        """
+        if self.roster is not None:
+            return
+        profile = profile or StartupProfile(enabled=False)
+
+        # Only the summaries are read, the players are loaded when they are edited
+        with profile.phase("roster scan"):
+            self.roster = get_roster()
+
+        # The known entries are displayed at once, the changes are loaded in the background. The
+        # directory is not even listed if it has not changed since the manifest was written.
+        with profile.phase("grid build"):
+            for entry in self.roster.entries.values():
+                self.__insert_row(entry)
+        if not self.roster.is_current():
+            self.__load_roster()
 
-        self.on_update_player_clicked()
+        if POLL_INTERVAL > 0:
+            GLib.timeout_add_seconds(POLL_INTERVAL, self.__poll_players)
 
     def on_add_player_clicked(self, *_):
         """Add a new player."""
+        self.start()
         player = new_player()
         player.save_in_file()
-        edit_player(player)
-        self.players.append(player)
-        self.__update_players_grid()
+        self.__update_row(self.roster.entries[player.filename])
+        edit_player(player, self.on_player_saved)
 
     def on_update_player_clicked(self, *_):
-        """Get all the players' file detected and display them all."""
-        # Clean the registered players
-        self.players = []
-
-        # Add all the files
-        for player in os.listdir("waste/players/"):
-            with open(f"waste/players/{player}", "r", encoding="utf-8") as file:
-                player_data = json.load(file)
-                self.players.append(
-                    Player(
-                        f"waste/players/{player}",
-                        player_data["NAME"],
-                        {
-                            "LVL": player_data["LVL"],
-                            "ORIGIN": player_data["ORIGIN"],
-                            "HEALTH_POINT": player_data["HEALTH_POINT"],
-                            "LUCKY_POINT": player_data["LUCKY_POINT"],
-                            "CARRY_WEIGHT": player_data["CARRY_WEIGHT"],
-                            "DEFENSE": player_data["DEFENSE"],
-                            "PHYSICAL_RESISTANCE": player_data["PHYSICAL_RESISTANCE"],
-                            "ENERGY_RESISTANCE": player_data["ENERGY_RESISTANCE"],
-                            "RADIATION_RESISTANCE": player_data["RADIATION_RESISTANCE"],
-                            "POISON_RESISTANCE": player_data["POISON_RESISTANCE"],
-                            "SPECIAL": player_data["SPECIAL"],
-                        },
-                        player_data["SKILLS"],
-                        player_data["PERKS"],
-                    )
-                )
+        """
+        Get all the players' file detected and display them all. Only the added or changed
+        files are read again, a loading in progress is started over.
+        """
+        self.start()
+        # The players removed from the list are displayed again
+        self.__load_roster(show_all=True)
 
-        # Update the players' grid on the UI
-        self.__update_players_grid()
+    def __poll_players(self):
+        """Apply the changes made on the players' directory since the last check."""
+        if self.loader is None:
+            self.__load_roster()
 
-    def on_edit_player_clicked(self, _, identifier: int):
-        """Edit an existing player."""
-        edit_player(self.players[identifier])
-        self.__update_players_grid()
+        # Keep the timeout running
+        return True
+
+    def __load_roster(self, show_all: bool = False):
+        """
+        Load the changes of the roster in the background, a loading in progress is cancelled.
 
-    def on_suppr_player_clicked(self, _, identifier: int):
+        Parameters
+        ----------
+        show_all : bool
+            Display again the players removed from the list once the roster is loaded.
         """
-        Delete an existing player. The player's file will not be deleted, but it will be no
+        if self.loader is not None:
+            self.loader.cancel()
+        self.loader = RosterLoader(
+            self.roster,
+            self.__on_roster_batch,
+            functools.partial(self.__on_roster_loaded, show_all),
+            self.__on_roster_progress,
+        )
+        self.loader.start()
+
+    def __on_roster_batch(self, entries: list, removed: list = (), token=None):
+        """Display a batch of loaded entries."""
+        added, changed, removed = self.roster.apply(entries, removed, token)
+
+        for entry in removed:
+            self.__remove_row(entry.filename)
+        for entry in changed:
+            if entry.filename in self.rows:
+                self.__update_row(entry)
+        for entry in added:
+            self.__insert_row(entry)
+
+    def __on_roster_loaded(self, show_all: bool, entries: list, removed: list, token):
+        """Display the last entries once the roster is loaded."""
+        self.__on_roster_batch(entries, removed, token)
+        if show_all:
+            for filename, entry in self.roster.entries.items():
+                if filename not in self.rows:
+                    self.__insert_row(entry)
+
+        self.builder.get_object("roster_progress").hide()
+        self.loader = None
+
+    def __on_roster_progress(self, done: int, total: int):
+        """Show how many of the changed files have been loaded."""
+        progress = self.builder.get_object("roster_progress")
+        if total == 0:
+            progress.hide()
+            return
+
+        progress.set_fraction(done / total)
+        progress.set_text(f"{done} / {total} joueurs chargés")
+        progress.show()
+
+    def on_players_view_row_activated(self, *_):
+        """Edit the player of a double-clicked row."""
+        self.on_edit_player_clicked()
+
+    def on_edit_player_clicked(self, *_):
+        """Edit the selected player."""
+        if (entry := self.__selected_entry()) is None:
+            return
+
+        edit_player(entry.player, self.on_player_saved)
+
+    def on_player_saved(self, player: Player):
+        """Update the row of a player saved from an editor."""
+        if (entry := self.roster.entries.get(player.filename)) is not None:
+            self.__update_row(entry)
+
+    def on_suppr_player_clicked(self, *_):
+        """
+        Delete the selected player. The player's file will not be deleted, but it will be no
         longer displayed.
         """
-        self.players.pop(identifier)
-        self.__update_players_grid()
+        if (entry := self.__selected_entry()) is not None:
+            self.__remove_row(entry.filename)
 
-    def on_permanent_delete_clicked(self, _, identifier):
+    def on_permanent_delete_clicked(self, *_):
         """
-        Delete an existing player. The player's file will be deleted too.
+        Delete the selected player. The player's file, or its row of the database, will be
+        deleted too.
         """
+        if (entry := self.__selected_entry()) is None:
+            return
+
         dialog = ConfirmationDialog(self.builder.get_object("main_window"))
         if dialog.run() == Gtk.ResponseType.OK:
-            os.remove(self.players[identifier].filename)
-            self.players.pop(identifier)
-            self.__update_players_grid()
+            self.roster.delete(entry.filename)
+            self.__remove_row(entry.filename)
 
         dialog.destroy()
 
-    def __update_players_grid(self):
-        """Update the players' grid with the registered players."""
-        # Get the players' grid
-        players_grid = self.builder.get_object("players_grid")
-
-        # Clean the grid
-        for child in players_grid.get_children():
-            players_grid.remove(child)
-
-        # Display the registered players
-        for index, player in enumerate(self.players):
-            name = Gtk.Label()
-            name.set_markup(player.name)
-            players_grid.attach(name, 0, index + 1, 1, 1)
-
-            edit = Gtk.Button(label="Modifier", image=Gtk.Image(stock=Gtk.STOCK_EDIT))
-            edit.set_always_show_image(True)
-            edit.connect("clicked", self.on_edit_player_clicked, index)
-            players_grid.attach(edit, 1, index + 1, 1, 1)
-
-            suppr = Gtk.Button(label="Enlever", image=Gtk.Image(stock=Gtk.STOCK_CLEAR))
-            suppr.set_always_show_image(True)
-            suppr.connect("clicked", self.on_suppr_player_clicked, index)
-            players_grid.attach(suppr, 2, index + 1, 1, 1)
+    def __selected_entry(self):
+        """Return the RosterEntry of the selected row, None if no row is selected."""
+        model, tree_iter = self.builder.get_object("players_view").get_selection().get_selected()
+        if tree_iter is None:
+            return None
+        return self.roster.entries.get(model[tree_iter][FILENAME_COLUMN])
+
+    @staticmethod
+    def __row(entry):
+        """Return the values of the row displaying an entry."""
+        origins = gamedata.origins()
+        origin = origins[entry.origin] if 0 <= entry.origin < len(origins) else ""
+        return [entry.name, entry.level, origin, entry.filename]
+
+    def __insert_row(self, entry):
+        """Append a row for an entry to the players' list."""
+        tree_iter = self.store.append(self.__row(entry))
+        self.rows[entry.filename] = Gtk.TreeRowReference.new(
+            self.store, self.store.get_path(tree_iter)
+        )
 
-            permanent_delete = Gtk.Button(label="Effacer", image=Gtk.Image(stock=Gtk.STOCK_REMOVE))
-            permanent_delete.set_always_show_image(True)
-            permanent_delete.connect("clicked", self.on_permanent_delete_clicked, index)
-            players_grid.attach(permanent_delete, 3, index + 1, 1, 1)
+    def __update_row(self, entry):
+        """Update the row of an entry, the row is created if the entry is not displayed."""
+        if (reference := self.rows.get(entry.filename)) is None or not reference.valid():
+            self.__insert_row(entry)
+        else:
+            self.store.set_row(self.store.get_iter(reference.get_path()), self.__row(entry))
 
-        players_grid.show_all()
+    def __remove_row(self, filename: str):
+        """Remove the row of a file from the players' list."""
+        if (reference := self.rows.pop(filename, None)) is not None and reference.valid():
+            self.store.remove(self.store.get_iter(reference.get_path()))
 
 
 class EditHandler:
     """Handle all the signals for the editor window."""
 
-    def __init__(self, builder, player: Player):
-        """Constructor method."""
+    def __init__(self, builder, player: Player = None, on_saved=None):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        builder : Gtk.Builder
+            The builder of the editor window.
+        player : Player
+            The player to edit, can be given later to ``load``.
+        on_saved : function
+            Called with the player each time it has been written in its file.
+        """
         self.builder = builder
         self.player = player
-        self.spins_skills = {}
-        self.spins_perks = {}
-
-        name = self.builder.get_object("player_name")
-        name.set_text(player.name)
+        self.on_saved = on_saved
+        # Widgets of the grids' rows, in display order: {id: (widget, ...), ...}
+        self.skills_rows = {}
+        self.perks_rows = {}
+        # Ids currently in the combo lists, in display order
+        self.skills_list_ids = []
+        self.perks_list_ids = []
+        self.autosave_source = None
+        self.loading = False
+        # Perks to plan for the player: {id: rank, ...}
+        self.wishlist = {}
+        # Edits of the player, for the undo/redo and the recovery after a crash
+        self.journal = None
+
+        # Every field of the editor is journaled and schedules an autosave when it changes
+        for widget_name, signal, path in self.__fields():
+            self.builder.get_object(widget_name).connect(signal, self.on_field_changed, path)
 
         origins_list = self.builder.get_object("origins_list")
         origins_list.remove_all()
-        for index, name in enumerate(ORIGINS):
+        for index, name in enumerate(gamedata.origins()):
             origins_list.append(str(index), name)
-        origins_list.set_active(player.data["ORIGIN"])
+
+        wishes_list = self.builder.get_object("wishes_list")
+        wishes_list.remove_all()
+        for index, perk in enumerate(gamedata.perks()):
+            wishes_list.append(str(index), perk["name"])
+
+        if player is not None:
+            player.editing = True
+            self.__open_journal()
+            self.__load_player()
+
+    def load(self, player: Player):
+        """Bind the editor to another player, the pending autosave of the previous one is done."""
+        self.flush()
+        if self.player is not None:
+            self.player.editing = False
+        self.player = player
+        self.player.editing = True
+        self.wishlist = {}
+        self.__open_journal()
+        self.__load_player()
+
+    def flush(self):
+        """Do the pending autosave right now, if any."""
+        if self.autosave_source is not None:
+            GLib.source_remove(self.autosave_source)
+            self.__autosave()
+
+    @staticmethod
+    def __fields():
+        """
+        Return the fields defined in the glade file, as (widget id, signal, path) tuples: the
+        path of the player's field is the one used by the journal.
+        """
+        return (
+            [("player_name", "changed", ("NAME",)), ("origins_list", "changed", ("STAT", "ORIGIN"))]
+            + [
+                (spin_name.lower(), "value-changed", ("STAT", spin_name))
+                for spin_name in STATS_FIELDS
+            ]
+            + [
+                (
+                    f"{spin_name.lower()}_{body_part}",
+                    "value-changed",
+                    ("RESISTANCE", spin_name, index),
+                )
+                for spin_name in RESISTANCES_FIELDS
+                for index, body_part in enumerate(BODY_PARTS)
+            ]
+            + [
+                (spin_name.lower(), "value-changed", ("STAT", spin_name))
+                for spin_name in gamedata.special()
+            ]
+        )
+
+    def __open_journal(self):
+        """
+        Open the journal of the player, the edits left by a crashed session are offered to the
+        user.
+        """
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = Journal(self.player)
+        if self.journal.recover():
+            dialog = RecoveryDialog(self.builder.get_object("main_window"))
+            response = dialog.run()
+            dialog.destroy()
+            if response != Gtk.ResponseType.OK:
+                self.journal.reset()
+                self.player.restore_from_file()
+        self.__update_history()
+
+    def __update_history(self):
+        """Enable the undo and redo buttons when there is something to undo or redo."""
+        self.builder.get_object("undo").set_sensitive(bool(self.journal.done))
+        self.builder.get_object("redo").set_sensitive(bool(self.journal.undone))
+
+    def __record(self, path: tuple, old, new):
+        """Journal an edit made on the player, publish it and schedule an autosave."""
+        self.journal.record(path, old, new)
+        publish(self.player, path, new)
+        self.__update_history()
+        self.__schedule_autosave()
+
+    def __load_player(self):
+        """Display the player's data in the editor."""
+        self.loading = True
+
+        name = self.builder.get_object("player_name")
+        name.set_text(self.player.name)
+
+        origins_list = self.builder.get_object("origins_list")
+        origins_list.set_active(self.player.data["ORIGIN"])
 
         adjustment_lp = self.builder.get_object("adjustment_lp")
         adjustment_lp.set_upper(self.player.data["SPECIAL"]["LCK"])
 
-        for spin_name in (
-            "LVL",
-            "HEALTH_POINT",
-            "LUCKY_POINT",
-            "CARRY_WEIGHT",
-            "DEFENSE",
-        ):
+        for spin_name in STATS_FIELDS:
             spin = self.builder.get_object(spin_name.lower())
             spin.set_value(self.player.data[spin_name])
 
-        for spin_name in (
-            "PHYSICAL_RESISTANCE",
-            "ENERGY_RESISTANCE",
-            "RADIATION_RESISTANCE",
-            "POISON_RESISTANCE",
-        ):
-            for index, body_part in enumerate((
-                "head",
-                "torso",
-                "rightarm",
-                "leftarm",
-                "rightleg",
-                "leftleg"
-            )):
+        for spin_name in RESISTANCES_FIELDS:
+            for index, body_part in enumerate(BODY_PARTS):
                 spin = self.builder.get_object(f"{spin_name.lower()}_{body_part}")
                 spin.set_value(self.player.data[spin_name][index])
 
-        for spin_name in SPECIAL.keys():
-            spin = self.builder.get_object(spin_name)
-            spin.set_value(self.player.data["SPECIAL"][spin_name.upper()])
+        for spin_name in gamedata.special():
+            spin = self.builder.get_object(spin_name.lower())
+            spin.set_value(self.player.data["SPECIAL"][spin_name])
 
         self.__update_skills_grid()
         self.__update_perks_grid()
+        self.loading = False
+        publish_player(self.player)
 
-    def on_save_clicked(self, *_):
-        """Save the change in the file."""
+    def __read_fields(self):
+        """Copy the values of the editor's fields into the player's data."""
         name = self.builder.get_object("player_name")
         self.player.name = name.get_text()
 
         origins_list = self.builder.get_object("origins_list")
         self.player.data["ORIGIN"] = origins_list.get_active()
 
-        for spin_name in (
-            "LVL",
-            "HEALTH_POINT",
-            "LUCKY_POINT",
-            "CARRY_WEIGHT",
-            "DEFENSE",
-        ):
+        for spin_name in STATS_FIELDS:
             spin = self.builder.get_object(spin_name.lower())
             self.player.data[spin_name] = spin.get_value_as_int()
 
-        for spin_name in (
-            "PHYSICAL_RESISTANCE",
-            "ENERGY_RESISTANCE",
-            "RADIATION_RESISTANCE",
-            "POISON_RESISTANCE",
-        ):
-            for index, body_part in enumerate((
-                "head",
-                "torso",
-                "rightarm",
-                "leftarm",
-                "rightleg",
-                "leftleg"
-            )):
+        for spin_name in RESISTANCES_FIELDS:
+            for index, body_part in enumerate(BODY_PARTS):
                 spin = self.builder.get_object(f"{spin_name.lower()}_{body_part}")
                 self.player.data[spin_name][index] = spin.get_value_as_int()
 
+        for spin_name in gamedata.special():
+            spin = self.builder.get_object(spin_name.lower())
+            self.player.data["SPECIAL"][spin_name] = spin.get_value_as_int()
+
+    def __schedule_autosave(self):
+        """
+        Write the player after AUTOSAVE_DELAY milliseconds without change, so a burst of
+        changes only costs one write.
+        """
+        if AUTOSAVE_DELAY <= 0 or self.loading:
+            return
+
+        if self.autosave_source is not None:
+            GLib.source_remove(self.autosave_source)
+        self.autosave_source = GLib.timeout_add(AUTOSAVE_DELAY, self.__autosave)
+
+    def __cancel_autosave(self):
+        """Drop the pending autosave, if any."""
+        if self.autosave_source is not None:
+            GLib.source_remove(self.autosave_source)
+            self.autosave_source = None
+
+    def __autosave(self):
+        """Encode the player on the main loop and write it from the autosave thread."""
+        self.autosave_source = None
+        self.__read_fields()
+
+        if (pending := self.player.prepare_save()) is not None:
+            future = AUTOSAVE_EXECUTOR.submit(pending.write)
+            future.add_done_callback(
+                lambda future: GLib.idle_add(self.__autosave_done, pending, future)
+            )
 
-        for spin_name in SPECIAL.keys():
-            spin = self.builder.get_object(spin_name)
-            self.player.data["SPECIAL"][spin_name.upper()] = spin.get_value_as_int()
+        # Remove the timeout
+        return False
 
-        self.player.save_in_file()
-        self.__init__(self.builder, self.player)
+    def __autosave_done(self, pending, future):
+        """Record the autosave in the roster, back on the main loop."""
+        if (error := future.exception()) is not None:
+            # The next save has to write the changes again
+            pending.abort()
+            # A save prepared after one that failed finds the file at the version the player
+            # went back to: that is not a save of another instance
+            if (
+                isinstance(error, ConflictError)
+                and pending.player is self.player
+                and error.version != self.player.version
+            ):
+                self.__resolve_conflict(error)
+        else:
+            record(pending.player, pending.dir_mtime)
+            if pending.player is self.player:
+                self.journal.saved(pending.version + 1)
+            if self.on_saved is not None:
+                self.on_saved(pending.player)
+
+        # Remove the idle callback
+        return False
+
+    def on_field_changed(self, widget, path: tuple):
+        """A field of the editor has been changed."""
+        if self.loading:
+            return
+
+        if path == ("NAME",):
+            new = widget.get_text()
+        elif path == ("STAT", "ORIGIN"):
+            new = widget.get_active()
+        else:
+            new = widget.get_value_as_int()
+        old = get_value(self.player, path)
+        set_value(self.player, path, new)
+        self.__record(path, old, new)
+
+    def on_undo_clicked(self, *_):
+        """Undo the last edit."""
+        if (path := self.journal.undo()) is not None:
+            self.__show_field(path)
+
+    def on_redo_clicked(self, *_):
+        """Redo the last undone edit."""
+        if (path := self.journal.redo()) is not None:
+            self.__show_field(path)
+
+    def __show_field(self, path: tuple):
+        """Display and publish a field changed by the journal, and schedule an autosave."""
+        publish(self.player, path, get_value(self.player, path))
+        kind = path[0]
+        if kind == "SKILL":
+            self.__update_skills_grid()
+        elif kind == "PERK":
+            self.__update_perks_grid()
+        else:
+            self.loading = True
+            value = get_value(self.player, path)
+            if kind == "NAME":
+                self.builder.get_object("player_name").set_text(value)
+            elif path == ("STAT", "ORIGIN"):
+                self.builder.get_object("origins_list").set_active(value)
+            elif kind == "STAT":
+                self.builder.get_object(path[1].lower()).set_value(value)
+            else:
+                spin_name = f"{path[1].lower()}_{BODY_PARTS[path[2]]}"
+                self.builder.get_object(spin_name).set_value(value)
+            self.loading = False
+        self.__update_history()
+        self.__schedule_autosave()
+
+    def on_save_clicked(self, *_):
+        """Save the change in the file."""
+        self.__cancel_autosave()
+        # Wait for the autosaves in flight, so they cannot overwrite this save
+        AUTOSAVE_EXECUTOR.submit(lambda: None).result()
+        self.__read_fields()
+        self.__save()
+
+    def __save(self, force: bool = False):
+        """Save the player, a conflict with another instance is submitted to the user."""
+        try:
+            saved = self.player.save_in_file(force)
+        except ConflictError as error:
+            self.__resolve_conflict(error)
+            return
+        if saved:
+            self.journal.saved(self.player.version)
+            if self.on_saved is not None:
+                self.on_saved(self.player)
+
+        adjustment_lp = self.builder.get_object("adjustment_lp")
+        adjustment_lp.set_upper(self.player.data["SPECIAL"]["LCK"])
+        self.__update_perks_grid()
+
+    def __resolve_conflict(self, error: ConflictError, conflicts: set = None):
+        """
+        Ask the user what to do with a player saved by another instance: merge the changes,
+        overwrite the other save, or reload the player.
+        """
+        dialog = ConflictDialog(self.builder.get_object("main_window"), error, conflicts)
+        response = dialog.run()
+        dialog.destroy()
+
+        if response == ConflictDialog.MERGE:
+            if conflicts := self.player.merge_from_file():
+                self.__resolve_conflict(error, conflicts)
+                return
+            self.__load_player()
+            self.__save()
+        elif response == ConflictDialog.OVERWRITE:
+            self.player.version = error.version
+            self.__save(force=True)
+        elif response == ConflictDialog.RELOAD:
+            self.player.restore_from_file()
+            self.journal.reset()
+            self.__update_history()
+            self.__load_player()
 
     def on_discard_clicked(self, *_):
-        """Restore the player's data from the file."""
+        """Restore the player's data from the file, the edits are forgotten."""
+        self.__cancel_autosave()
         self.player.restore_from_file()
-        self.__init__(self.builder, self.player)
+        self.journal.reset()
+        self.__update_history()
+        self.__load_player()
 
     def on_add_skill_clicked(self, *_):
         """Add an skill to the player."""
@@ -238,19 +666,33 @@ class EditHandler:
         if skill_id not in self.player.skills:
             self.player.skills[str(skill_id)] = [1, 0]
             self.__update_skills_grid()
+            self.__record(("SKILL", skill_id), None, [1, 0])
 
-    def on_skill_spin_value_changed(self, _, index):
+    def on_skill_spin_value_changed(self, spin, index):
         """Update the player's skill."""
-        if (new_value := self.spins_skills[index].get_value_as_int()) == 0:
+        if index not in self.player.skills:
+            # Already removed, its row is waiting to be destroyed
+            return
+
+        old = get_value(self.player, ("SKILL", index))
+        if (new_value := spin.get_value_as_int()) == 0:
             self.player.skills.pop(index)
+            # The spin button cannot be destroyed while its own signal is handled
+            GLib.idle_add(self.__update_skills_grid)
         else:
             self.player.skills[index][0] = new_value
 
-        self.__update_skills_grid()
+        self.__record(("SKILL", index), old, get_value(self.player, ("SKILL", index)))
 
     def on_checkbox_toggled(self, _, index):
         """Toggle the personnal asset."""
+        if index not in self.player.skills:
+            # Already removed, its row is waiting to be destroyed
+            return
+
+        old = get_value(self.player, ("SKILL", index))
         self.player.skills[index][1] = (self.player.skills[index][1] + 1) % 2
+        self.__record(("SKILL", index), old, get_value(self.player, ("SKILL", index)))
 
     def on_add_perk_clicked(self, *_):
         """Add a perk to the player."""
@@ -265,96 +707,155 @@ class EditHandler:
         # Update the player's perk
         self.player.perks[perk_id] = rank + 1
         self.__update_perks_grid()
+        self.__record(("PERK", perk_id), rank, rank + 1)
+
+    def on_add_wish_clicked(self, *_):
+        """Add the next rank of a perk to the perks to plan."""
+        if (perk_id := self.builder.get_object("wishes_list").get_active_id()) is None:
+            return
+
+        rank = max(self.wishlist.get(perk_id, 0), self.player.perks.get(perk_id, 0)) + 1
+        self.wishlist[perk_id] = min(rank, gamedata.perks()[int(perk_id)]["rank"])
+
+    def on_clear_wishes_clicked(self, *_):
+        """Empty the perks to plan."""
+        self.wishlist = {}
+
+    def on_plan_build_clicked(self, *_):
+        """Show the fastest way for the player to get the perks to plan."""
+        self.__read_fields()
+        perks = gamedata.perks()
+        lines = [
+            "Objectifs : "
+            + ", ".join(
+                f"{perks[int(perk_id)]['name']} (Rang {rank})"
+                for perk_id, rank in self.wishlist.items()
+            ),
+            "",
+        ]
+        try:
+            build_plan = plan(self.player, self.wishlist)
+        except NoPlanError as error:
+            lines.append(f"Aucun chemin possible : {error}")
+        else:
+            lines.append(f"Niveau atteint : {build_plan.level}")
+            lines += build_plan.describe()
+
+        dialog = PlanDialog(self.builder.get_object("main_window"), "\n".join(lines))
+        dialog.run()
+        dialog.destroy()
 
     def on_suppr_perk_clicked(self, _, index):
         """Removes a rank from the selected perk."""
+        if index not in self.player.perks:
+            # Already removed, its row is waiting to be destroyed
+            return
+
+        rank = self.player.perks[index]
         self.player.perks[index] -= 1
         if self.player.perks[index] == 0:
             self.player.perks.pop(index)
 
-        self.__update_perks_grid()
+        # The button cannot be destroyed while its own signal is handled
+        GLib.idle_add(self.__update_perks_grid)
+        self.__record(("PERK", index), rank, rank - 1)
 
     def __update_skills_grid(self):
-        """Update the skills list."""
+        """Update the skills list, only the rows and the entries that changed are touched."""
         # Get the skills' grid
         skills_grid = self.builder.get_object("skills_grid")
 
-        skills_list = self.builder.get_object("skills_list")
-        skills_list.remove_all()
-        for index, skill in enumerate(SKILLS):
-            if str(index) not in self.player.skills:
-                skills_list.append(str(index), skill)
+        _sync_combo(
+            self.builder.get_object("skills_list"),
+            self.skills_list_ids,
+            [index for index in range(len(gamedata.skills())) if str(index) not in self.player.skills],
+            lambda index: gamedata.skills()[index],
+        )
+
+        # Remove the rows of the skills the player no longer has
+        for position, skill_id in reversed(list(enumerate(self.skills_rows))):
+            if skill_id not in self.player.skills:
+                skills_grid.remove_row(position)
+                self.skills_rows.pop(skill_id)
 
-        # Clean the grid
-        for child in skills_grid.get_children():
-            skills_grid.remove(child)
+        # Update the displayed skills and add the new ones
+        for skill_id, (skill_value, tagged_skill) in self.player.skills.items():
+            if skill_id in self.skills_rows:
+                _, spin, checkbox, spin_handler, checkbox_handler = self.skills_rows[skill_id]
+                with spin.handler_block(spin_handler):
+                    spin.set_value(skill_value)
+                with checkbox.handler_block(checkbox_handler):
+                    checkbox.set_active(bool(tagged_skill))
+                continue
 
-        # Display the skills
-        self.spins_skills = {}
-        for index, (skill_id, value) in enumerate(self.player.skills.items()):
-            skill_value, tagged_skill = value
+            index = len(self.skills_rows)
 
             skill_name = Gtk.Label()
-            skill_name.set_markup(SKILLS[int(skill_id)])
+            skill_name.set_markup(gamedata.skills()[int(skill_id)])
             skills_grid.attach(skill_name, 0, index, 1, 1)
 
             spin = Gtk.SpinButton()
             adjustment = Gtk.Adjustment(upper=6, step_increment=1, page_increment=1)
             spin.set_adjustment(adjustment)
             spin.set_value(skill_value)
-            spin.connect("value-changed", self.on_skill_spin_value_changed, skill_id)
+            spin_handler = spin.connect(
+                "value-changed", self.on_skill_spin_value_changed, skill_id
+            )
             skills_grid.attach(spin, 1, index, 1, 1)
-            self.spins_skills[skill_id] = spin
 
             checkbox = Gtk.CheckButton()
             checkbox.set_active(bool(tagged_skill))
-            checkbox.connect("toggled", self.on_checkbox_toggled, skill_id)
+            checkbox_handler = checkbox.connect("toggled", self.on_checkbox_toggled, skill_id)
             skills_grid.attach(checkbox, 2, index, 1, 1)
 
-        skills_grid.show_all()
+            # The ids of the handlers, to block them when the row is updated
+            self.skills_rows[skill_id] = (
+                skill_name, spin, checkbox, spin_handler, checkbox_handler
+            )
+            skill_name.show()
+            spin.show()
+            checkbox.show()
+
+        # Remove the idle callback, if any
+        return False
 
     def __update_perks_grid(self):
-        """Update the perks list."""
+        """Update the perks list, only the rows and the entries that changed are touched."""
         # Get the perks' grid
         perks_grid = self.builder.get_object("perks_grid")
 
-        # Get and clean the list
-        perks_list = self.builder.get_object("perks_list")
-        perks_list.remove_all()
+        # Update the list, only the perks touched since the last update are rechecked
+        _sync_combo(
+            self.builder.get_object("perks_list"),
+            self.perks_list_ids,
+            eligibility(self.player).sync(),
+            lambda index: gamedata.perks()[index]["name"],
+        )
 
-        # Update the list
-        for index, perk in enumerate(PERKS):
-            current_rank = 0
-            if str(index) in self.player.perks:
-                current_rank = self.player.perks[str(index)]
+        # Remove the rows of the perks the player no longer has
+        for position, perk_id in reversed(list(enumerate(self.perks_rows))):
+            if perk_id not in self.player.perks:
+                perks_grid.remove_row(position)
+                self.perks_rows.pop(perk_id)
 
-            if (
-                # Rank check
-                current_rank < perk["rank"]
-                # Conflict between Daring Nature and Cautious Nature
-                and not (
-                    index in {DN_INDEX, CN_INDEX}
-                    and (str(DN_INDEX) in self.player.perks or str(CN_INDEX) in self.player.perks)
-                )
-                # Requirements check
-                and self.player.check_requirements(perk["requirements"][current_rank])
-            ):
-                perks_list.append(str(index), perk["name"])
+        # Update the displayed perks and add the new ones
+        for perk_id, perk_value in self.player.perks.items():
+            rank_markup = "<b>" + gamedata.perks()[int(perk_id)]["name"] + f"</b> (Rang {perk_value})"
+            if perk_id in self.perks_rows:
+                perk_name = self.perks_rows[perk_id][0]
+                if perk_name.get_label() != rank_markup:
+                    perk_name.set_markup(rank_markup)
+                continue
 
-        # Clean the grid
-        for child in perks_grid.get_children():
-            perks_grid.remove(child)
+            index = len(self.perks_rows)
 
-        # Display the perks
-        self.spins_perks = {}
-        for index, (perk_id, perk_value) in enumerate(self.player.perks.items()):
             perk_name = Gtk.Label()
-            perk_name.set_markup("<b>" + PERKS[int(perk_id)]["name"] + f"</b> (Rang {perk_value})")
+            perk_name.set_markup(rank_markup)
             perk_name.set_line_wrap(True)
             perks_grid.attach(perk_name, 0, index, 1, 1)
 
             perk_description = Gtk.Label()
-            perk_description.set_markup(PERKS[int(perk_id)]["description"])
+            perk_description.set_markup(gamedata.perks()[int(perk_id)]["description"])
             perk_description.set_line_wrap(True)
             perks_grid.attach(perk_description, 1, index, 1, 1)
 
@@ -363,7 +864,42 @@ class EditHandler:
             suppr.connect("clicked", self.on_suppr_perk_clicked, perk_id)
             perks_grid.attach(suppr, 2, index, 1, 1)
 
-        perks_grid.show_all()
+            self.perks_rows[perk_id] = (perk_name, perk_description, suppr)
+            perk_name.show()
+            perk_description.show()
+            suppr.show_all()
+
+        # Remove the idle callback, if any
+        return False
+
+
+def _sync_combo(combo, shown: list, wanted: list, label):
+    """
+    Update a combo list with the minimal number of removals and insertions.
+
+    Parameters
+    ----------
+    combo : Gtk.ComboBoxText
+        The combo list to update.
+    shown : list
+        The sorted ids currently in the combo list, updated in place.
+    wanted : list
+        The sorted ids the combo list has to contain.
+    label : function
+        Return the text of an entry from its id.
+    """
+    wanted_ids = set(wanted)
+    for position in range(len(shown) - 1, -1, -1):
+        if shown[position] not in wanted_ids:
+            combo.remove(position)
+            del shown[position]
+
+    # What is left is a subsequence of wanted, the new ids are inserted at their position
+    shown_ids = set(shown)
+    for position, index in enumerate(wanted):
+        if index not in shown_ids:
+            combo.insert(position, str(index), label(index))
+            shown.insert(position, index)
 
 
 class ConfirmationDialog(Gtk.Dialog):
@@ -388,19 +924,157 @@ class ConfirmationDialog(Gtk.Dialog):
         self.show_all()
 
 
-def edit_player(player):
-    """Manage to editor to create a new player of edit an existing one."""
+class PlanDialog(Gtk.Dialog):
+    """Display the plan of the perks of a player."""
+
+    def __init__(self, parent, text: str):
+        """Constructor method."""
+        super().__init__(title="Plan de progression", transient_for=parent, flags=0)
+
+        self.add_buttons(Gtk.STOCK_OK, Gtk.ResponseType.OK)
+
+        label = Gtk.Label(label=text)
+        label.set_xalign(0)
+        box = self.get_content_area()
+        box.add(label)
+        self.show_all()
+
+
+class RecoveryDialog(Gtk.Dialog):
+    """Offer to recover the edits of a player that were not saved."""
+
+    def __init__(self, parent):
+        """Constructor method."""
+        super().__init__(title="Récupération des modifications", transient_for=parent, flags=0)
+
+        self.add_buttons("Abandonner", Gtk.ResponseType.CANCEL, "Récupérer", Gtk.ResponseType.OK)
+
+        label = Gtk.Label(
+            label=(
+                "Des modifications de ce personnage n'ont pas été enregistrées.\n"
+                "Voulez-vous les récupérer ?"
+            )
+        )
+        box = self.get_content_area()
+        box.add(label)
+        self.show_all()
+
+
+class ConflictDialog(Gtk.Dialog):
+    """Choice of the user when a player has been saved by another instance."""
+
+    MERGE = 1
+    OVERWRITE = 2
+    RELOAD = 3
+
+    def __init__(self, parent, error: ConflictError, conflicts: set = None):
+        """
+        Constructor method.
+
+        Parameters
+        ----------
+        parent : Gtk.Window
+            The editor window.
+        error : ConflictError
+            The rejected save.
+        conflicts : set
+            The fields changed on both sides, once a merge has failed.
+        """
+        super().__init__(title="Conflit de sauvegarde", transient_for=parent, flags=0)
+
+        self.add_buttons(
+            "Fusionner",
+            self.MERGE,
+            "Écraser",
+            self.OVERWRITE,
+            "Recharger",
+            self.RELOAD,
+            Gtk.STOCK_CANCEL,
+            Gtk.ResponseType.CANCEL,
+        )
+
+        text = (
+            "Ce personnage a été enregistré par une autre instance depuis son chargement\n"
+            f"(version {error.version}, chargé depuis la version {error.expected})."
+        )
+        if conflicts:
+            text += "\nChamps modifiés des deux côtés : " + ", ".join(sorted(conflicts))
+            self.set_response_sensitive(self.MERGE, False)
+        label = Gtk.Label(label=text)
+        box = self.get_content_area()
+        box.add(label)
+        self.show_all()
+
+
+_UI_SOURCES = {}
+EDITORS = []
+
+
+def new_builder(name: str):
+    """Return a Gtk.Builder for a glade file of the package, the file is only read once."""
+    if name not in _UI_SOURCES:
+        _UI_SOURCES[name] = (importlib.resources.files("waste") / "ui" / name).read_text(
+            encoding="utf-8"
+        )
     builder = Gtk.Builder()
-    builder.add_from_file("waste/ui/edit_player.glade")
-    builder.connect_signals(EditHandler(builder, player))
+    builder.add_from_string(_UI_SOURCES[name])
+    return builder
+
+
+class Editor:
+    """An editor window, hidden instead of destroyed when closed so it can be reused."""
+
+    def __init__(self, on_saved=None):
+        """Constructor method."""
+        self.builder = new_builder("edit_player.glade")
+        self.handler = EditHandler(self.builder, on_saved=on_saved)
+        self.builder.connect_signals(self.handler)
+
+        self.window = self.builder.get_object("main_window")
+        self.window.connect("delete-event", self.on_delete_event)
+
+    @property
+    def player(self):
+        """The player currently bound to the editor."""
+        return self.handler.player
+
+    def on_delete_event(self, *_):
+        """Hide the window instead of destroying it."""
+        self.handler.flush()
+        self.player.editing = False
+        self.window.hide()
+        return True
+
+    def open(self, player: Player):
+        """Bind the editor to a player and show it."""
+        self.handler.load(player)
+
+        if player.filename:
+            self.window.set_title(f"Modification de {player.name}")
+        else:
+            self.window.set_title("Création d'un nouveau personnage")
+
+        self.window.show_all()
+        self.window.present()
+
 
-    edit_window = builder.get_object("main_window")
-    edit_window.connect("destroy", Gtk.main_quit)
+def edit_player(player, on_saved=None):
+    """
+    Manage to editor to create a new player of edit an existing one. The window of the player
+    is raised if it is already open, otherwise a hidden editor is reused, or a new one is built.
+    """
+    for editor in EDITORS:
+        if editor.player is player and editor.window.get_visible():
+            editor.window.present()
+            return editor
 
-    if player.filename:
-        edit_window.set_title(f"Modification de {player.name}")
+    for editor in EDITORS:
+        if not editor.window.get_visible():
+            break
     else:
-        edit_window.set_title("Création d'un nouveau personnage")
+        editor = Editor()
+        EDITORS.append(editor)
 
-    edit_window.show_all()
-    Gtk.main()
+    editor.handler.on_saved = on_saved
+    editor.open(player)
+    return editor